@@ -0,0 +1,127 @@
+import os
+import re
+import selectors
+import shlex
+import subprocess
+import threading
+import time
+import uuid
+
+from clickable.logger import logger
+
+
+class AdbShellError(Exception):
+    pass
+
+
+def unescape_command(command):
+    """ Device commands are written to be wrapped in double quotes on the host
+    (``echo "<command>" | adb shell``), which removes these escapes """
+    return re.sub(r'\\([\\"$`])', r'\1', command)
+
+
+class AdbShell():
+    """ One long-lived ``adb shell`` process running all commands for a device.
+
+    Each command is followed by an ``echo`` of a marker and its exit code, which
+    tells where its output ends. Stderr is not captured, like with ``adb shell``.
+    """
+
+    def __init__(self, adb_args):
+        self.adb_args = adb_args
+        self.marker = f'CLICKABLE_{uuid.uuid4().hex}'
+        self.process = None
+        self.buffer = b''
+        self.lock = threading.Lock()
+
+    def is_running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self, timeout=None):
+        command = ['adb'] + shlex.split(self.adb_args) + ['shell']
+        logger.debug('Starting persistent adb shell')
+
+        self.buffer = b''
+        self.process = subprocess.Popen(  # pylint: disable=consider-using-with
+            command, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+        # Discard anything the shell prints before the first command
+        self.send(':')
+        self.read_result(timeout)
+
+    def close(self, force=False):
+        if not self.process:
+            return
+
+        logger.debug('Closing persistent adb shell')
+        if not force:
+            try:
+                self.process.stdin.write(b'exit\n')
+                self.process.stdin.close()
+                self.process.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                force = True
+
+        if force:
+            self.process.kill()
+            self.process.wait()
+
+        for stream in [self.process.stdin, self.process.stdout]:
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+        self.process = None
+
+    def send(self, command):
+        # Commands run in a subshell so that "exit" or "cd" do not affect the session.
+        # stdin is redirected because it is the stream this shell reads commands from.
+        script = f'( {command}\n) </dev/null; echo "{self.marker} $?"\n'
+        try:
+            self.process.stdin.write(script.encode())
+            self.process.stdin.flush()
+        except OSError as e:
+            raise AdbShellError('adb shell closed unexpectedly') from e
+
+    def read_result(self, timeout=None):
+        deadline = time.monotonic() + timeout if timeout else None
+        pattern = re.compile(f'{self.marker} ([0-9]+)\r?\n'.encode())
+
+        with selectors.DefaultSelector() as selector:
+            selector.register(self.process.stdout, selectors.EVENT_READ)
+
+            while True:
+                match = pattern.search(self.buffer)
+                if match:
+                    output = self.buffer[:match.start()]
+                    self.buffer = self.buffer[match.end():]
+                    return int(match.group(1)), output.decode(errors='replace')
+
+                remaining = deadline - time.monotonic() if deadline else None
+                if remaining is not None and remaining <= 0:
+                    raise subprocess.TimeoutExpired('adb shell', timeout)
+
+                if not selector.select(remaining):
+                    continue
+
+                data = os.read(self.process.stdout.fileno(), 65536)
+                if not data:
+                    raise AdbShellError('adb shell closed unexpectedly')
+
+                self.buffer += data
+
+    def run(self, command, timeout=None):
+        """ Runs the command on the device and returns a tuple of the exit code
+        and its output. The shell is (re)started as needed. """
+        with self.lock:
+            try:
+                if not self.is_running():
+                    self.start(timeout)
+
+                self.send(unescape_command(command))
+                return self.read_result(timeout)
+            except (AdbShellError, subprocess.TimeoutExpired):
+                # The shell is in an unknown state, start over with the next command
+                self.close(force=True)
+                raise
@@ -3,14 +3,83 @@ import os
 from clickable.logger import logger
 from clickable.exceptions import ClickableException
 
+# ccache counters making up the hit rate (names of ccache 4 and ccache 3.7)
+CCACHE_HIT_COUNTERS = ['direct_cache_hit', 'preprocessed_cache_hit',
+                       'cache_hit_direct', 'cache_hit_preprocessed']
+CCACHE_MISS_COUNTERS = ['cache_miss']
+
+
+def parse_ccache_stats(output):
+    """ Parses the tab separated output of "ccache --print-stats" """
+    stats = {}
+    for line in output.splitlines():
+        key, _, value = line.partition('\t')
+        if value.strip().isdigit():
+            stats[key] = int(value)
+
+    return stats
+
 
 class Builder():
     name = None
+    # Whether the builder updates an existing install dir itself instead of
+    # starting from an empty one
+    incremental_install = False
+    # Compiler cache used with the compiler_cache option
+    compiler_cache = None
 
     def __init__(self, config, container, debug_build):
         self.config = config
         self.container = container
         self.debug_build = debug_build
+        self.compiler_cache_available = None
+
+    def use_compiler_cache(self):
+        if not self.compiler_cache or not self.config.compiler_cache:
+            return False
+
+        if self.compiler_cache_available is None:
+            self.compiler_cache_available = bool(self.container.probe(
+                f'command -v {self.compiler_cache} || true').strip())
+
+            if not self.compiler_cache_available:
+                logger.warning('%s is not available in the build image, building without '
+                               'compiler cache', self.compiler_cache)
+
+        return self.compiler_cache_available
+
+    def read_compiler_cache_stats(self):
+        """ Returns the counters of the cache. They are never zeroed, as other
+        builds for the same architecture may use the cache at the same time.
+        Only read for verbose builds, as it needs a container run each time. """
+        if not self.config.verbose or not self.use_compiler_cache():
+            return None
+
+        output = self.container.run_command(
+            f'{self.compiler_cache} --print-stats 2>/dev/null || true',
+            get_output=True, use_build_dir=False)
+
+        return parse_ccache_stats(output)
+
+    def show_compiler_cache_stats(self, before):
+        """ Logs the hit rate of the build from the counters before and after it """
+        if not before:
+            # Not using the cache or its version cannot print the counters
+            return
+
+        after = self.read_compiler_cache_stats()
+
+        def count(counters):
+            return sum(after.get(key, 0) - before.get(key, 0) for key in counters)
+
+        hits = count(CCACHE_HIT_COUNTERS)
+        total = hits + count(CCACHE_MISS_COUNTERS)
+
+        if total:
+            logger.info('Compiler cache: %i of %i compilations cached (%i%%)',
+                        hits, total, 100 * hits // total)
+        else:
+            logger.info('Compiler cache: nothing was compiled')
 
     def test(self, is_app=True):
         # May be overriden by some builders
@@ -7,10 +7,12 @@ from .make import MakeBuilder
 
 BUILD_TYPE = 'CMAKE_BUILD_TYPE'
 INSTALL_PREFIX = 'CMAKE_INSTALL_PREFIX'
+COMPILER_LAUNCHERS = ['CMAKE_C_COMPILER_LAUNCHER', 'CMAKE_CXX_COMPILER_LAUNCHER']
 
 
 class CMakeBuilder(MakeBuilder):
     name = Constants.CMAKE
+    compiler_cache = 'ccache'
 
     def make_install(self):
         self.container.run_command(f'make DESTDIR={self.config.install_dir}/ install')
@@ -31,6 +33,11 @@ class CMakeBuilder(MakeBuilder):
         if not has_arg(self.config.build_args, INSTALL_PREFIX):
             self.config.build_args.append(f'-D{INSTALL_PREFIX}:PATH=/.')
 
+        if self.use_compiler_cache():
+            for launcher in COMPILER_LAUNCHERS:
+                if not has_arg(self.config.build_args, launcher):
+                    self.config.build_args.append(f'-D{launcher}={self.compiler_cache}')
+
         command += self.config.build_args
         command.append(self.config.src_dir)
 
@@ -1,5 +1,6 @@
-import subprocess
+import os
 
+from clickable.parallel import check_call_prefixed
 from .base import Builder
 
 
@@ -7,7 +8,8 @@ class MakeBuilder(Builder):
     def post_make(self):
         if self.config.postmake:
             for cmd in self.config.postmake:
-                subprocess.check_call(cmd, cwd=self.config.build_dir, shell=True)
+                check_call_prefixed(cmd, cwd=self.config.build_dir, shell=True,
+                                    env={**os.environ, **self.config.get_env_vars()})
 
     def post_make_install(self):
         pass
@@ -2,6 +2,12 @@ import shutil
 import os
 import fnmatch
 
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
 from clickable.logger import logger
 from clickable.config.constants import Constants
 
@@ -9,6 +15,9 @@ from .base import Builder
 from .cmake import CMakeBuilder
 from .qmake import QMakeBuilder
 
+# ioctl request to share the data blocks of a file on copy-on-write file systems
+FICLONE = 0x40049409
+
 
 class PureQMLQMakeBuilder(QMakeBuilder):
     name = Constants.PURE_QML_QMAKE
@@ -20,6 +29,7 @@ class PureQMLCMakeBuilder(CMakeBuilder):
 
 class PureBuilder(Builder):
     name = Constants.PURE
+    incremental_install = True
 
     def matches_ignore_list(self, path):
         for pattern in self.config.ignore:
@@ -42,11 +52,73 @@ class PureBuilder(Builder):
 
         return ignored
 
+    def sync(self, src, dst):
+        """ Mirrors src into dst like copytree, but only copies changed files """
+        copied = 0
+
+        if os.path.lexists(dst) and not os.path.isdir(dst):
+            os.remove(dst)
+        os.makedirs(dst, exist_ok=True)
+
+        names = os.listdir(src)
+        ignored = set(self.ignore(src, names))
+        names = [name for name in names if name not in ignored]
+
+        for name in os.listdir(dst):
+            if name not in names:
+                remove(os.path.join(dst, name))
+
+        for name in names:
+            src_path = os.path.join(src, name)
+            dst_path = os.path.join(dst, name)
+
+            if os.path.isdir(src_path):
+                copied += self.sync(src_path, dst_path)
+            elif not is_same_file(src_path, dst_path):
+                if os.path.lexists(dst_path):
+                    remove(dst_path)
+                copy_file(src_path, dst_path)
+                copied += 1
+
+        shutil.copystat(src, dst)
+        return copied
+
     def build(self):
-        if os.path.isdir(self.config.install_dir):
-            shutil.rmtree(self.config.install_dir)
-        shutil.copytree(self.config.cwd, self.config.install_dir, ignore=self.ignore)
-        logger.info('Copied files to install directory for click building')
+        copied = self.sync(self.config.cwd, self.config.install_dir)
+        logger.info('Copied %s changed files to install directory for click building', copied)
+
+
+def remove(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    else:
+        os.remove(path)
+
+
+def is_same_file(src, dst):
+    if os.path.islink(dst) or not os.path.isfile(dst):
+        return False
+
+    src_stat = os.stat(src)
+    dst_stat = os.stat(dst)
+    return (src_stat.st_size == dst_stat.st_size and
+            src_stat.st_mtime_ns == dst_stat.st_mtime_ns)
+
+
+def copy_file(src, dst):
+    """ Copies a file with its metadata, sharing data blocks if the file system
+    supports it. Hard links are no option, as the manifest and apparmor files get
+    modified in the install dir. """
+    if HAS_FCNTL:
+        try:
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            shutil.copystat(src, dst)
+            return
+        except OSError:
+            pass
+
+    shutil.copy2(src, dst)
 
 
 class PrecompiledBuilder(PureBuilder):
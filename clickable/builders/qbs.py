@@ -5,6 +5,7 @@ from .base import Builder
 
 class QBSBuilder(Builder):
     name = Constants.QBS
+    compiler_cache = 'ccache'
 
     def build(self):
         command = [
@@ -25,6 +26,9 @@ class QBSBuilder(Builder):
         else:
             command.append('config:release')
 
+        if self.use_compiler_cache():
+            command.append(f'modules.cpp.compilerWrapper:{self.compiler_cache}')
+
         if self.config.build_args:
             command += self.config.build_args
 
@@ -5,6 +5,7 @@ from .make import MakeBuilder
 
 class QMakeBuilder(MakeBuilder):
     name = Constants.QMAKE
+    compiler_cache = 'ccache'
 
     def make_install(self):
         self.container.run_command(f'make INSTALL_ROOT={self.config.install_dir}/ install')
@@ -22,6 +23,11 @@ class QMakeBuilder(MakeBuilder):
         if self.debug_build:
             command = f'{command} CONFIG+=debug'
 
+        if self.use_compiler_cache():
+            # Wraps the compilers set by the mkspec
+            command = f"{command} 'QMAKE_CC={self.compiler_cache} $$QMAKE_CC' " \
+                f"'QMAKE_CXX={self.compiler_cache} $$QMAKE_CXX'"
+
         # user may have defined a specific .pro file, so qmake must not read others (if any)
         if not any(arg.endswith(".pro") for arg in self.config.build_args):
             command = f'{command} {self.config.src_dir}'
@@ -12,6 +12,23 @@ class VersionAction(argparse.Action):
         sys.exit(0)
 
 
+def arch_list(value):
+    choices = Constants.archs + ['all', 'detect']
+    archs = value.split(',')
+
+    for arch in archs:
+        if arch not in choices:
+            options = ", ".join(choices)
+            raise argparse.ArgumentTypeError(
+                f'invalid choice: "{arch}" (choose from {options})')
+
+    if len(archs) > 1 and ('all' in archs or 'detect' in archs):
+        raise argparse.ArgumentTypeError(
+            '"all" and "detect" cannot be combined with other architectures')
+
+    return value
+
+
 class Cli():
     def __init__(self):
         self.commands = []
@@ -61,8 +78,10 @@ class Cli():
         parser.add_argument(
             '--arch',
             '-a',
-            choices=['armhf', 'arm64', 'amd64', 'all', 'detect'],
-            help='Use the specified arch when building'
+            type=arch_list,
+            metavar='{armhf,arm64,amd64,all,detect}',
+            help='Use the specified arch when building. The build command accepts a comma '
+                 'separated list to build for multiple architectures at once'
         )
         parser.add_argument(
             '--container-mode',
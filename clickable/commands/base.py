@@ -1,13 +1,26 @@
 from clickable.exceptions import ClickableException
 from clickable.config.global_config import GlobalConfig
 from clickable.config.device import DeviceConfig
-from clickable.device import Device
+from clickable.device import Device, get_adb_serials, get_device_specs
+from clickable.logger import logger
+from clickable.parallel import run_concurrently
 from clickable.container import Container
 from clickable.config.project import ProjectConfig
 from clickable.config.command import CommandConf, CommandCliConf
+from clickable.config.constants import Constants
 from clickable.utils import let_user_confirm
 
 
+def get_requested_archs(args):
+    if getattr(args, 'all_archs', False):
+        return list(Constants.archs)
+
+    if not args.arch:
+        return []
+
+    return list(dict.fromkeys(args.arch.split(',')))
+
+
 class Command():
     def __init__(self):
         self.device = None
@@ -54,16 +67,96 @@ class Command():
                 f'the configured architecture {self.config.arch}.')
 
     def start(self, args):
+        archs = get_requested_archs(args)
+        if len(archs) > 1:
+            raise ClickableException(
+                'Multiple architectures are only supported by the "build" command')
+
+        if archs:
+            args.arch = archs[0]
+
+        if getattr(args, 'devices', None):
+            self.start_on_devices(args)
+            return
+
         self.parse_common_options(args)
 
         self.setup()
-        self.configure(args)
-        self.check_errors()
-        self.run()
+        try:
+            self.configure(args)
+            self.check_errors()
+            self.run()
+        finally:
+            if self.container:
+                self.container.stop_session()
 
     def setup(self):
         self.container = Container(self.config)
 
+    def configure_project(self, args, device_arch):
+        """ Configures the project for devices of one architecture """
+        self.config = ProjectConfig(args.config)
+        self.config.configure(self.global_config, [args.sub_command], args,
+                              device_arch=device_arch)
+
+    def create_devices(self, args):
+        """ Detects all devices selected by --devices at the same time.
+        Returns the devices and the errors per device that could not be detected. """
+        self.load_configs(args)
+        specs = get_device_specs(args.devices, self.global_config.device.inventory)
+        needs_adb = any(not spec.startswith('ssh:') for spec in specs)
+        adb_serials = get_adb_serials() if needs_adb else []
+        devices = {}
+
+        def create(spec):
+            device_config = DeviceConfig(self.global_config.device.config, args)
+            device_config.select(spec, adb_serials)
+            devices[spec] = Device(device_config)
+
+        errors = run_concurrently(specs, create, args.device_jobs)
+        return {spec: devices[spec] for spec in specs if spec in devices}, errors
+
+    def start_on_devices(self, args):
+        devices, errors = self.create_devices(args)
+
+        by_arch = {}
+        for spec, device in devices.items():
+            by_arch.setdefault(device.device_arch, {})[spec] = device
+
+        # The project is configured once per architecture, devices with the same
+        # architecture share everything that is not device specific (e.g. builds)
+        for arch, arch_devices in by_arch.items():
+            self.configure_project(args, arch)
+            self.setup()
+            try:
+                errors.update(self.run_on_devices(arch_devices, args))
+            finally:
+                if self.container:
+                    self.container.stop_session()
+
+        succeeded = [spec for spec in devices if spec not in errors]
+        logger.info('Device summary:')
+        logger.info('  Succeeded (%s): %s', len(succeeded), ', '.join(succeeded))
+        if errors:
+            logger.info('  Failed (%s): %s', len(errors), ', '.join(errors))
+            raise ClickableException(f'Failed on {len(errors)} device(s)')
+
+    def run_on_devices(self, devices, args):
+        """ Runs the command on each device with its own command instance.
+        Returns the errors per device. """
+        def run(spec):
+            command = type(self)()
+            command.global_config = self.global_config
+            command.config = self.config
+            command.container = self.container
+            command.device = devices[spec]
+
+            command.configure(args)
+            command.check_errors()
+            command.run()
+
+        return run_concurrently(list(devices), run, args.device_jobs)
+
     def confirm(self, message, default=True):
         """ Let user confirm an action. Returns default in non-interactive mode. """
         if not self.config.interactive:
@@ -73,7 +166,7 @@ class Command():
 
     def setup_complete_parser(self, parser):
         if self.command_conf.device_command:
-            DeviceConfig.setup_parser(parser)
+            DeviceConfig.setup_parser(parser, self.command_conf.multi_device)
 
         self.setup_parser(parser)
 
@@ -1,20 +1,28 @@
 import os
 import sys
+import copy
+import glob
+import fnmatch
 import shutil
 from clickable.config.constants import Constants
 
 from clickable.utils import (
     get_builder,
+    get_builders,
+    get_image_hash,
     makedirs,
     is_sub_dir,
     env,
     make_absolute,
 )
 from clickable.container import Container
-from clickable.logger import logger
+from clickable.fingerprint import BuildFingerprint
+from clickable.file_index import clear_file_indexes
+from clickable.logger import logger, log_prefix
+from clickable.parallel import run_dependency_graph, check_dependencies
 from clickable.exceptions import ClickableException
 
-from .base import Command
+from .base import Command, get_requested_archs
 from .review import ReviewCommand
 from .clean import CleanCommand
 
@@ -37,6 +45,8 @@ class BuildCommand(Command):
         self.libs = None
         self.accept_errors = False
         self.accept_warnings = False
+        self.force_review = False
+        self.parallel = None
 
     def setup_parser(self, parser):
         parser.add_argument(
@@ -72,6 +82,11 @@ class BuildCommand(Command):
             help='Return with exit-code 0 even when there are review errors '
             '(implies --accept-review-warnings)'
         )
+        parser.add_argument(
+            '--force-review',
+            action='store_true',
+            help='Run the review even if the same click package has been reviewed before'
+        )
         parser.add_argument(
             '--app',
             action='store_true',
@@ -93,6 +108,88 @@ class BuildCommand(Command):
             'if project contains an app)',
             default=False,
         )
+        parser.add_argument(
+            '--parallel',
+            type=int,
+            metavar='N',
+            help='Build up to N independent libraries or architectures at the same time',
+            default=None,
+        )
+        parser.add_argument(
+            '--all-archs',
+            action='store_true',
+            help='Build for all architectures (armhf, arm64 and amd64) at once',
+            default=False,
+        )
+
+    def start(self, args):
+        archs = get_requested_archs(args)
+
+        if len(archs) > 1:
+            self.start_multi_arch(args, archs)
+        else:
+            super().start(args)
+
+    def start_multi_arch(self, args, archs):
+        commands = {}
+
+        try:
+            for arch in archs:
+                arch_args = copy.copy(args)
+                arch_args.arch = arch
+                arch_args.all_archs = False
+
+                command = BuildCommand(skip_review=self.skip_review, skip_click=self.skip_click)
+                commands[arch] = command
+
+                with log_prefix(arch):
+                    command.parse_common_options(arch_args)
+                    command.setup()
+                    command.configure(arch_args)
+                    command.check_errors()
+
+            self.check_arch_build_dirs(commands)
+
+            jobs = args.parallel if args.parallel else len(archs)
+            if any(command.config.container_mode for command in commands.values()):
+                # Builds share the environment of this process in Container Mode
+                logger.warning('Building architectures sequentially in Container Mode')
+                jobs = 1
+
+            self.build_archs(commands, jobs)
+        finally:
+            for command in commands.values():
+                if command.container:
+                    command.container.stop_session()
+
+    def check_arch_build_dirs(self, commands):
+        build_dirs = {}
+
+        for arch, command in commands.items():
+            configs = [command.config] + command.config.lib_configs
+            for config in configs:
+                build_dir = os.path.normpath(config.build_dir)
+                if build_dir in build_dirs and build_dirs[build_dir] != arch:
+                    raise ClickableException(
+                        f'The build dir "{build_dir}" is used by multiple architectures. '
+                        'Please add the ${ARCH_TRIPLET} placeholder to "build_dir".'
+                    )
+                build_dirs[build_dir] = arch
+
+    def build_archs(self, commands, jobs):
+        results = {}
+
+        def build_arch(arch):
+            results[arch] = 'failed'
+            commands[arch].run()
+            results[arch] = commands[arch].click_path or 'done'
+
+        try:
+            run_dependency_graph(list(commands), {arch: [] for arch in commands},
+                                 build_arch, jobs)
+        finally:
+            summary = [f'{arch}: {results.get(arch, "not built")}' for arch in commands]
+            logger.info('Build summary:\n  %s', '\n  '.join(summary))
 
     def configure(self, args):
         self.clean = args.clean
@@ -102,6 +199,7 @@ class BuildCommand(Command):
         self.debug_build = args.debug
         self.app = args.app
         self.libs = args.libs
+        self.parallel = args.parallel
 
         if (args.all or args.libs is None) and self.config.is_app:
             self.app = True
@@ -117,6 +215,9 @@ class BuildCommand(Command):
         if args.accept_review_errors:
             self.accept_errors = True
 
+        if args.force_review:
+            self.force_review = True
+
         if self.accept_errors:
             self.accept_warnings = True
 
@@ -144,6 +245,12 @@ class BuildCommand(Command):
         if self.config.always_clean or self.config.global_config.build.always_clean:
             self.clean = True
 
+        if self.parallel is None:
+            self.parallel = self.config.global_config.build.parallel_libs
+
+        if self.parallel < 1:
+            raise ClickableException('The number of parallel builds must be at least 1')
+
         if self.config.ignore_review_errors is not None:
             self.accept_errors = self.config.ignore_review_errors
 
@@ -167,6 +274,9 @@ class BuildCommand(Command):
                 self.output_path = output_env
 
     def check_libs(self):
+        check_dependencies([lib.name for lib in self.config.lib_configs],
+                           {lib.name: lib.depends_on for lib in self.config.lib_configs})
+
         if self.libs is not None:
             existing_libs = [lib.name for lib in self.config.lib_configs]
             for lib in self.libs:
@@ -203,18 +313,118 @@ class BuildCommand(Command):
             clean_cmd.run()
 
         filter_libs = self.libs
+        libs = {lib.name: lib for lib in self.config.lib_configs
+                if lib.name in filter_libs or not filter_libs}
+        dependencies = {lib.name: lib.depends_on for lib in self.config.lib_configs}
+
+        jobs = self.parallel or 1
+        if self.config.container_mode and jobs > 1:
+            # Libraries share the environment of this process in Container Mode
+            logger.warning('Building libraries sequentially in Container Mode')
+            jobs = 1
+
+        run_dependency_graph(libs, dependencies, lambda name: self.build_lib(libs[name]), jobs)
+
+    def build_lib(self, lib):
+        container = Container(lib, lib.name)
+
+        fingerprint = self.get_lib_fingerprint(lib, container)
+        if self.is_up_to_date(fingerprint, os.path.isdir(lib.install_dir)):
+            logger.info("%s is up to date, skipping build", lib.name)
+            return
+
+        logger.info("Building %s", lib.name)
+
+        # This is a workaround for lib env vars being overwritten by
+        # project env vars, especially affecting Container Mode.
+        lib.set_env_vars()
+
+        try:
+            self.build(lib, container, is_app=False)
+        finally:
+            container.stop_session()
+
+        self.store_fingerprint(fingerprint, container)
+
+    def get_image_ids(self, container):
+        """ Ids of the images the build runs in or None if they cannot be inspected """
+        if not container.docker_mode:
+            return []
+
+        try:
+            return [get_image_hash(image, container.docker_executable)
+                    for image in [container.docker_image, container.base_docker_image]]
+        except Exception as e:  # pylint: disable=broad-except
+            logger.debug('Failed to inspect the build image: %s', e)
+            return None
+
+    def get_fingerprint(self, config, container):
+        """ Fingerprint of the config, image and build options. Returns None if
+        the image cannot be inspected. """
+        images = self.get_image_ids(container)
+        if images is None:
+            return None
+
+        fingerprint = BuildFingerprint(config.build_dir)
+        fingerprint.add_config(config.config)
+        fingerprint.add_value(self.debug_build)
+        fingerprint.set_images(images)
+
+        return fingerprint
+
+    def store_fingerprint(self, fingerprint, container):
+        """ Stores the fingerprint with the images the build actually ran in, the
+        image setup may have built a new customized image """
+        if not fingerprint:
+            return
+
+        images = self.get_image_ids(container)
+        if images is not None:
+            fingerprint.set_images(images)
+            fingerprint.store()
+
+    def get_lib_fingerprint(self, lib, container):
+        fingerprint = self.get_fingerprint(lib, container)
+        if not fingerprint:
+            return None
+
+        fingerprint.add_tree(lib.src_dir, ignore=['.git', '.bzr', '.clickable'],
+                             exclude_dirs=[lib.build_dir])
+
+        for dep in self.config.lib_configs:
+            if dep.name in lib.depends_on:
+                fingerprint.add_tree(dep.install_dir)
+
+        return fingerprint
+
+    def get_app_fingerprint(self):
+        fingerprint = self.get_fingerprint(self.config, self.container)
+        if not fingerprint:
+            return None
+
+        for value in [self.skip_click, self.skip_review, self.accept_errors,
+                      self.accept_warnings]:
+            fingerprint.add_value(value)
+
+        exclude_dirs = [self.config.build_dir, self.config.install_dir]
+        exclude_dirs += [lib.build_dir for lib in self.config.lib_configs]
+        fingerprint.add_tree(self.config.root_dir, ignore=self.config.ignore,
+                             exclude_dirs=exclude_dirs)
 
         for lib in self.config.lib_configs:
-            if lib.name in filter_libs or not filter_libs:
-                logger.info("Building %s", lib.name)
+            fingerprint.add_tree(lib.install_dir)
 
-                container = Container(lib, lib.name)
+        return fingerprint
 
-                # This is a workaround for lib env vars being overwritten by
-                # project env vars, especially affecting Container Mode.
-                lib.set_env_vars()
+    def is_up_to_date(self, fingerprint, results_exist):
+        if not self.clean and fingerprint and results_exist and fingerprint.matches():
+            return True
+
+        if fingerprint:
+            # Make sure a failing build does not leave a matching fingerprint behind
+            fingerprint.invalidate()
 
-                self.build(lib, container, is_app=False)
+        return False
 
     def build_app(self):
         self.create_lib_build_warning()
@@ -224,6 +434,21 @@ class BuildCommand(Command):
             clean_cmd.init_from_command(self)
             clean_cmd.run()
 
+        fingerprint = self.get_app_fingerprint()
+        results_exist = os.path.isdir(self.config.install_dir) and self.click_exists()
+        if self.is_up_to_date(fingerprint, results_exist):
+            logger.info("App is up to date, skipping build")
+
+            if not self.skip_click:
+                self.click_path = os.path.join(self.config.build_dir,
+                                               self.config.install_files.get_click_filename())
+                self.output_click()
+
+            if self.force_review and not self.skip_review:
+                self.review()
+
+            return
+
         logger.info("Building app")
         self.build(self.config, self.container)
 
@@ -231,12 +456,29 @@ class BuildCommand(Command):
             self.click_build()
 
         if not self.skip_review:
-            review = ReviewCommand()
-            review.init_from_command(self)
-            review.check(
-                self.click_path,
-                raise_on_error=not self.accept_errors,
-                raise_on_warning=not self.accept_warnings)
+            self.review()
+
+        self.store_fingerprint(fingerprint, self.container)
+
+    def review(self):
+        review = ReviewCommand()
+        review.init_from_command(self)
+        review.force = self.force_review
+        review.check(
+            self.click_path,
+            raise_on_error=not self.accept_errors,
+            raise_on_warning=not self.accept_warnings)
+
+    def click_exists(self):
+        if self.skip_click:
+            return True
+
+        try:
+            click = self.config.install_files.get_click_filename()
+        except ClickableException:
+            return False
+
+        return os.path.exists(os.path.join(self.config.build_dir, click))
 
     def build(self, config, container, is_app=True):
         try:
@@ -253,7 +495,8 @@ class BuildCommand(Command):
                 'Failed to create the build home directory: %s', str(sys.exc_info()[0])
             )
 
-        if os.path.isdir(config.install_dir):
+        incremental = get_builders()[config.builder].incremental_install
+        if os.path.isdir(config.install_dir) and not incremental:
             shutil.rmtree(config.install_dir)
 
         try:
@@ -268,22 +511,26 @@ class BuildCommand(Command):
         if config.prebuild:
             run_custom_commands(config.prebuild, config, container)
 
-        run_builder(config, container, self.debug_build)
-
-        if is_app:
-            self.install_additional_files()
+        try:
+            run_builder(config, container, self.debug_build)
 
-        if config.postbuild:
-            run_custom_commands(config.postbuild, config, container)
+            if is_app:
+                self.install_additional_files()
 
-    def install_files(self, pattern, dest_dir, search_dirs=None, install_type=""):
-        if not is_sub_dir(dest_dir, self.config.install_dir):
-            dest_dir = os.path.abspath(self.config.install_dir + "/" + dest_dir)
+            if config.postbuild:
+                run_custom_commands(config.postbuild, config, container)
+        finally:
+            # The build modified the indexed build dirs
+            clear_file_indexes()
 
-        makedirs(dest_dir)
+    def is_host_path(self, path):
+        # Only the project root is mounted into the container (at the same
+        # location), everything else only exists inside the image.
+        return self.config.container_mode or is_sub_dir(path, self.config.root_dir)
 
+    def get_install_queries(self, pattern, search_dirs=None):
         if "'" in pattern:
-            # Make sure one cannot run random bash code through the "ls" command
+            # Make sure one cannot run random bash code through the "find" command
             raise ClickableException(
                 "install_* patterns must not contain the ' quotation character."
             )
@@ -291,46 +538,148 @@ class BuildCommand(Command):
         name = pattern
         if "/" in pattern:
             [parent, name] = make_absolute(pattern).rsplit('/', 1)
-            parent += "/"
+            parents = [parent + "/"]
         else:
-            if not search_dirs:
-                search_dirs = []
-            search_dirs.append(self.config.root_dir)
+            parents = list(search_dirs) if search_dirs else []
+            parents.append(self.config.root_dir)
 
             # deduplicate
-            search_dirs = list(set(search_dirs))
-            parent = " ".join(search_dirs)
-
-        command = f"find {parent} -name '{name}' -maxdepth 1 -mindepth 1"
-        files = self.container.run_command(command, get_output=True).split()
-
-        if not files:
-            raise ClickableException(f'Files to install not found with pattern "{pattern}"')
+            parents = list(dict.fromkeys(parents))
+
+        return [(parent, name) for parent in parents]
+
+    def find_host_files(self, parent, name):
+        files = []
+        for directory in sorted(glob.glob(parent)):
+            if not os.path.isdir(directory):
+                continue
+
+            files += [
+                os.path.join(directory, entry)
+                for entry in sorted(os.listdir(directory))
+                if fnmatch.fnmatchcase(entry, name)
+            ]
+
+        return files
+
+    def find_container_files(self, queries):
+        """ Resolves all queries with a single container run """
+        if not queries:
+            return []
+
+        marker = '@@CLICKABLE_INSTALL_QUERY'
+        commands = [
+            f"echo '{marker}{index}'; "
+            f"find {parent} -name '{name}' -maxdepth 1 -mindepth 1 2>/dev/null || true"
+            for index, (parent, name) in enumerate(queries)
+        ]
+        output = self.container.run_command('; '.join(commands), get_output=True)
+
+        results = [[] for _ in queries]
+        current = None
+        for line in output.splitlines():
+            line = line.strip()
+            if line.startswith(marker):
+                current = int(line[len(marker):])
+            elif line and current is not None:
+                results[current].append(line)
+
+        return results
+
+    def resolve_install_files(self, installs):
+        """ Expands the patterns of all install entries in one pass.
+
+        Each entry is a tuple of (pattern, dest_dir, search_dirs, install_type).
+        Returns a list of (files, dest_dir, install_type) tuples.
+        """
+        queries = [self.get_install_queries(pattern, search_dirs)
+                   for (pattern, _, search_dirs, _) in installs]
+
+        container_queries = [query for entry_queries in queries for query in entry_queries
+                             if not self.is_host_path(query[0])]
+        container_results = dict(zip(container_queries,
+                                     self.find_container_files(container_queries)))
+
+        resolved = []
+        for (pattern, dest_dir, _, install_type), entry_queries in zip(installs, queries):
+            files = []
+            for query in entry_queries:
+                if query in container_results:
+                    files += container_results[query]
+                else:
+                    files += self.find_host_files(*query)
+
+            if not files:
+                raise ClickableException(f'Files to install not found with pattern "{pattern}"')
+
+            if not is_sub_dir(dest_dir, self.config.install_dir):
+                dest_dir = os.path.abspath(self.config.install_dir + "/" + dest_dir)
+
+            resolved.append((list(dict.fromkeys(files)), dest_dir, install_type))
+
+        return resolved
+
+    def copy_install_files(self, resolved):
+        """ Copies the files in the order of the install entries, so that later
+        entries overwrite earlier ones. Consecutive files that only exist in
+        the container are copied by a single container run. """
+        container_commands = []
+
+        def queue_container_copy(files, dest_dir):
+            if files:
+                files_joined = " ".join(files)
+                container_commands.append(
+                    f"cp --recursive --no-dereference {files_joined} {dest_dir}")
+
+        def copy_in_container():
+            if container_commands:
+                self.container.run_command(" && ".join(container_commands))
+                container_commands.clear()
+
+        for (files, dest_dir, install_type) in resolved:
+            logger.info("Installing %s\n  %s", install_type, "\n  ".join(files))
+            makedirs(dest_dir)
+
+            container_files = []
+            for f in files:
+                if self.is_host_path(f):
+                    queue_container_copy(container_files, dest_dir)
+                    container_files = []
+
+                    copy_in_container()
+                    copy_no_dereference(f, dest_dir)
+                else:
+                    container_files.append(f)
+
+            queue_container_copy(container_files, dest_dir)
+
+        copy_in_container()
+
+    def read_qmldir(self, module_dir):
+        qmldir_file = os.path.join(module_dir, 'qmldir')
+
+        if self.is_host_path(qmldir_file):
+            if not os.path.isfile(qmldir_file):
+                raise ClickableException(f'QML module file "{qmldir_file}" not found')
+
+            with open(qmldir_file, 'r', encoding='UTF-8') as f:
+                return f.read()
+
+        return self.container.run_command(f'cat {qmldir_file}', get_output=True)
+
+    def get_qml_install(self, pattern, dest_dir):
+        if '*' in pattern:
+            return (pattern, dest_dir, None, "")
 
-        logger.info("Installing %s\n  %s", install_type, "\n  ".join(files))
+        module = None
+        for line in self.read_qmldir(pattern).split('\n'):
+            if line.startswith('module'):
+                module = line.split(' ')[1]
 
-        files_joined = " ".join(files)
-        self.container.run_command(f"cp --recursive --no-dereference {files_joined} {dest_dir}")
+        if module:
+            dest_dir = os.path.join(dest_dir, *module.split('.')[:-1])
 
-    def install_qml_files(self, pattern, dest_dir):
-        if '*' in pattern:
-            self.install_files(pattern, dest_dir)
-        else:
-            qmldir_file = os.path.join(pattern, 'qmldir')
-            command = f'cat {qmldir_file}'
-            qmldir = self.container.run_command(command, get_output=True)
-            module = None
-            for line in qmldir.split('\n'):
-                if line.startswith('module'):
-                    module = line.split(' ')[1]
-
-            install_type = "QML modules"
-            if module:
-                self.install_files(pattern, os.path.join(
-                    dest_dir, *module.split('.')[:-1]), install_type=install_type
-                )
-            else:
-                self.install_files(pattern, dest_dir, install_type=install_type)
+        return (pattern, dest_dir, None, "QML modules")
 
     def join_libs(self, dirs):
         lib_bin_dirs = []
@@ -341,7 +690,7 @@ class BuildCommand(Command):
 
     def get_library_dirs(self):
         command = "readlink -e $(cat /etc/ld.so.conf.d/*.conf) || true"
-        dirs = self.container.run_command(command, get_output=True).splitlines()
+        dirs = self.container.probe(command).splitlines()
         dirs += self.join_libs(dirs)
 
         for lib in self.config.lib_configs:
@@ -356,35 +705,38 @@ class BuildCommand(Command):
 
     def get_bin_dirs(self):
         command = "echo ${PATH}"
-        dirs = self.container.run_command(command, get_output=True).split(":")
+        dirs = self.container.probe(command).strip().split(":")
         dirs += self.join_libs(dirs)
 
         return [d for d in dirs if os.path.isdir(d)]
 
     def install_additional_files(self):
+        installs = []
+
         for p in self.config.install_root_data:
-            self.install_files(p, self.config.install_dir, "root data")
+            installs.append((p, self.config.install_dir, None, "root data"))
 
         if self.config.install_lib:
             lib_dirs = self.get_library_dirs()
+            lib_dest = os.path.join(self.config.install_dir, self.config.app_lib_dir)
             for p in self.config.install_lib:
-                self.install_files(p, os.path.join(self.config.install_dir,
-                                                   self.config.app_lib_dir), lib_dirs, "libraries")
+                installs.append((p, lib_dest, lib_dirs, "libraries"))
 
         if self.config.install_bin:
             bin_dirs = self.get_bin_dirs()
+            bin_dest = os.path.join(self.config.install_dir, self.config.app_bin_dir)
             for p in self.config.install_bin:
-                self.install_files(p, os.path.join(self.config.install_dir,
-                                                   self.config.app_bin_dir), bin_dirs, "binaries")
+                installs.append((p, bin_dest, bin_dirs, "binaries"))
 
+        qml_dest = os.path.join(self.config.install_dir, self.config.app_qml_dir)
         for p in self.config.install_qml:
-            self.install_qml_files(p, os.path.join(
-                self.config.install_dir,
-                self.config.app_qml_dir)
-            )
+            installs.append(self.get_qml_install(p, qml_dest))
 
         for p, dest in self.config.install_data.items():
-            self.install_files(p, dest, "data")
+            installs.append((p, dest, None, "data"))
+
+        if installs:
+            self.copy_install_files(self.resolve_install_files(installs))
 
     def set_arch(self, manifest):
         arch = manifest.get('architecture', None)
@@ -472,9 +824,11 @@ class BuildCommand(Command):
 
         click = self.config.install_files.get_click_filename()
         self.click_path = os.path.join(self.config.build_dir, click)
+        self.output_click()
 
+    def output_click(self):
         if self.output_path:
-            output_file = os.path.join(self.output_path, click)
+            output_file = os.path.join(self.output_path, os.path.basename(self.click_path))
 
             if not os.path.exists(self.output_path):
                 makedirs(self.output_path)
@@ -504,4 +858,18 @@ def run_custom_commands(commands, config, container):
 
 def run_builder(config, container, debug_build):
     builder = get_builder(config, container, debug_build)
+    compiler_cache_stats = builder.read_compiler_cache_stats()
     builder.build()
+    builder.show_compiler_cache_stats(compiler_cache_stats)
+
+
+def copy_no_dereference(src, dest_dir):
+    """ Behaves like "cp --recursive --no-dereference src dest_dir" """
+    dst = os.path.join(dest_dir, os.path.basename(src.rstrip('/')))
+
+    if os.path.isdir(src) and not os.path.islink(src):
+        shutil.copytree(src, dst, symlinks=True, dirs_exist_ok=True)
+    else:
+        if os.path.lexists(dst) and not os.path.isdir(dst):
+            os.remove(dst)
+        shutil.copy(src, dst, follow_symlinks=False)
@@ -1,7 +1,13 @@
+import copy
+import functools
+import itertools
+
 from clickable.exceptions import ClickableException
 from clickable.utils import env, flexible_string_to_list
 from clickable.command_utils import get_commands
+from clickable.config.project import ProjectConfig
 from clickable.logger import logger
+from clickable.parallel import run_concurrently
 
 from .base import Command
 
@@ -13,6 +19,7 @@ class ChainCommand(Command):
         self.cli_conf.name = 'chain'
         self.cli_conf.help_msg = 'Run a chain of commands'
         self.command_conf.device_command = True
+        self.command_conf.multi_device = True
 
         self.run_commands = []
         self.commands = []
@@ -33,7 +40,19 @@ class ChainCommand(Command):
 
     def parse_common_options(self, args):
         self.load_configs(args)
+        self.parse_run_commands(args)
+
+        self.create_device(args)
+        device_arch = self.device.device_arch if self.device else None
 
+        self.config.configure(
+            self.global_config,
+            self.run_commands,
+            args,
+            always_clean=args.clean,
+            device_arch=device_arch)
+
+    def parse_run_commands(self, args):
         default_env = env('CLICKABLE_DEFAULT')
         self.commands = {c.cli_conf.name: c for c in get_commands()}
 
@@ -59,9 +78,10 @@ class ChainCommand(Command):
             if self.commands[cmd].command_conf.arch_specific:
                 self.command_conf.arch_specific = True
 
-        self.create_device(args)
-        device_arch = self.device.device_arch if self.device else None
+    def configure_project(self, args, device_arch):
+        self.parse_run_commands(args)
 
+        self.config = ProjectConfig(args.config)
         self.config.configure(
             self.global_config,
             self.run_commands,
@@ -81,3 +101,43 @@ class ChainCommand(Command):
             command = self.commands[run]
             command.init_from_command(self)
             command.run()
+
+    def run_on_devices(self, devices, args):
+        """ Runs commands that do not need a device once, device commands on
+        all devices at the same time. A device that fails is skipped for the
+        remaining commands. """
+        logger.info('Going to run all of "%s"', '", "'.join(self.run_commands))
+        errors = {}
+
+        def is_device_command(name):
+            return self.commands[name].command_conf.device_command
+
+        for device_step, names in itertools.groupby(self.run_commands, is_device_command):
+            names = list(names)
+
+            if not device_step:
+                for run in names:
+                    logger.info('Running command "%s"', run)
+
+                    command = self.commands[run]
+                    command.init_from_command(self)
+                    command.run()
+                continue
+
+            remaining = [spec for spec in devices if spec not in errors]
+            run_steps = functools.partial(self.run_on_device, devices, names)
+            errors.update(run_concurrently(remaining, run_steps, args.device_jobs))
+
+        return errors
+
+    def run_on_device(self, devices, names, spec):
+        chain = copy.copy(self)
+        chain.device = devices[spec]
+
+        for run in names:
+            logger.info('Running command "%s"', run)
+
+            # Each device needs its own instances as commands keep state
+            command = type(self.commands[run])()
+            command.init_from_command(chain)
+            command.run()
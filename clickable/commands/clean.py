@@ -1,9 +1,11 @@
 import os
 import shutil
+import stat
 
 from clickable.logger import logger
 from clickable.exceptions import ClickableException
 from clickable.config.constants import Constants
+from clickable.file_index import clear_file_indexes
 
 from .base import Command
 
@@ -22,6 +24,7 @@ class CleanCommand(Command):
         self.app_data = False
         self.desktop_home = False
         self.go_path = False
+        self.go_cache = False
         self.cargo_cache = False
         self.clickable_dir = False
 
@@ -83,6 +86,12 @@ class CleanCommand(Command):
             help='Clean GOPATH',
             default=False,
         )
+        parser.add_argument(
+            '--go-cache',
+            action='store_true',
+            help='Clean Go build and module cache',
+            default=False,
+        )
         parser.add_argument(
             '--cargo-cache',
             action='store_true',
@@ -93,7 +102,7 @@ class CleanCommand(Command):
             '--clickable-dir',
             action='store_true',
             help='Clean Clickable directory containing Clickable config, \
-                    GOPATH, cargo cache and other Clickable related data. \
+                    GOPATH, Go cache, cargo cache and other Clickable related data. \
                     This is like a Clickable factory reset, except for the \
                     project specific data',
             default=False,
@@ -106,6 +115,7 @@ class CleanCommand(Command):
         (self.app_data, default) = is_set(args.app_data, default)
         (self.desktop_home, default) = is_set(args.desktop_home, default)
         (self.go_path, default) = is_set(args.go_path, default)
+        (self.go_cache, default) = is_set(args.go_cache, default)
         (self.cargo_cache, default) = is_set(args.cargo_cache, default)
         (self.clickable_dir, default) = is_set(args.clickable_dir, default)
 
@@ -170,6 +180,10 @@ class CleanCommand(Command):
             logger.info("Cleaning GOPATH")
             for path in self.config.gopath.split(':'):
                 clean(path)
+        if self.go_cache:
+            logger.info("Cleaning Go cache")
+            clean(Constants.go_cache_dir)
+            clean(Constants.go_mod_cache_dir)
         if self.cargo_cache:
             logger.info("Cleaning cargo cache")
             clean(self.config.cargo_home)
@@ -213,6 +227,17 @@ def is_set(val, default):
 def clean(path):
     if os.path.exists(path):
         logger.info("  Deleting directory %s", path)
-        shutil.rmtree(path)
+        try:
+            shutil.rmtree(path)
+        except PermissionError:
+            # Go makes its module cache read-only
+            make_writable(path)
+            shutil.rmtree(path)
+        clear_file_indexes()
     else:
         logger.info("  Nothing to clean, %s doesn't exist", path)
+
+
+def make_writable(path):
+    for root, _, _ in os.walk(path):
+        os.chmod(root, os.stat(root).st_mode | stat.S_IWUSR)
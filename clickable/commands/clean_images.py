@@ -1,9 +1,10 @@
 import re
 
+from clickable import docker_api
 from clickable.utils import (
+    format_size,
     get_docker_command,
-    image_based_on,
-    image_exists,
+    inspect_images,
     run_subprocess_check_call,
     run_subprocess_check_output,
 )
@@ -40,26 +41,24 @@ class CleanImagesCommand(Command):
 
         image_format = r'clickable\/\w{5}-(?:ut|)\d\d\.\d\d(?:-\d\.\w|)-\w{5}'
         pattern_base = re.compile(image_format)
-        pattern_derived = re.compile(image_format + r'-\w{8}[-\w]+')
+        pattern_derived = re.compile(image_format + r'(?::[\w.]+)?-\w{8}[-\w]+')
 
-        base_images = Constants.container_mapping[Constants.host_arch].values()
-        base_images = [(img, pattern_base.search(img).group())
-                       for img in base_images if image_exists(img, docker_executable)]
+        base_names = Constants.container_mapping[Constants.host_arch].values()
+        base_results = inspect_images(base_names, docker_executable)
+        base_images = [(pattern_base.search(img).group(), result['Id'])
+                       for img, result in base_results.items() if result]
 
-        images = []
-        query_args = 'images --format {{.Repository}}'
-        images_raw = run_subprocess_check_output(f'{docker_executable} {query_args}').strip()
-        images_all = pattern_derived.findall(images_raw)
+        query_args = "images --format '{{.Repository}}:{{.Tag}}'"
+        images_raw = run_subprocess_check_output(f'{docker_executable} {query_args}').split()
+        images_all = [img for img in images_raw if pattern_derived.search(img)]
 
         logger.info("%i Clickable docker images found in total", len(images_all))
 
+        results = inspect_images(images_all, docker_executable)
         if self.all:
             images = images_all
         else:
-            logger.info("Checking which images are obsolete. This may take a while...")
-            images = [
-                img for img in images_all if is_obsolete(
-                    img, base_images, docker_executable)]
+            images = [img for img in images_all if is_obsolete(img, results[img], base_images)]
             if images:
                 logger.info("Found %i outdated images", len(images))
 
@@ -67,11 +66,16 @@ class CleanImagesCommand(Command):
             logger.info('No obsolete images found')
             return
 
+        reclaimable = get_reclaimable_size([results[img] for img in images], docker_executable)
+        logger.info('About %s can be reclaimed', format_size(reclaimable))
+
         images_string = ' '.join(images)
         delete_command = f"{docker_executable} rmi {images_string}"
 
         if self.confirm("Delete images?"):
             run_subprocess_check_call(delete_command)
+            for img in images:
+                docker_api.invalidate_images(img)
             prune_command = f"{docker_executable} system prune"
             logger.info(
                 'Finished. You may run "%s" to free some space.',
@@ -83,13 +87,38 @@ class CleanImagesCommand(Command):
             logger.info("skipped")
 
 
-def is_obsolete(img, base_images, docker_executable):
-    return all(not is_based_on(img, base, docker_executable) for base in base_images)
+def get_base_image_hash(result):
+    if not result:
+        return None
+
+    labels = (result.get('Config', None) or {}).get('Labels', None) or {}
+    return labels.get('base_image_hash', None)
+
+
+def is_obsolete(img, result, base_images):
+    return all(not is_based_on(img, result, base) for base in base_images)
+
+
+def is_based_on(img, result, base):
+    (base_trunc, base_hash) = base
+
+    # Podman lists images with their registry
+    name = img[len('docker.io/'):] if img.startswith('docker.io/') else img
+
+    return name.startswith(base_trunc) and get_base_image_hash(result) == base_hash
+
+
+def get_reclaimable_size(results, docker_executable):
+    """ Estimates the size of all layers that are not part of the base images """
+    base_hashes = {get_base_image_hash(result) for result in results} - {None}
+    base_results = inspect_images(base_hashes, docker_executable)
 
+    size = 0
+    for result in results:
+        if not result:
+            continue
 
-def is_based_on(img, base, docker_executable):
-    # The only reason for this wrapper around image_based_on is the performance
-    # bonus from checking the name against the base name first
+        base = base_results.get(get_base_image_hash(result), None)
+        size += result.get('Size', 0) - (base.get('Size', 0) if base else 0)
 
-    (base_img, base_trunc) = base
-    return img.startswith(base_trunc) and image_based_on(img, base_img, docker_executable)
+    return max(size, 0)
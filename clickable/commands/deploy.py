@@ -0,0 +1,232 @@
+import hashlib
+import json
+import os
+import re
+import shlex
+import subprocess
+import tarfile
+import tempfile
+
+from clickable.config.constants import Constants
+from clickable.exceptions import ClickableException
+from clickable.logger import logger
+
+from .base import Command
+from .install import InstallCommand
+from .launch import LaunchCommand
+
+
+def hash_file(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(chunk)
+
+    return sha.hexdigest()
+
+
+def get_file_manifest(root, previous=None):
+    """ Returns {relative path: [size, mtime, sha256]} for all files below root.
+    Files whose size and modification time did not change since the previous
+    manifest are not read again. Symlinks (also to directories) are recorded
+    with their target instead of being followed. """
+    previous = previous if previous else {}
+    manifest = {}
+
+    for directory, dirs, files in os.walk(root):
+        # os.walk lists symlinked directories in dirs without descending into them
+        links = [name for name in dirs if os.path.islink(os.path.join(directory, name))]
+
+        for name in files + links:
+            path = os.path.join(directory, name)
+            rel_path = os.path.relpath(path, root)
+            stat = os.lstat(path)
+
+            if os.path.islink(path):
+                digest = f'link:{os.readlink(path)}'
+            else:
+                old = previous.get(rel_path, None)
+                if old and old[:2] == [stat.st_size, stat.st_mtime_ns]:
+                    digest = old[2]
+                else:
+                    digest = hash_file(path)
+
+            manifest[rel_path] = [stat.st_size, stat.st_mtime_ns, digest]
+
+    return manifest
+
+
+def get_changed_files(old_manifest, manifest):
+    return [path for path, entry in manifest.items()
+            if path not in old_manifest or old_manifest[path][2] != entry[2]]
+
+
+class DeployCommand(Command):
+    def __init__(self):
+        super().__init__()
+        self.cli_conf.name = 'deploy'
+        self.cli_conf.help_msg = 'Installs the built app on a device and launches it'
+        self.command_conf.device_command = True
+        self.command_conf.multi_device = True
+        self.command_conf.arch_specific = True
+
+        self.delta = False
+
+    def setup_parser(self, parser):
+        parser.add_argument(
+            '--delta',
+            action='store_true',
+            help='Only copy files changed since the last deploy to the device and build '
+                 'the click package there'
+        )
+
+    def configure(self, args):
+        self.delta = args.delta
+
+    def get_state_path(self):
+        device_id = re.sub(r'[^\w.-]', '_', self.device.get_identifier())
+        return os.path.join(self.config.build_dir, '.clickable', 'deploy', f'{device_id}.json')
+
+    def load_state(self):
+        path = self.get_state_path()
+        if not os.path.exists(path):
+            return None
+
+        with open(path, 'r', encoding='UTF-8') as f:
+            try:
+                return json.load(f)
+            except ValueError:
+                logger.debug('Deploy state file is invalid')
+                return None
+
+    def write_state(self, state):
+        path = self.get_state_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with open(path, 'w', encoding='UTF-8') as f:
+            json.dump(state, f)
+
+    def remove_state(self):
+        path = self.get_state_path()
+        if os.path.exists(path):
+            os.remove(path)
+
+    def get_deploy_dir(self):
+        return os.path.join(Constants.device_home, '.cache', 'clickable', 'deploy')
+
+    def get_staging_dir(self):
+        """ Copy of the install dir on the device, writable by the device user """
+        package_name = self.config.install_files.find_package_name()
+        return os.path.join(self.get_deploy_dir(), package_name)
+
+    def query_staging_dir(self):
+        """ Returns the id of the staging dir, which changes if it is recreated,
+        or None if it does not exist or cannot be queried """
+        try:
+            output = self.device.run_command(
+                f'stat -c %i {self.get_staging_dir()} 2>/dev/null || echo missing',
+                get_output=True)
+        except (subprocess.CalledProcessError, ClickableException, OSError) as e:
+            logger.warning('Failed to query the copy of the app on the device: %s', e)
+            return None
+
+        dir_id = output.split()[-1] if output.split() else None
+        return None if dir_id == 'missing' else dir_id
+
+    def get_hook_files(self):
+        """ Files processed when installing the app, changing them requires an uninstall
+        to apply e.g. new AppArmor permissions without a version change """
+        hooks = self.config.install_files.get_manifest().get('hooks', {})
+        files = {'manifest.json'}
+
+        for hook in hooks.values():
+            files.update(path.lstrip('/') for path in hook.values() if isinstance(path, str))
+
+        return files
+
+    def get_sync_blocker(self, state):
+        """ Returns why only the changed files cannot be copied to the device or None """
+        if not state:
+            return 'no previous deploy to this device'
+
+        if self.query_staging_dir() != state['dir_id']:
+            return 'the copy of the app on the device was removed'
+
+        return None
+
+    def push_changes(self, changed, removed, full):
+        """ Updates the staging dir and returns its id """
+        staging_dir = self.get_staging_dir()
+        commands = []
+
+        if full:
+            commands.append(f'rm -rf {staging_dir} && mkdir -p {staging_dir}')
+
+        if removed:
+            paths = ' '.join(shlex.quote(f'{staging_dir}/{path}') for path in sorted(removed))
+            commands.append(f'rm -f {paths}')
+
+        if changed:
+            with tempfile.TemporaryDirectory() as temp_dir:
+                archive = os.path.join(temp_dir, 'delta.tar.gz')
+                with tarfile.open(archive, 'w:gz', compresslevel=1) as tar:
+                    for path in sorted(changed):
+                        tar.add(os.path.join(self.config.install_dir, path), arcname=path)
+
+                dst_path = os.path.join(self.get_deploy_dir(), 'delta.tar.gz')
+                self.device.push_file(archive, dst_path)
+
+            commands.append(f'tar -xzf {dst_path} -m -C {staging_dir}/ && rm {dst_path}')
+
+        commands.append(f'stat -c %i {staging_dir}')
+        output = self.device.run_command(' && '.join(commands), get_output=True)
+        return output.split()[-1]
+
+    def deploy_delta(self):
+        state = self.load_state()
+        blocker = self.get_sync_blocker(state)
+        old_files = state['files'] if state else {}
+
+        if blocker:
+            logger.info('Copying all files to the device, %s', blocker)
+            old_files = {}
+
+        manifest = get_file_manifest(self.config.install_dir, old_files)
+        changed = get_changed_files(old_files, manifest)
+        removed = [path for path in old_files if path not in manifest]
+
+        logger.info('Deploying %s changed and %s removed files', len(changed), len(removed))
+
+        # The staging dir is in an unknown state until the changes are applied
+        self.remove_state()
+        dir_id = self.push_changes(changed, removed, full=bool(blocker))
+        self.write_state({'dir_id': dir_id, 'files': manifest})
+
+        # The click package is built from the staging dir, so the installed app
+        # always matches the manifest
+        click = self.config.install_files.get_click_filename()
+        self.device.run_command(
+            f'cd {self.get_deploy_dir()} && click build {self.get_staging_dir()} --no-validate',
+            get_output=True)
+
+        install = InstallCommand()
+        install.init_from_command(self)
+        if not blocker and not set(changed + removed) & self.get_hook_files():
+            install.skip_uninstall = True
+        install.install_pushed_click(os.path.join(self.get_deploy_dir(), click))
+
+    def run(self):
+        if self.config.is_desktop_mode() or self.config.container_mode:
+            logger.debug('Skipping deploy, running in desktop or container mode')
+            return
+
+        if self.delta:
+            self.deploy_delta()
+        else:
+            install = InstallCommand()
+            install.init_from_command(self)
+            install.run()
+
+        launch = LaunchCommand()
+        launch.init_from_command(self)
+        launch.run()
@@ -15,6 +15,7 @@ except ImportError:
 
 from clickable.utils import (
     find_pattern,
+    inspect_existing_image,
     is_command,
     makedirs,
     pull_image,
@@ -369,10 +370,9 @@ class DesktopCommand(Command):
     def get_image_path_var(self):
         pull_image(self.config.docker_image)
 
-        command = f"{self.container.docker_executable} inspect -f "\
-            "'{{range $index, $value := .Config.Env}}{{println $value}}{{end}}' " \
-            f"{self.config.docker_image}"
-        image_env = run_subprocess_check_output(command).splitlines()
+        image = inspect_existing_image(self.config.docker_image,
+                                       self.container.docker_executable)
+        image_env = (image.get('Config', None) or {}).get('Env', None) or []
         for var in image_env:
             if var.startswith("PATH="):
                 return ":" + var.rsplit("=", 1)[1]
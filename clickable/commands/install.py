@@ -12,6 +12,7 @@ class InstallCommand(Command):
         self.cli_conf.name = 'install'
         self.cli_conf.help_msg = 'Takes a built click package and installs it on a device'
         self.command_conf.device_command = True
+        self.command_conf.multi_device = True
         self.command_conf.arch_specific = True
 
         self.click_path = None
@@ -93,7 +94,10 @@ class InstallCommand(Command):
 
         dst_path = os.path.join(Constants.device_home, click)
         self.device.push_file(self.click_path, dst_path)
+        self.install_pushed_click(dst_path, cwd)
 
+    def install_pushed_click(self, dst_path, cwd='.'):
+        """ Installs a click package that is already on the device and removes it """
         if self.skip_uninstall:
             logger.info("Skipping uninstall pre-step.")
         else:
@@ -103,7 +107,7 @@ class InstallCommand(Command):
 
         if self.config.framework_base == '16.04':
             logger.debug("Using UT 16.04 install command")
-            command = ['pkcon', 'install-local', '--allow-untrusted', f'/home/phablet/{click}']
+            command = ['pkcon', 'install-local', '--allow-untrusted', dst_path]
         else:
             logger.debug("Using UT 20.04 install command")
             command = [
@@ -113,7 +117,7 @@ class InstallCommand(Command):
                 '--dest com.lomiri.click',
                 '--object-path /com/lomiri/click',
                 '--method com.lomiri.click.Install',
-                f'/home/phablet/{click}']
+                dst_path]
 
         command = ' '.join(command)
         self.device.run_command(command, cwd=cwd)
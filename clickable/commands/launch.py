@@ -9,6 +9,7 @@ class LaunchCommand(Command):
         self.cli_conf.name = 'launch'
         self.cli_conf.help_msg = 'Launches the app on a device'
         self.command_conf.device_command = True
+        self.command_conf.multi_device = True
 
         self.package = None
         self.skip_kill = False
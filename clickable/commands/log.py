@@ -9,6 +9,7 @@ class LogCommand(Command):
         self.cli_conf.name = 'log'
         self.cli_conf.help_msg = 'Outputs the existing app\'s log from the device'
         self.command_conf.device_command = True
+        self.command_conf.multi_device = True
 
     def run(self):
         if self.config.is_desktop_mode():
@@ -1,10 +1,29 @@
 import os
+import json
+import hashlib
 import subprocess
 
 from clickable.logger import logger
+from clickable.parallel import print_prefixed
+from clickable.utils import get_image_hash
 
 from .base import Command
 
+# Number of review results kept in the build dir, the least recently used are removed
+REVIEW_CACHE_SIZE = 20
+
+
+def prune_review_cache(cache_dir):
+    try:
+        files = [entry for entry in os.scandir(cache_dir) if entry.name.endswith('.json')]
+    except OSError:
+        return
+
+    files.sort(key=lambda entry: entry.stat().st_mtime_ns, reverse=True)
+    for entry in files[REVIEW_CACHE_SIZE:]:
+        logger.debug('Removing cached review result %s', entry.name)
+        os.remove(entry.path)
+
 
 class ReviewCommand(Command):
     def __init__(self):
@@ -15,6 +34,7 @@ class ReviewCommand(Command):
         self.click = None
         self.accept_errors = False
         self.accept_warnings = False
+        self.force = False
 
     def setup_parser(self, parser):
         parser.add_argument(
@@ -32,11 +52,17 @@ class ReviewCommand(Command):
             action='store_true',
             help='Return with exit-code 0 even when there are errors (implies --accept-warnings)'
         )
+        parser.add_argument(
+            '--force-review',
+            action='store_true',
+            help='Run the review even if the same click package has been reviewed before'
+        )
 
     def configure(self, args):
         self.click = args.click
         self.accept_errors = args.accept_errors
         self.accept_warnings = self.accept_errors or args.accept_warnings
+        self.force = args.force_review
 
     def check(self, path=None, raise_on_error=False, raise_on_warning=False):
         if path:
@@ -53,11 +79,15 @@ class ReviewCommand(Command):
 
         try:
             logger.info("Running review on %s", click_path)
-            self.container.run_command(
-                f'click-review {click_path}',
-                use_build_dir=False,
-                cwd=cwd
-            )
+
+            if os.path.isfile(click_path):
+                self.cached_review(click_path, cwd)
+            else:
+                self.container.run_command(
+                    f'click-review {click_path}',
+                    use_build_dir=False,
+                    cwd=cwd
+                )
         except subprocess.CalledProcessError as e:
             if e.returncode == 2 and not raise_on_error:
                 pass
@@ -66,6 +96,66 @@ class ReviewCommand(Command):
             else:
                 raise e
 
+    def get_review_cache_file(self, click_path):
+        sha = hashlib.sha256()
+        with open(click_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                sha.update(chunk)
+
+        if self.container.docker_mode:
+            # The review depends on the click-review version in the image
+            sha.update(get_image_hash(self.container.docker_image,
+                                      self.container.docker_executable).encode())
+
+        return os.path.join(self.config.build_dir, '.clickable', 'review-cache',
+                            f'{sha.hexdigest()}.json')
+
+    def cached_review(self, click_path, cwd):
+        """ Runs click-review, replaying the result of a previous review of
+        the same click package if there is one """
+        cache_file = self.get_review_cache_file(click_path)
+        result = None
+
+        if not self.force and os.path.exists(cache_file):
+            with open(cache_file, 'r', encoding='UTF-8') as f:
+                try:
+                    result = json.load(f)
+                    logger.info("Using cached review result")
+                except ValueError:
+                    logger.debug("Review cache file is invalid")
+
+            if result:
+                # Keeps recently used results from being pruned
+                os.utime(cache_file)
+
+        if not result:
+            result = {'returncode': 0, 'output': ''}
+            try:
+                result['output'] = self.container.run_command(
+                    f'click-review {click_path} 2>&1',
+                    get_output=True,
+                    use_build_dir=False,
+                    cwd=cwd
+                )
+            except subprocess.CalledProcessError as e:
+                result['returncode'] = e.returncode
+                result['output'] = e.output.decode(errors='replace') if e.output else ''
+
+            # Other return codes indicate click-review itself failed
+            if result['returncode'] in [0, 2, 3]:
+                os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+                with open(cache_file, 'w', encoding='UTF-8') as f:
+                    json.dump(result, f)
+
+                prune_review_cache(os.path.dirname(cache_file))
+
+        # Prefixed like all other output of parallel builds
+        if result['output']:
+            print_prefixed(result['output'].rstrip('\n'))
+
+        if result['returncode'] != 0:
+            raise subprocess.CalledProcessError(result['returncode'], 'click-review')
+
     def run(self):
         self.check(
             path=self.click,
@@ -107,7 +107,10 @@ class TestCommand(Command):
         # project env vars, especially affecting Container Mode.
         lib.set_env_vars()
 
-        run_test(lib.container, lib, is_app=False)
+        try:
+            run_test(lib.container, lib, is_app=False)
+        finally:
+            lib.container.stop_session()
 
 
 def run_test(container, config, is_app=True):
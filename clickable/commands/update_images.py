@@ -1,6 +1,14 @@
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 from clickable.config.constants import Constants
-from clickable.logger import logger
+from clickable.exceptions import ClickableException
+from clickable.logger import logger, log_prefix
+from clickable.parallel import captured_output
 from clickable.utils import (
+    get_image_hash,
     pull_image,
     image_exists,
 )
@@ -8,6 +16,55 @@ from clickable.utils import (
 from .base import Command
 from .clean_images import CleanImagesCommand
 
+# Lines of the pull output shown for a failed pull
+FAILED_OUTPUT_LINES = 5
+# Errors that only fail the update of a single image
+UPDATE_ERRORS = (subprocess.CalledProcessError, ClickableException, OSError)
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    return f'{minutes}m {seconds:02d}s' if minutes else f'{seconds}s'
+
+
+class PullProgress():
+    """ Status of all images being updated, reported as one line whenever
+    an image starts or finishes """
+
+    def __init__(self, images):
+        self.states = dict.fromkeys(images, 'waiting')
+        self.started = {}
+        self.durations = {}
+        self.lock = threading.Lock()
+
+    def get_images(self, state):
+        return [image for image, current in self.states.items() if current == state]
+
+    def start(self, image):
+        with self.lock:
+            self.states[image] = 'pulling'
+            self.started[image] = time.monotonic()
+            self.report(image)
+
+    def finish(self, image, state):
+        with self.lock:
+            self.states[image] = state
+            self.durations[image] = time.monotonic() - self.started[image]
+            self.report(image)
+
+    def report(self, image):
+        state = self.states[image]
+        if image in self.durations:
+            state = f'{state} after {format_duration(self.durations[image])}'
+
+        pulling = len(self.get_images('pulling'))
+        waiting = len(self.get_images('waiting'))
+        done = len(self.states) - pulling - waiting
+
+        log = logger.error if self.states[image] == 'failed' else logger.info
+        log('[%i/%i] %s: %s (%i pulling, %i waiting)', done, len(self.states), image, state,
+            pulling, waiting)
+
 
 class UpdateCommand(Command):
     def __init__(self):
@@ -18,6 +75,7 @@ class UpdateCommand(Command):
             'already been used. This does not update Clickable itself.'
 
         self.auto_clean = False
+        self.jobs = 3
 
     def setup_parser(self, parser):
         parser.add_argument(
@@ -26,17 +84,74 @@ class UpdateCommand(Command):
             help='Clean images after finishing update without asking.',
             default=False,
         )
+        parser.add_argument(
+            '--jobs',
+            '-j',
+            type=int,
+            help='Number of images to pull at the same time (default: 3)',
+            default=3,
+        )
 
     def configure(self, args):
         self.auto_clean = args.clean
+        self.jobs = args.jobs
+
+        if self.jobs < 1:
+            raise ClickableException('The number of jobs must be at least 1')
+
+    def update_image(self, image):
+        """ Pulls the image and returns whether it changed """
+        old_hash = get_image_hash(image)
+        pull_image(image, skip_existing=False)
+        return get_image_hash(image) != old_hash
+
+    def update_image_tracked(self, image, progress):
+        """ Updates the image, showing its pull output only if pulling one
+        image at a time or if the pull failed """
+        progress.start(image)
+
+        try:
+            if self.jobs == 1:
+                changed = self.update_image(image)
+            else:
+                with log_prefix(image), captured_output() as output:
+                    try:
+                        changed = self.update_image(image)
+                    except UPDATE_ERRORS:
+                        for line in output[-FAILED_OUTPUT_LINES:]:
+                            logger.error('%s', line)
+                        raise
+        except UPDATE_ERRORS as e:
+            logger.error('Failed to update %s: %s', image, e)
+            progress.finish(image, 'failed')
+            return
+
+        progress.finish(image, 'pulled' if changed else 'up to date')
 
     def run(self):
         self.container.check_docker()
 
         container_mapping = Constants.container_mapping[Constants.host_arch]
-        for image in container_mapping.values():
-            if image_exists(image):
-                pull_image(image, skip_existing=False)
+        images = [image for image in dict.fromkeys(container_mapping.values())
+                  if image_exists(image)]
+
+        progress = PullProgress(images)
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            futures = [executor.submit(self.update_image_tracked, image, progress)
+                       for image in images]
+            for future in futures:
+                future.result()
+
+        pulled = progress.get_images('pulled')
+        up_to_date = progress.get_images('up to date')
+        failed = progress.get_images('failed')
+
+        logger.info('Update summary:')
+        for label, group in [('Pulled', pulled), ('Up to date', up_to_date), ('Failed', failed)]:
+            logger.info('  %s (%i): %s', label, len(group), ', '.join(group) if group else '-')
+
+        if failed:
+            raise ClickableException(f'Failed to update {len(failed)} image(s)')
 
         logger.info('Update complete.')
 
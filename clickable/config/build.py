@@ -9,6 +9,8 @@ class BuildConfig(BaseConfig):
             'always_clean': False,
             'skip_review': False,
             'default_arch': None,
+            'parallel_libs': 1,
+            'compiler_cache': False,
         }
 
         self.update(config_file)
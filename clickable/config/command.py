@@ -10,3 +10,4 @@ class CommandConf():
         self.device_command = False
         self.arch_specific = False
         self.build_command = False
+        self.multi_device = False
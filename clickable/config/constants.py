@@ -158,6 +158,8 @@ class Constants():
     ]
     framework_base_default = '20.04'
 
+    archs = ['armhf', 'arm64', 'amd64']
+
     arch_triplet_mapping = {
         'armhf': 'arm-linux-gnueabihf',
         'arm64': 'aarch64-linux-gnu',
@@ -184,5 +186,15 @@ class Constants():
     host_home = os.path.expanduser('~')
     clickable_dir = os.path.join(host_home, '.clickable')
     clickable_config_path = os.path.join(clickable_dir, 'config.yaml')
+    docker_ready_cache_path = os.path.join(clickable_dir, 'docker-ready.json')
+    docker_ready_cache_ttl = 600
+    container_mode_setup_path = os.path.join(clickable_dir, 'container-mode-setup.json')
+    ccache_dir = os.path.join(clickable_dir, 'ccache')
+    go_cache_dir = os.path.join(clickable_dir, 'go', 'cache')
+    go_mod_cache_dir = os.path.join(clickable_dir, 'go', 'pkg', 'mod')
+    apt_cache_dir = os.path.join(clickable_dir, 'apt-cache')
+    ssh_control_dir = os.path.join(clickable_dir, 'ssh')
+    # Seconds an idle SSH master connection is kept open in case Clickable exits uncleanly
+    ssh_control_persist = 60
     desktop_device_home = os.path.join(clickable_dir, 'home')
     device_home = '/home/phablet'
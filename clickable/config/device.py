@@ -20,6 +20,8 @@ class DeviceConfig(BaseConfig):
             'required': device_required,
             'always_detect': False,
             'xenial_adb': False,
+            'ssh_multiplexing': True,
+            'inventory': [],
         }
 
         if base:
@@ -28,7 +30,7 @@ class DeviceConfig(BaseConfig):
         self.configure(args)
 
     @staticmethod
-    def setup_parser(parser):
+    def setup_parser(parser, multi_device=False):
         command_group = parser.add_mutually_exclusive_group()
         command_group.add_argument(
             '--ssh',
@@ -50,6 +52,21 @@ class DeviceConfig(BaseConfig):
             help='Target device. "detect" considers SSH first, then ADB, but never "host".',
         )
 
+        if multi_device:
+            command_group.add_argument(
+                '--devices',
+                help='Run on several devices at the same time: "all" (attached ADB devices '
+                     'and the device inventory) or a comma separated list of ADB serial '
+                     'numbers and SSH addresses, optionally prefixed by "adb:" or "ssh:"',
+                default=None
+            )
+            parser.add_argument(
+                '--device-jobs',
+                type=int,
+                help='Maximum number of devices to run on at the same time (with --devices)',
+                default=4
+            )
+
         parser.add_argument(
             '--xenial-adb',
             action='store_true',
@@ -58,6 +75,21 @@ class DeviceConfig(BaseConfig):
             default=False,
         )
 
+    def select(self, spec, adb_serials):
+        """ Selects one device of a --devices list """
+        kind, _, target = spec.partition(':')
+        if kind not in ['adb', 'ssh']:
+            kind = 'adb' if spec in adb_serials else 'ssh'
+            target = spec
+
+        if kind == 'adb':
+            self.config['serial_number'] = target
+        else:
+            self.parse_ssh_config(target)
+
+        self.config['selection'] = kind
+        self.config['required'] = True
+
     def parse_ssh_config(self, ssh_arg):
         result = re.match("(.+):([0-9]+)", ssh_arg)
         if result is not None:
@@ -122,6 +154,8 @@ class GlobalDeviceConfig(BaseConfig):
             'skip_uninstall': False,
             'default_target': None,
             'always_detect': False,
+            'ssh_multiplexing': True,
+            'inventory': [],
         }
 
         self.update(config_file)
@@ -8,6 +8,7 @@ class EnvironmentConfig(BaseConfig):
         self.config = {
             'non_interactive': False,
             'container_mode': False,
+            'container_session': False,
             'restrict_arch': None,
             'nvidia': 'auto',
         }
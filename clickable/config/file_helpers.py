@@ -1,4 +1,5 @@
 import os
+import copy
 import glob
 import json
 
@@ -30,12 +31,7 @@ class ProjectFiles():
         )
 
         if desktop_file:
-            with open(desktop_file, 'r', encoding='UTF-8') as f:
-                # Not using configparser here since it has issues with %U that many apps have
-                for line in f.readlines():
-                    if '=' in line:
-                        pos = line.find('=')
-                        self.desktop[line[:pos]] = line[(pos + 1):].strip()
+            self.desktop = parse_desktop_file(desktop_file)
 
         return self.desktop
 
@@ -80,11 +76,41 @@ class ProjectFiles():
         return None
 
 
+def parse_desktop_file(desktop_file):
+    desktop = {}
+
+    with open(desktop_file, 'r', encoding='UTF-8') as f:
+        # Not using configparser here since it has issues with %U that many apps have
+        for line in f.readlines():
+            if '=' in line:
+                pos = line.find('=')
+                desktop[line[:pos]] = line[(pos + 1):].strip()
+
+    return desktop
+
+
 class InstallFiles():
     def __init__(self, install_dir, builder, arch):
         self.install_dir = install_dir
         self.builder = builder
         self.arch = arch
+        self.file_cache = {}
+
+    def load_cached(self, path, parse):
+        """ Parses a file only once as long as it is not modified """
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+        cached = self.file_cache.get(path, None)
+        if not cached or cached[0] != key:
+            cached = (key, parse(path))
+            self.file_cache[path] = cached
+
+        # Callers are free to modify what they get
+        return copy.deepcopy(cached[1])
+
+    def invalidate_cached(self, path):
+        self.file_cache.pop(path, None)
 
     def find_or_raise(self, key, name=None):
         value = self.get_manifest().get(key, None)
@@ -136,19 +162,24 @@ class InstallFiles():
         return f'{package_name}_{version}_{self.arch}.click'
 
     def write_manifest(self, manifest):
-        with open(os.path.join(self.install_dir, "manifest.json"),
-                  'w', encoding='UTF-8')as writer:
+        manifest_path = os.path.join(self.install_dir, "manifest.json")
+        self.invalidate_cached(manifest_path)
+
+        with open(manifest_path, 'w', encoding='UTF-8')as writer:
             json.dump(manifest, writer, indent=4)
 
     def load_manifest(self, manifest_path):
-        manifest = {}
-
         if not os.path.exists(manifest_path):
             arch_arg = "" if self.arch == "all" else f" --arch {self.arch}"
             raise ClickableException(f"Can't find the app manifest in the install dir. "
                                      "Please build the app first with "
                                      f'"clickable build{arch_arg}".')
 
+        return self.load_cached(manifest_path, self.parse_manifest)
+
+    def parse_manifest(self, manifest_path):
+        manifest = {}
+
         with open(manifest_path, 'r', encoding='UTF-8') as f:
             try:
                 manifest = json.load(f)
@@ -169,17 +200,23 @@ class InstallFiles():
         return [f for f in files if f]
 
     def write_apparmor(self, apparmor_file, content):
-        with open(os.path.join(self.install_dir, apparmor_file),
-                  'w', encoding='UTF-8')as writer:
+        path = os.path.join(self.install_dir, apparmor_file)
+        self.invalidate_cached(path)
+
+        with open(path, 'w', encoding='UTF-8')as writer:
             json.dump(content, writer, indent=4)
 
     def load_apparmor(self, apparmor_file):
         path = os.path.join(self.install_dir, apparmor_file)
-        apparmor = {}
 
         if not os.path.exists(path):
             raise ClickableException(f"Can't find apparmor file {apparmor_file}.")
 
+        return self.load_cached(path, self.parse_apparmor)
+
+    def parse_apparmor(self, path):
+        apparmor = {}
+
         with open(path, 'r', encoding='UTF-8') as f:
             try:
                 apparmor = json.load(f)
@@ -218,14 +255,7 @@ class InstallFiles():
             logger.error("The hook '%s' is either misspelt or it does not "
                          "have a .desktop file in manifest.json.", hook_name)
 
-        desktop = {}
-
         if desktop_file:
-            with open(desktop_file, 'r', encoding='UTF-8') as f:
-                # Not using configparser here since it has issues with %U that many apps have
-                for line in f.readlines():
-                    if '=' in line:
-                        pos = line.find('=')
-                        desktop[line[:pos]] = line[(pos + 1):].strip()
-
-        return desktop
+            return self.load_cached(desktop_file, parse_desktop_file)
+
+        return {}
@@ -29,9 +29,11 @@ class LibInitConfig:
         self.lib_configs = None
         self.cwd = None
         self.container_mode = None
+        self.container_session = False
         self.docker_image = None
         self.build_arch = None
         self.skip_image_setup = False
+        self.compiler_cache = False
 
 
 class LibConfig():
@@ -65,13 +67,14 @@ class LibConfig():
     required = ['builder']
     # If specified as a string split at spaces
     flexible_split_list = ['dependencies_host', 'dependencies_target',
-                           'dependencies_ppa', 'build_args', 'make_args']
+                           'dependencies_ppa', 'build_args', 'make_args', 'depends_on']
     # If specified as a string convert it to a list of size 1
     flexible_list = ['prebuild', 'build', 'postmake', 'postbuild']
     builders = [Constants.QMAKE, Constants.CMAKE, Constants.CUSTOM]
 
     first_docker_info = True
     container_mode = False
+    container_session = False
     build_arch = None
     use_nvidia = False
     gopath = None
@@ -81,6 +84,7 @@ class LibConfig():
     def __init__(self, config):
         self.verbose = config.verbose
         self.container_mode = config.container_mode
+        self.container_session = config.container_session
         self.build_arch = config.build_arch
 
         self.placeholders = {}
@@ -111,6 +115,7 @@ class LibConfig():
             'dependencies_host': [],
             'dependencies_target': [],
             'dependencies_ppa': [],
+            'depends_on': [],
             'make_jobs': None,
             'cargo_home': os.path.join(Constants.clickable_dir, 'cargo'),
             'docker_image': None,
@@ -124,6 +129,7 @@ class LibConfig():
             'framework': config.framework,
             'framework_base': config.framework_base,
             'qt_version': config.qt_version,
+            'compiler_cache': config.compiler_cache,
         }
 
         self.config.update(config.config_dict)
@@ -183,7 +189,7 @@ class LibConfig():
     def set_env_vars(self):
         os.environ.update(self.get_env_vars())
 
-    def get_env_vars(self):
+    def get_env_vars(self, include_compiler_cache=True):
         env_vars = {}
 
         if self.lib_configs:
@@ -193,10 +199,18 @@ class LibConfig():
         for key, conf in self.placeholders.items():
             env_vars[key] = self.config[conf]
 
+        if self.uses_ccache() and include_compiler_cache:
+            env_vars['CCACHE_DIR'] = os.path.join(Constants.ccache_dir, self.config['arch'])
+            env_vars['CCACHE_BASEDIR'] = self.config['root_dir']
+
         env_vars.update(self.config['env_vars'])
 
         return env_vars
 
+    def uses_ccache(self):
+        return self.config['compiler_cache'] and \
+            self.config['builder'] in [Constants.CMAKE, Constants.QMAKE, Constants.QBS]
+
     def substitute(self, sub, rep, key):
         if self.config[key]:
             if isinstance(self.config[key], dict):
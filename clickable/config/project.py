@@ -109,6 +109,7 @@ class ProjectConfig(BaseConfig):
 
     first_docker_info = True
     container_mode = False
+    container_session = False
     use_nvidia = False
     avoid_nvidia = False
     verbose = False
@@ -189,6 +190,7 @@ class ProjectConfig(BaseConfig):
             'ignore_review_warnings': None,
             'ignore_review_errors': None,
             'is_app': True,
+            'compiler_cache': None,
         }
 
     def load(self, config_path):
@@ -235,6 +237,9 @@ class ProjectConfig(BaseConfig):
         if always_clean:
             self.config['always_clean'] = True
 
+        if self.config['compiler_cache'] is None:
+            self.config['compiler_cache'] = self.global_config.build.compiler_cache
+
         self.harmonize_config()
 
     def setup(self):
@@ -515,6 +520,9 @@ class ProjectConfig(BaseConfig):
         if self.get_env_var('CLICKABLE_CONTAINER_MODE') or config.container_mode:
             self.container_mode = True
 
+        if self.get_env_var('CLICKABLE_CONTAINER_SESSION') or config.container_session:
+            self.container_session = True
+
         if self.get_env_var('CLICKABLE_NVIDIA') or config.nvidia == 'on':
             self.use_nvidia = True
 
@@ -585,12 +593,18 @@ class ProjectConfig(BaseConfig):
     def set_env_vars(self):
         os.environ.update(self.get_env_vars())
 
-    def get_env_vars(self):
+    def get_env_vars(self, include_compiler_cache=True):
+        """ The compiler cache variables depend on the checkout location, so
+        they are left out where they would end up in image contents """
         env_vars = {}
 
         if self.config['gopath']:
             env_vars['GOPATH'] = self.config['gopath']
 
+        if self.config['builder'] == Constants.GO:
+            env_vars['GOCACHE'] = self.get_go_cache_dir()
+            env_vars['GOMODCACHE'] = Constants.go_mod_cache_dir
+
         if self.lib_configs:
             install_dirs = [lib.install_dir for lib in self.lib_configs]
             env_vars['CMAKE_PREFIX_PATH'] = ':'.join(install_dirs)
@@ -598,10 +612,21 @@ class ProjectConfig(BaseConfig):
         for key, conf in self.placeholders.items():
             env_vars[key] = self.config[conf]
 
+        if self.uses_ccache() and include_compiler_cache:
+            env_vars['CCACHE_DIR'] = os.path.join(Constants.ccache_dir, self.config['arch'])
+            env_vars['CCACHE_BASEDIR'] = self.config['root_dir']
+
         env_vars.update(self.config['env_vars'])
 
         return env_vars
 
+    def get_go_cache_dir(self):
+        return os.path.join(Constants.go_cache_dir, self.config['arch'])
+
+    def uses_ccache(self):
+        return self.config['compiler_cache'] and \
+            self.config['builder'] in [Constants.CMAKE, Constants.QMAKE, Constants.QBS]
+
     def substitute(self, sub, rep, key, change_keys=False):
         if self.config[key]:
             if isinstance(self.config[key], dict):
@@ -695,9 +720,11 @@ class ProjectConfig(BaseConfig):
             lib_init.libs_placeholders = placeholders
             lib_init.lib_configs = self.lib_configs
             lib_init.container_mode = self.container_mode
+            lib_init.container_session = self.container_session
             lib_init.docker_image = self.docker_image
             lib_init.build_arch = self.build_arch
             lib_init.skip_image_setup = self.skip_image_setup
+            lib_init.compiler_cache = self.config['compiler_cache']
 
             lib = LibConfig(lib_init)
             self.lib_configs.append(lib)
@@ -3,26 +3,44 @@ import shlex
 import os
 import shutil
 import getpass
-import uuid
+import hashlib
 import sys
 import json
+import atexit
+import socket
+import time
 
+from clickable import docker_api
 from clickable.utils import (
+    get_docker_info,
     get_image_hash,
+    get_image_labels,
+    is_sub_dir,
     run_subprocess_check_call,
     run_subprocess_check_output,
     get_docker_command,
     image_exists,
+    is_buildkit_available,
     env,
     check_command,
 )
 from clickable.logger import logger
+from clickable.parallel import check_call_prefixed
 from clickable.config.constants import Constants
 from clickable.exceptions import ClickableException
 from clickable.version import __container_minimum_required__
 
 
+# Images whose probe results are kept (the build image and its base images)
+PROBE_CACHE_IMAGES = 4
+
+
 class Container():
+    # Docker readiness is checked once per process
+    docker_checked = False
+    # Cache mount for downloaded packages in image setups built with BuildKit
+    apt_archives_dir = '/var/cache/clickable-apt'
+
     def __init__(self, config, name=None, minimum_version=None):
         self.config = config
         self.docker_mode = self.config.needs_docker()
@@ -33,10 +51,14 @@ class Container():
         self.base_docker_image = self.docker_image
 
         self.docker_desktop = False
+        self.use_session = False
+        self.session = None
+        self.session_image = None
 
         if self.docker_mode:
             self.docker_executable = get_docker_command()
             self.docker_desktop = self.is_docker_desktop()
+            self.use_session = self.config.container_session
 
             self.clickable_dir = f'.clickable/{self.base_docker_image}'
             if name:
@@ -44,6 +66,7 @@ class Container():
 
             self.docker_name_file = f'{self.clickable_dir}/image.json'
             self.docker_file = f'{self.clickable_dir}/Dockerfile'
+            self.probe_file = f'{self.clickable_dir}/probe.json'
 
             if self.needs_customized_container():
                 self.restore_cached_image()
@@ -54,9 +77,8 @@ class Container():
 
     def is_docker_desktop(self):
         if self.docker_executable == 'docker':
-            format_args = "{{.OperatingSystem}}"
-            command = f'{self.docker_executable} info --format {format_args}'
-            return 'Docker Desktop' in run_subprocess_check_output(command)
+            info = get_docker_info(self.docker_executable)
+            return 'Docker Desktop' in info.get('OperatingSystem', '')
 
         return False
 
@@ -135,16 +157,73 @@ class Container():
             logger.debug('Skipping docker check because of env var.')
             return
 
+        if Container.docker_checked:
+            return
+
         if not self.is_systemd_used():
             logger.debug('Skipping docker check because systemd is not used.')
+            Container.docker_checked = True
+            return
+
+        cache_key = self.get_docker_ready_cache_key()
+        if cache_key and self.load_docker_ready_cache() == cache_key:
+            logger.debug('Skipping docker check as it passed recently.')
+            Container.docker_checked = True
             return
 
         if self.is_docker_ready():
+            Container.docker_checked = True
+            if cache_key:
+                self.write_docker_ready_cache(cache_key)
             return
 
         raise ClickableException('Docker is not running or not properly set up.\n'
                                  'Please run "clickable setup docker" first.')
 
+    def get_docker_ready_cache_key(self):
+        """ Returns what a passed docker check depends on or None if unknown.
+
+        A reboot or a restarted docker daemon (which recreates its socket)
+        invalidates the check.
+        """
+        socket_path = docker_api.find_socket(self.docker_executable)
+        if not socket_path:
+            return None
+
+        try:
+            with open('/proc/sys/kernel/random/boot_id', 'r', encoding='UTF-8') as f:
+                boot_id = f.read().strip()
+
+            return {
+                'boot_id': boot_id,
+                'socket_inode': os.stat(socket_path).st_ino,
+            }
+        except OSError:
+            return None
+
+    def load_docker_ready_cache(self):
+        path = Constants.docker_ready_cache_path
+        if not os.path.exists(path):
+            return None
+
+        with open(path, 'r', encoding='UTF-8') as f:
+            try:
+                cache = json.load(f)
+            except ValueError:
+                logger.debug("Docker check cache file is invalid")
+                return None
+
+        if time.time() - cache.pop('time', 0) > Constants.docker_ready_cache_ttl:
+            return None
+
+        return cache
+
+    def write_docker_ready_cache(self, cache_key):
+        os.makedirs(os.path.dirname(Constants.docker_ready_cache_path), exist_ok=True)
+
+        with open(Constants.docker_ready_cache_path, 'w', encoding='UTF-8') as f:
+            json.dump({**cache_key, 'time': time.time()}, f)
+
     def is_systemd_used(self):
         if sys.platform != "linux":
             return False
@@ -262,6 +341,11 @@ class Container():
                 mounts[f'/gopath/path{index}'] = path
                 os.makedirs(path, exist_ok=True)
 
+        if self.config.builder == Constants.GO:
+            for path in [self.config.get_go_cache_dir(), Constants.go_mod_cache_dir]:
+                os.makedirs(path, exist_ok=True)
+                mounts[path] = path
+
         if self.config.builder == Constants.RUST and self.config.cargo_home:
             cargo_registry = os.path.join(self.config.cargo_home, 'registry')
             cargo_git = os.path.join(self.config.cargo_home, 'git')
@@ -279,6 +363,11 @@ class Container():
             mounts['/opt/rust/cargo/git'] = cargo_git
             mounts['/opt/rust/cargo/.package-cache'] = cargo_package_cache_lock
 
+        if self.config.uses_ccache():
+            path = os.path.join(Constants.ccache_dir, self.config.arch)
+            os.makedirs(path, exist_ok=True)
+            mounts[path] = path
+
         if transparent:
             for path in transparent:
                 mounts[path] = path
@@ -303,6 +392,53 @@ class Container():
         # e.g. "--uidmap 1000:0:1 --uidmap 0:1:1000"
         return f'{flag} {mapid}:0:1 {flag} 0:1:{mapid}'
 
+    def can_use_session(self, cwd, tty, localhost):
+        # The session container is started once, so its mounts and network
+        # mode are fixed. Commands needing anything else get their own container.
+        if not self.use_session or tty or localhost:
+            return False
+
+        return all(is_sub_dir(path, self.config.root_dir)
+                   for path in [cwd, self.config.build_dir])
+
+    def start_session(self):
+        self.check_docker()
+
+        mounts = self.render_mounts(
+            self.get_docker_mounts(transparent=[self.config.root_dir]))
+        id_mappings = self.render_id_mapping_string()
+
+        command = f'''{self.docker_executable} run -d --rm {mounts} {id_mappings}
+            {self.docker_image} sleep infinity'''
+        self.session = run_subprocess_check_output(shlex.split(command)).strip()
+        self.session_image = self.docker_image
+        atexit.register(self.stop_session)
+
+        logger.debug('Started container session %s', self.session)
+
+    def stop_session(self):
+        if not self.session:
+            return
+
+        logger.debug('Stopping container session %s', self.session)
+        subprocess.call(
+            shlex.split(f'{self.docker_executable} rm --force {self.session}'),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        self.session = None
+        self.session_image = None
+
+    def get_session(self):
+        if self.session and self.session_image != self.docker_image:
+            # The image has been customized since the session was started
+            self.stop_session()
+
+        if not self.session:
+            self.start_session()
+
+        return self.session
+
     def run_command(self,  # pylint: disable=too-many-positional-arguments
                     command,
                     root_user=False,
@@ -310,8 +446,10 @@ class Container():
                     use_build_dir=True,
                     cwd=None,
                     tty=False,
-                    localhost=False):
+                    localhost=False,
+                    image=None):
         wrapped_command = command
+        image = image if image else self.docker_image
         cwd = cwd if cwd else os.path.abspath(self.config.root_dir)
 
         if self.config.container_mode:
@@ -366,9 +504,15 @@ wait $bg_pid
 exit $?
                 '''.strip()
 
-            wrapped_command = f'''{self.docker_executable} run {mounts} {env_vars} {go_config}
-                {user} {id_mappings} -w {command_cwd} --rm {command_tty} {network}
-                -i {self.docker_image} bash -c "{command}"'''
+            if image == self.docker_image and self.can_use_session(cwd, tty, localhost):
+                docker_command = f'''{self.docker_executable} exec {env_vars} {go_config}
+                    {user} -w {command_cwd} -i {self.get_session()}'''
+            else:
+                docker_command = f'''{self.docker_executable} run {mounts} {env_vars} {go_config}
+                    {user} {id_mappings} -w {command_cwd} --rm {command_tty} {network}
+                    -i {image}'''
+
+            wrapped_command = f'{docker_command} bash -c "{command}"'
 
         kwargs = {}
         if use_build_dir:
@@ -379,33 +523,103 @@ exit $?
         if get_output:
             return run_subprocess_check_output(shlex.split(wrapped_command), **kwargs)
 
-        subprocess.check_call(shlex.split(wrapped_command), **kwargs)
+        check_call_prefixed(shlex.split(wrapped_command), **kwargs)
         return None
 
+    def load_probe_cache(self):
+        """ Returns the cached results by image id """
+        if not os.path.exists(self.probe_file):
+            return {}
+
+        with open(self.probe_file, 'r', encoding='UTF-8') as f:
+            try:
+                cache = json.load(f)
+            except ValueError:
+                logger.debug("Probe cache file is invalid")
+                return {}
+
+        if cache.get('env_vars', None) != self.config.env_vars:
+            logger.debug("Probe cache is outdated")
+            return {}
+
+        return cache.get('images', {})
+
+    def write_probe_cache(self, images):
+        os.makedirs(self.clickable_dir, exist_ok=True)
+
+        with open(self.probe_file, 'w', encoding='UTF-8') as f:
+            json.dump({
+                'env_vars': self.config.env_vars,
+                'images': images,
+            }, f)
+
+    def invalidate_probe_cache(self):
+        if os.path.exists(self.probe_file):
+            os.remove(self.probe_file)
+
+    def probe(self, command, image=None):
+        """ Runs a command whose output only depends on the image (the build
+        image by default) and caches its output keyed by the image id """
+        if self.config.container_mode:
+            return self.run_command(command, get_output=True, use_build_dir=False)
+
+        image = image if image else self.docker_image
+        image_hash = get_image_hash(image, self.docker_executable)
+        images = self.load_probe_cache()
+        results = images.pop(image_hash, {})
+
+        if command not in results:
+            results[command] = self.run_command(command, get_output=True, use_build_dir=False,
+                                                image=image)
+            # Most recently probed image last
+            images[image_hash] = results
+            self.write_probe_cache(dict(list(images.items())[-PROBE_CACHE_IMAGES:]))
+        else:
+            logger.debug('Using cached output of "%s"', command)
+
+        return results[command]
+
+    def get_compiler_cache_packages(self):
+        """ ccache is only installed into the customized image if the base
+        image does not provide it """
+        if not self.config.uses_ccache() or 'ccache' in self.config.dependencies_host:
+            return []
+
+        if self.probe('command -v ccache || true', image=self.base_docker_image).strip():
+            return []
+
+        return ['ccache']
+
+    def get_host_dependency_packages(self):
+        return sorted(set(self.config.dependencies_host + self.get_compiler_cache_packages()))
+
+    def get_target_dependency_packages(self):
+        return sorted({
+            dep if ':' in dep else f'{dep}:{self.config.arch}'
+            for dep in self.config.dependencies_target
+        })
+
     def get_dependency_packages(self):
-        dependencies = self.config.dependencies_host
-        for dep in self.config.dependencies_target:
-            if ':' in dep:
-                dependencies.append(dep)
-            else:
-                dependencies.append(f'{dep}:{self.config.arch}')
-        return dependencies
+        return self.get_host_dependency_packages() + self.get_target_dependency_packages()
 
     def get_ppa_adding_commands(self):
         if self.config.dependencies_ppa:
             return [
                 f'add-apt-repository -y {ppa}'
-                for ppa in self.config.dependencies_ppa
+                for ppa in dict.fromkeys(self.config.dependencies_ppa)
             ]
 
         return []
 
-    def construct_dockerfile_content(self, commands, env_vars, args, base_hash):
+    def construct_dockerfile_content(  # pylint: disable=too-many-positional-arguments
+            self, commands, custom_commands, env_vars, args, base_hash):
+        """ Every command gets its own layer. Args are only declared for the
+        custom commands as they invalidate the cache of all following layers """
         env_lines = ''
 
         args_strings = [
             f'ARG {key}="{var}"' for key, var in args.items()
-        ]
+        ] if custom_commands else []
 
         env_strings = [
             f'{key}="{var}"' for key, var in env_vars.items()
@@ -415,86 +629,124 @@ exit $?
             f'RUN {cmd}' for cmd in commands
         ]
 
-        args_lines = '\n'.join(args_strings)
+        custom_run_strings = [
+            f'RUN {cmd}' for cmd in custom_commands
+        ]
+
         if env_strings:
             env_lines = 'ENV ' + ' '.join(env_strings)
-        run_lines = '\n'.join(run_strings)
 
-        return f'''
-FROM {self.base_docker_image}
-LABEL base_image_hash="{base_hash}"
-{args_lines}
-{env_lines}
-{run_lines}
-        '''.strip()
+        lines = [
+            f'FROM {self.base_docker_image}',
+            f'LABEL base_image_hash="{base_hash}"',
+            env_lines,
+            *run_strings,
+            *args_strings,
+            *custom_run_strings,
+        ]
+
+        return '\n'.join(line for line in lines if line)
 
-    def create_custom_container(self, dockerfile_content):
-        if not os.path.exists(self.clickable_dir):
-            os.makedirs(self.clickable_dir)
+    def get_custom_image_name(self, dockerfile_content, base_hash):
+        """ Customized images are named by their content, so that projects
+        and libraries with the same setup share one image """
+        sha = hashlib.sha256(f'{dockerfile_content.strip()}\0{base_hash}'.encode())
+        return f'{self.base_docker_image}-{sha.hexdigest()}'
+
+    def write_custom_image_files(self, dockerfile_content):
+        os.makedirs(self.clickable_dir, exist_ok=True)
 
         with open(self.docker_file, 'w', encoding='UTF-8') as f:
             f.write(dockerfile_content)
 
-        self.docker_image = f'{self.base_docker_image}-{uuid.uuid4()}'
         with open(self.docker_name_file, 'w', encoding='UTF-8') as f:
             json.dump({
                 'name': self.docker_image,
                 'base_image': self.base_docker_image,
             }, f)
 
+    def create_custom_container(self, dockerfile_content, image):
+        self.docker_image = image
+        self.write_custom_image_files(dockerfile_content)
+        self.invalidate_probe_cache()
+
+        build_env = None
+        if self.docker_executable == 'docker' and is_buildkit_available(self.docker_executable):
+            build_env = {**os.environ, 'DOCKER_BUILDKIT': '1'}
+
         logger.debug('Generating new docker image')
         try:
             subprocess.check_call(
                 shlex.split(f'{self.docker_executable} build -t {self.docker_image} .'),
-                cwd=self.clickable_dir
+                cwd=self.clickable_dir,
+                env=build_env,
             )
         except subprocess.CalledProcessError:
             self.clean_clickable()
             raise
+        finally:
+            docker_api.invalidate_images(self.docker_image)
 
-    def is_dockerfile_outdated(self, dockerfile_content):
-        if self.docker_image == self.base_docker_image:
-            # this indicates that there is no cached custom image
-            return True
-
-        if not os.path.exists(self.docker_file):
-            return True
-
-        with open(self.docker_file, 'r', encoding='UTF-8') as f:
-            if dockerfile_content.strip() != f.read().strip():
-                logger.debug("Cached container is outdated")
-                return True
-
-        if not image_exists(self.docker_image, self.docker_executable):
-            logger.debug("Cached container does not exist anymore")
-            return True
-
-        return False
-
-    def get_apt_install_cmd(self, dependencies):
+    def get_apt_install_cmd(self, dependencies, archives_dir=None):
         joined_deps = ' '.join(dependencies)
-        return f'apt-get install -y --force-yes --no-install-recommends {joined_deps}'
+        options = ''
+        if archives_dir:
+            # A separate archives dir is not emptied by the docker-clean hook of the images
+            options = f'-o Dir::Cache::Archives={archives_dir} ' \
+                '-o APT::Keep-Downloaded-Packages=true '
+        return f'apt-get install -y --force-yes --no-install-recommends {options}{joined_deps}'
+
+    def get_apt_cache_name(self):
+        """ Packages are only shared between setups of the same framework and arch """
+        return f'{self.config.framework_base}-{self.config.arch}'
+
+    def get_apt_cache_mounts(self):
+        """ Only the downloaded packages are cached, the package lists stay in the
+        image for apt-get calls of the image setup """
+        cache_id = f'clickable-apt-{self.get_apt_cache_name()}'
+        return f'--mount=type=cache,id={cache_id},target={self.apt_archives_dir},sharing=locked'
+
+    def get_host_apt_cache_dir(self):
+        path = os.path.join(Constants.apt_cache_dir, self.get_apt_cache_name())
+        os.makedirs(os.path.join(path, 'partial'), exist_ok=True)
+        return path
+
+    def get_apt_layer_cmd(self, dependencies, buildkit):
+        if buildkit:
+            install_cmd = self.get_apt_install_cmd(dependencies, self.apt_archives_dir)
+            return f'{self.get_apt_cache_mounts()} mkdir -p {self.apt_archives_dir}/partial && ' \
+                f'apt-get update && {install_cmd}'
+
+        return f'apt-get update && {self.get_apt_install_cmd(dependencies)} && apt-get clean'
 
     def setup_customized_image(self):
         logger.debug('Checking dependencies and image setup')
 
         self.check_docker()
 
-        commands = []
         env_vars = self.config.image_setup.get('env', {})
-        args = self.config.get_env_vars()
+        args = self.config.get_env_vars(include_compiler_cache=False)
+        buildkit = is_buildkit_available(self.docker_executable)
 
-        commands += self.get_ppa_adding_commands()
+        if not image_exists(self.base_docker_image, self.docker_executable):
+            run_subprocess_check_call(f'{self.docker_executable} pull {self.base_docker_image}')
+            docker_api.invalidate_images(self.base_docker_image)
 
-        dependencies = self.get_dependency_packages()
-        if dependencies:
+        commands = []
+        host_dependencies = self.get_host_dependency_packages()
+        target_dependencies = self.get_target_dependency_packages()
+
+        if host_dependencies or target_dependencies:
             commands.append(
                 'echo set debconf/frontend Noninteractive | debconf-communicate && '
                 'echo set debconf/priority critical | debconf-communicate'
             )
-            dependencies_cmd = self.get_apt_install_cmd(dependencies)
-            commands.append(
-                f'apt-get update && {dependencies_cmd} && apt-get clean')
+
+        commands += self.get_ppa_adding_commands()
+
+        for dependencies in [host_dependencies, target_dependencies]:
+            if dependencies:
+                commands.append(self.get_apt_layer_cmd(dependencies, buildkit))
 
         if self.config.rust_channel:
             commands.append(f'rustup default {self.config.rust_channel}')
@@ -502,48 +754,137 @@ LABEL base_image_hash="{base_hash}"
             if self.config.is_foreign_target():
                 commands.append(f'rustup target add {self.config.arch_rust}')
 
+        custom_commands = []
         if self.config.image_setup:
-            commands.extend(self.config.image_setup.get('run', []))
+            custom_commands = self.config.image_setup.get('run', [])
 
-        if not image_exists(self.base_docker_image, self.docker_executable):
-            run_subprocess_check_call(f'{self.docker_executable} pull {self.base_docker_image}')
+        if not commands and not custom_commands and not env_vars:
+            # E.g. the compiler cache is already provided by the base image
+            logger.debug('No image setup needed, using the base image')
+            self.use_base_image()
+            return
 
         base_hash = get_image_hash(self.base_docker_image, self.docker_executable)
-        dockerfile_content = self.construct_dockerfile_content(commands, env_vars, args, base_hash)
+        dockerfile_content = self.construct_dockerfile_content(
+            commands, custom_commands, env_vars, args, base_hash)
+
+        image = self.get_custom_image_name(dockerfile_content, base_hash)
 
-        if self.is_dockerfile_outdated(dockerfile_content):
-            self.create_custom_container(dockerfile_content)
+        if not image_exists(image, self.docker_executable):
+            self.create_custom_container(dockerfile_content, image)
+        elif self.docker_image != image or not os.path.exists(self.docker_file):
+            logger.debug('Using existing image %s', image)
+            self.docker_image = image
+            self.write_custom_image_files(dockerfile_content)
         else:
             logger.debug('Image already set up')
 
+    def use_base_image(self):
+        self.docker_image = self.base_docker_image
+
+        for path in [self.docker_name_file, self.docker_file]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def get_missing_packages(self, dependencies):
+        """ Checks all dependencies with a single dpkg-query call """
+        output = self.run_command(
+            "dpkg-query -W -f='${Package}:${Architecture} ${db:Status-Status}\\n' "
+            f"{' '.join(dependencies)} 2>/dev/null || true",
+            get_output=True,
+            use_build_dir=False
+        )
+
+        installed = set()
+        for line in output.splitlines():
+            parts = line.split()
+            if len(parts) == 2 and parts[1] == 'installed':
+                installed.add(parts[0])
+
+        installed_names = {package.split(':')[0] for package in installed}
+
+        return [
+            dep for dep in dependencies
+            if dep not in installed and (':' in dep or dep not in installed_names)
+        ]
+
+    def get_container_mode_setup_state(self):
+        """ Returns a hash of everything the container mode setup applies and
+        the state of the package database it resulted in """
+        setup = {
+            'ppas': self.get_ppa_adding_commands(),
+            'dependencies': self.get_dependency_packages(),
+            'rust_channel': self.config.rust_channel,
+            'rust_target': self.config.arch_rust if self.config.is_foreign_target() else None,
+            'image_setup': self.config.image_setup,
+            'arch': self.config.arch,
+        }
+        sha = hashlib.sha256(json.dumps(setup, sort_keys=True).encode()).hexdigest()
+
+        try:
+            dpkg_stat = os.stat('/var/lib/dpkg/status')
+            dpkg_state = f'{dpkg_stat.st_mtime_ns}-{dpkg_stat.st_size}'
+        except OSError:
+            dpkg_state = None
+
+        return {'setup': sha, 'dpkg': dpkg_state, 'container': self.get_container_identity()}
+
+    def get_container_identity(self):
+        """ Identifies the running container (container mode runs inside of
+        it), so that a fresh container with a persisted home does not skip the
+        setup. The start time of pid 1 changes with every container start. """
+        try:
+            with open('/proc/sys/kernel/random/boot_id', 'r', encoding='UTF-8') as f:
+                boot_id = f.read().strip()
+
+            with open('/proc/1/stat', 'r', encoding='UTF-8') as f:
+                # The command name (field 2) may contain spaces, the start time
+                # is field 22
+                init_start = f.read().rsplit(')', 1)[1].split()[19]
+        except (OSError, IndexError):
+            return None
+
+        return f'{boot_id}-{socket.gethostname()}-{init_start}'
+
+    def load_container_mode_setup_state(self):
+        path = Constants.container_mode_setup_path
+        if not os.path.exists(path):
+            return None
+
+        with open(path, 'r', encoding='UTF-8') as f:
+            try:
+                return json.load(f)
+            except ValueError:
+                logger.debug("Container mode setup state file is invalid")
+                return None
+
+    def write_container_mode_setup_state(self):
+        os.makedirs(os.path.dirname(Constants.container_mode_setup_path), exist_ok=True)
+
+        with open(Constants.container_mode_setup_path, 'w', encoding='UTF-8') as f:
+            json.dump(self.get_container_mode_setup_state(), f)
+
     def setup_container_mode(self):
+        if self.config.image_setup:
+            os.environ.update(self.config.image_setup.get('env', {}))
+
+        state = self.get_container_mode_setup_state()
+        if state['container'] and self.load_container_mode_setup_state() == state:
+            logger.debug('Container mode setup is unchanged')
+            return
+
         ppa_commands = self.get_ppa_adding_commands()
         if ppa_commands:
             self.run_command(' && '.join(ppa_commands))
 
         dependencies = self.get_dependency_packages()
         if dependencies:
-            self.run_command('apt-get update', use_build_dir=False)
-
-            run = False
-            for dep in dependencies:
-                exists = ''
-                try:
-                    exists = self.run_command(
-                        f'dpkg -s {dep} | grep Status',
-                        get_output=True,
-                        use_build_dir=False
-                    )
-                except subprocess.CalledProcessError:
-                    exists = ''
-
-                if exists.strip() != 'Status: install ok installed':
-                    run = True
-                    break
-
-            if run:
+            missing = self.get_missing_packages(dependencies)
+
+            if missing:
+                self.run_command('apt-get update', use_build_dir=False)
                 self.run_command(
-                    self.get_apt_install_cmd(dependencies),
+                    self.get_apt_install_cmd(missing, self.get_host_apt_cache_dir()),
                     use_build_dir=False
                 )
             else:
@@ -556,17 +897,19 @@ LABEL base_image_hash="{base_hash}"
                 self.run_command(f'rustup target add {self.config.arch_rust}')
 
         if self.config.image_setup:
-            os.environ.update(self.config.image_setup.get('env', {}))
             for command in self.config.image_setup.get('run', []):
                 self.run_command(command, use_build_dir=False)
 
+        self.write_container_mode_setup_state()
+
     def needs_customized_container(self):
         return not self.config.skip_image_setup and (
             self.config.dependencies_host
             or self.config.dependencies_target
             or self.config.dependencies_ppa
             or self.config.image_setup
-            or self.config.rust_channel)
+            or self.config.rust_channel
+            or self.config.uses_ccache())
 
     def check_base_image_version(self):
         if not self.minimum_version or self.config.is_custom_docker_image:
@@ -577,13 +920,8 @@ LABEL base_image_hash="{base_hash}"
 
         version = 0
         try:
-            format_string = '{{ index .Config.Labels "image_version"}}'
-            command = f"\
-                {self.docker_executable} inspect --format '{format_string}' {self.docker_image} \
-            "
-
-            version_string = run_subprocess_check_output(command)
-            version = int(version_string)
+            labels = get_image_labels(self.docker_image, self.docker_executable)
+            version = int(labels.get('image_version', ''))
         except (ValueError, subprocess.CalledProcessError):
             logger.warning("Could not read the image version from the container")
 
@@ -1,17 +1,26 @@
+import atexit
 import os
 import shutil
 import getpass
+import subprocess
 from subprocess import CalledProcessError, TimeoutExpired
 
+from .adb_shell import AdbShell, AdbShellError
+from .parallel import print_prefixed
+from .transfer import push_file_stream
 from .utils import (
     run_subprocess_check_output,
     run_subprocess_check_call,
+    which,
 )
 from .exceptions import ClickableException
 from .logger import logger
 from .config.device import DeviceConfig
 from .config.constants import Constants
 
+# Devices listed by "adb devices" as queried on first use
+adb_devices = None  # pylint: disable=invalid-name
+
 
 class Device():
     def __init__(self, config: DeviceConfig):
@@ -19,6 +28,10 @@ class Device():
         self.connection = None
         self.device_arch = None
         self.ssh_welcome_touched = False
+        self.ssh_control_path = None
+        self.adb_shell = None
+        self.remote_zstd = None
+        self.transfer_rate = None
 
         self.determine_device()
 
@@ -90,9 +103,14 @@ class Device():
                 'Multiple ADB device attached, but no matching serial number configured')
             return False
 
-        command = self.get_adb_command(detect_command)
         try:
-            self.device_arch = run_subprocess_check_output(command, shell=True, timeout=5).strip()
+            if self.config.xenial_adb:
+                command = self.get_adb_command(detect_command)
+                output = run_subprocess_check_output(command, shell=True, timeout=5)
+            else:
+                _, output = self.get_adb_shell().run(detect_command, timeout=5)
+
+            self.device_arch = output.strip()
         except TimeoutExpired:
             if self.config.xenial_adb:
                 raise
@@ -129,10 +147,20 @@ class Device():
         return len(detect_adb_attached()) >= 1
 
     def is_adb_device_defined(self):
-        devices = detect_adb_attached()
+        serials = get_adb_serials()
+
+        return (len(serials) == 1 or
+                self.config.serial_number and self.config.serial_number in serials)
+
+    def get_identifier(self):
+        if self.connection == 'ssh':
+            port = f':{self.config.ssh_port}' if self.config.ssh_port else ''
+            return f'ssh-{self.config.ipv4}{port}'
+
+        if self.connection == 'adb':
+            return f'adb-{self.config.serial_number or "default"}'
 
-        return (len(devices) == 1 or
-                self.config.serial_number and self.config.serial_number in devices)
+        return self.connection
 
     def get_adb_args(self):
         if self.config.serial_number:
@@ -147,25 +175,65 @@ class Device():
     def forward_port_adb(self, host, target):
         self.forward_port_adb_with_args(host, target, self.get_adb_args())
 
+    def get_adb_shell(self):
+        """ Returns the adb shell session shared by all device commands, which is
+        closed at exit. Xenial devices do not support this. """
+        if not self.adb_shell:
+            self.adb_shell = AdbShell(self.get_adb_args())
+            atexit.register(self.adb_shell.close)
+
+        return self.adb_shell
+
+    def run_adb_shell_command(self, command, forward_port=None):
+        if forward_port:
+            self.forward_port_adb(forward_port, forward_port)
+
+        if isinstance(command, list):
+            command = ";".join(command)
+
+        try:
+            returncode, output = self.get_adb_shell().run(command)
+        except AdbShellError as e:
+            raise ClickableException(f'Running command on device via ADB failed: {e}') from e
+
+        if returncode != 0:
+            print_prefixed(output)
+            raise ClickableException("Command ran on device via ADB failed. See output above.")
+
+        return output
+
     def touch_ssh_welcome_message(self):
         if not self.ssh_welcome_touched:
             omit_welcome_command = self.get_ssh_command("touch /home/phablet/.hushlogin")
             run_subprocess_check_call(omit_welcome_command, shell=True)
             self.ssh_welcome_touched = True
 
-    def push_file(self, src, dst):
-        dir_path = os.path.dirname(dst)
-        self.run_command(f'mkdir -p {dir_path}')
+    def has_remote_zstd(self):
+        """ Whether zstd can be used for transfers, which needs it on both sides """
+        if self.remote_zstd is None:
+            self.remote_zstd = False
+
+            if which('zstd'):
+                try:
+                    self.remote_zstd = bool(
+                        self.run_command('command -v zstd', get_output=True).strip())
+                except (CalledProcessError, ClickableException):
+                    pass
 
+        return self.remote_zstd
+
+    def push_file(self, src, dst):
         if self.connection == "ssh":
-            command = ['scp']
+            self.touch_ssh_welcome_message()
+            self.transfer_rate = push_file_stream(
+                self.get_ssh_command(None), src, dst, self.has_remote_zstd(),
+                self.transfer_rate)
+            return
 
-            if self.config.ssh_port:
-                command += ['-o', f'Port={self.config.ssh_port}']
+        dir_path = os.path.dirname(dst)
+        self.run_command(f'mkdir -p {dir_path}')
 
-            command += [src, f'phablet@{self.config.ipv4}:{dst}']
-            command = " ".join(command)
-        elif self.connection == "adb":
+        if self.connection == "adb":
             adb_args = self.get_adb_args()
             command = f'adb {adb_args} push {src} {dst}'
         elif self.connection == "host":
@@ -193,7 +261,37 @@ class Device():
 
     def get_ssh_command(self, command, *args, **kwargs):
         return assemble_ssh_command(
-            self.config.ipv4, self.config.ssh_port, command, *args, **kwargs)
+            self.config.ipv4, self.config.ssh_port, command, *args,
+            control_path=self.get_ssh_control_path(), **kwargs)
+
+    def get_ssh_control_path(self):
+        """ Returns the control socket path shared by all ssh calls
+        to the device, which saves a handshake for each of them. The first
+        call opens the master connection, it is closed again at exit. """
+        if not self.config.ssh_multiplexing:
+            return None
+
+        if not self.ssh_control_path:
+            os.makedirs(Constants.ssh_control_dir, mode=0o700, exist_ok=True)
+            self.ssh_control_path = os.path.join(Constants.ssh_control_dir, '%C')
+            atexit.register(self.close_ssh_connection)
+
+        return self.ssh_control_path
+
+    def close_ssh_connection(self):
+        if not self.ssh_control_path:
+            return
+
+        logger.debug('Closing SSH connection to %s', self.config.ipv4)
+
+        # The port is part of the hashed control path
+        command = ['ssh', '-O', 'exit', '-o', f'ControlPath={self.ssh_control_path}']
+        if self.config.ssh_port:
+            command += ['-o', f'Port={self.config.ssh_port}']
+        command.append(f'phablet@{self.config.ipv4}')
+
+        subprocess.call(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.ssh_control_path = None
 
     def run_command(self, command, cwd=None, get_output=False, forward_port=None):
         if not cwd:
@@ -204,6 +302,14 @@ class Device():
             logger.debug("Accessing %s via SSH", self.config.ipv4)
             self.touch_ssh_welcome_message()
             wrapped_command = self.get_ssh_command(command, forward_port)
+        elif self.connection == "adb" and not self.config.xenial_adb:
+            logger.debug("Accessing device via ADB shell session")
+            output = self.run_adb_shell_command(command, forward_port)
+
+            if not get_output:
+                print_prefixed(output)
+
+            return output
         elif self.connection == "adb":
             logger.debug("Accessing device via ADB")
             wrapped_command = self.get_adb_command(command, forward_port)
@@ -218,16 +324,44 @@ class Device():
         output = run_subprocess_check_output(wrapped_command, cwd=cwd, shell=True)
 
         if self.connection == "adb" and output.strip().endswith("ADB_COMMAND_FAILED"):
-            print(output)
+            print_prefixed(output)
             raise ClickableException("Command ran on device via ADB failed. See output above.")
 
         if not get_output:
-            print(output)
+            print_prefixed(output)
 
         return output
 
 
 def detect_adb_attached():
+    """ Returns the attached ADB devices, the list is only queried once per run """
+    global adb_devices  # pylint: disable=global-statement
+
+    if adb_devices is None:
+        adb_devices = query_adb_attached()
+
+    return list(adb_devices)
+
+
+def get_adb_serials():
+    return [device.split(' ')[0] for device in detect_adb_attached()]
+
+
+def get_device_specs(selection, inventory):
+    """ Returns the devices selected by --devices, which is either a comma
+    separated list or "all" for all attached ADB devices and the inventory """
+    if selection == 'all':
+        specs = get_adb_serials() + list(inventory)
+    else:
+        specs = [spec.strip() for spec in selection.split(',') if spec.strip()]
+
+    if not specs:
+        raise ClickableException('No devices selected')
+
+    return list(dict.fromkeys(specs))
+
+
+def query_adb_attached():
     output = run_subprocess_check_output('adb devices -l').strip()
     devices = []
     for line in output.split('\n'):
@@ -243,14 +377,23 @@ def detect_adb_attached():
     return devices
 
 
-def assemble_ssh_command(ipv4, ssh_port, command, forward_port=None, interactive=False):
+def get_ssh_control_args(control_path):
+    return (f'-o ControlMaster=auto -o ControlPath={control_path} '
+            f'-o ControlPersist={Constants.ssh_control_persist}')
+
+
+def assemble_ssh_command(ipv4, ssh_port, command, forward_port=None, interactive=False, *,
+                         control_path=None):
     ssh_args = "" if interactive else "-T"
 
     if ssh_port:
         ssh_args = f"{ssh_args} -o Port={ssh_port}"
 
     if forward_port:
+        # Forwardings requested through a master connection would outlive the command
         ssh_args = f"{ssh_args} -L {forward_port}:localhost:{forward_port}"
+    elif control_path:
+        ssh_args = f"{ssh_args} {get_ssh_control_args(control_path)}"
 
     if isinstance(command, list):
         command = " && ".join(command)
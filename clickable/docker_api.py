@@ -0,0 +1,213 @@
+import http.client
+import json
+import os
+import socket
+import stat
+import threading
+import urllib.parse
+
+from clickable.logger import logger
+
+# Clients per docker executable, None if the API is not available
+api_clients = {}
+api_clients_lock = threading.Lock()
+
+# Inspect results of existing images for the life of the process
+image_cache = {}
+image_cache_lock = threading.Lock()
+
+
+class DockerApiError(Exception):
+    pass
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path, timeout=60):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+
+class DockerApi():
+    """ Minimal Docker Engine API client, also compatible with the Podman API.
+
+    All requests share one keep-alive connection. They are sent with the API
+    version the daemon reports, as daemons reject versions they no longer support.
+    """
+
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+        self.connection = UnixHTTPConnection(socket_path)
+        self.lock = threading.Lock()
+        self.version = None
+
+    def request(self, path, versioned=True):
+        if versioned and self.version:
+            path = f'/v{self.version}{path}'
+
+        with self.lock:
+            # Retry once, the daemon may have closed the idle connection
+            for attempt in range(2):
+                try:
+                    self.connection.request('GET', path)
+                    response = self.connection.getresponse()
+                    return response.status, response.read()
+                except (OSError, http.client.HTTPException) as e:
+                    self.connection.close()
+                    if attempt:
+                        raise DockerApiError(f'Request {path} failed: {e}') from e
+
+        return None
+
+    def get_json(self, path, allow_missing=False, versioned=True):
+        status, body = self.request(path, versioned)
+
+        if status == 404 and allow_missing:
+            return None
+
+        if status != 200:
+            raise DockerApiError(f'Request {path} failed with status {status}')
+
+        try:
+            return json.loads(body)
+        except ValueError as e:
+            raise DockerApiError(f'Request {path} returned invalid json') from e
+
+    def inspect_image(self, image):
+        name = urllib.parse.quote(image, safe='/:@')
+        return self.get_json(f'/images/{name}/json', allow_missing=True)
+
+    def info(self):
+        return self.get_json('/info')
+
+    def ping(self):
+        status, _ = self.request('/_ping', versioned=False)
+        return status == 200
+
+    def negotiate_version(self):
+        """ Uses the API version of the daemon, unversioned paths if it does
+        not report one """
+        version = self.get_json('/version', versioned=False).get('ApiVersion', None)
+        self.version = version if isinstance(version, str) and version else None
+
+
+def is_socket(path):
+    try:
+        return stat.S_ISSOCK(os.stat(path).st_mode)
+    except OSError:
+        return False
+
+
+def get_socket_candidates(docker_executable):
+    host_var = 'CONTAINER_HOST' if docker_executable == 'podman' else 'DOCKER_HOST'
+    host = os.environ.get(host_var, None)
+
+    if host:
+        if host.startswith('unix://'):
+            return [host[len('unix://'):]]
+
+        # Remote daemons are only supported through the CLI
+        return []
+
+    if docker_executable == 'podman':
+        runtime_dir = os.environ.get('XDG_RUNTIME_DIR', f'/run/user/{os.getuid()}')
+        return [
+            os.path.join(runtime_dir, 'podman', 'podman.sock'),
+            '/run/podman/podman.sock',
+        ]
+
+    return [
+        '/var/run/docker.sock',
+        os.path.expanduser('~/.docker/desktop/docker.sock'),
+    ]
+
+
+def find_socket(docker_executable):
+    for path in get_socket_candidates(docker_executable):
+        if is_socket(path):
+            return path
+
+    return None
+
+
+def is_api_disabled():
+    """ CLICKABLE_DOCKER_API=0 forces the use of the CLI """
+    return os.environ.get('CLICKABLE_DOCKER_API', '').lower() in ['0', 'false', 'no']
+
+
+def get_api(docker_executable):
+    """ Returns an API client for the docker executable or None, if its
+    daemon cannot be reached through a Unix socket """
+    with api_clients_lock:
+        if docker_executable not in api_clients:
+            api = None
+            socket_path = None if is_api_disabled() else find_socket(docker_executable)
+
+            if socket_path:
+                api = DockerApi(socket_path)
+                try:
+                    if api.ping():
+                        api.negotiate_version()
+                    else:
+                        api = None
+                except DockerApiError as e:
+                    logger.debug('The %s API at %s is not usable: %s', docker_executable,
+                                 socket_path, e)
+                    api = None
+
+            if api:
+                logger.debug('Using %s API %s at %s', docker_executable,
+                             api.version or '(unversioned)', socket_path)
+            else:
+                logger.debug('No %s API socket available or the API is disabled, using the CLI',
+                             docker_executable)
+
+            api_clients[docker_executable] = api
+
+        return api_clients[docker_executable]
+
+
+def disable_api(docker_executable, reason):
+    logger.warning('Disabling the %s API, falling back to the slower CLI: %s',
+                   docker_executable, reason)
+
+    with api_clients_lock:
+        api_clients[docker_executable] = None
+
+
+def get_cached_image(image):
+    """ Returns a tuple of (found, inspect result) """
+    with image_cache_lock:
+        if image in image_cache:
+            return True, image_cache[image]
+
+    return False, None
+
+
+def cache_image(image, result):
+    """ Only existing images are cached, so that images pulled or built by
+    other means are found later on """
+    if result is None:
+        return
+
+    with image_cache_lock:
+        image_cache[image] = result
+
+
+def invalidate_images(image=None):
+    """ Drops cached inspect results, needs to be called after pulling,
+    building or removing images """
+    with image_cache_lock:
+        if image:
+            image_cache.pop(image, None)
+        else:
+            image_cache.clear()
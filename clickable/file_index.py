@@ -0,0 +1,89 @@
+import os
+
+# Indexes built during this invocation, see get_file_index()
+file_indexes = {}
+
+
+class FileIndex():
+    """ Index of the files below a directory, built by a single walk.
+
+    Finds the same files in the same order as a top-down os.walk of root:
+    hidden directories (except the ones in keep_dirs) and symlinked directories
+    are not descended into and directories more than depth levels below root
+    are not listed.
+    """
+
+    def __init__(self, root, depth=None, keep_dirs=None):
+        self.root = root
+        self.depth = depth
+        self.keep_dirs = set(keep_dirs) if keep_dirs else set()
+
+        self.paths = []
+        self.by_name = {}
+        self.by_suffix = {}
+
+        self.walk(root, 0)
+
+    def add(self, path, name):
+        index = len(self.paths)
+        self.paths.append(path)
+        self.by_name.setdefault(name, []).append(index)
+
+        pos = name.find('.')
+        while pos >= 0:
+            self.by_suffix.setdefault(name[pos:], []).append(index)
+            pos = name.find('.', pos + 1)
+
+    def walk(self, directory, level):
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return
+
+        subdirs = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+
+            if not is_dir:
+                self.add(entry.path, entry.name)
+            elif entry.is_symlink():
+                continue
+            elif not entry.name.startswith('.') or entry.path in self.keep_dirs:
+                subdirs.append(entry.path)
+
+        if not self.depth or level < self.depth:
+            for subdir in subdirs:
+                self.walk(subdir, level + 1)
+
+    def find(self, names, extensions_only=False):
+        """ Returns all files with one of the names (or extensions) in walk order """
+        indexes = set()
+
+        for name in names:
+            if not extensions_only:
+                indexes.update(self.by_name.get(name, []))
+            elif name.startswith('.'):
+                indexes.update(self.by_suffix.get(name, []))
+            else:
+                indexes.update(i for i, path in enumerate(self.paths)
+                               if os.path.basename(path).endswith(name))
+
+        return [self.paths[i] for i in sorted(indexes)]
+
+
+def get_file_index(root, depth=None, keep_dirs=None):
+    """ Returns the index for root, walking the tree only on first use """
+    key = (root, depth, tuple(sorted(keep_dirs)) if keep_dirs else ())
+
+    if key not in file_indexes:
+        file_indexes[key] = FileIndex(root, depth, keep_dirs)
+
+    return file_indexes[key]
+
+
+def clear_file_indexes():
+    """ Drops all indexes, needs to be called after modifying indexed trees """
+    file_indexes.clear()
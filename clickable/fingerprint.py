@@ -0,0 +1,97 @@
+import fnmatch
+import hashlib
+import json
+import os
+
+from clickable.logger import logger
+from clickable.version import __version__
+
+
+def hash_tree(sha, root, ignore=None, exclude_dirs=None):
+    """ Feeds path, size and modification time of all files below root into sha """
+    ignore = ignore if ignore else []
+    exclude_dirs = {os.path.abspath(d) for d in exclude_dirs} if exclude_dirs else set()
+
+    def is_ignored(entry):
+        if os.path.abspath(entry.path) in exclude_dirs:
+            return True
+
+        return any(fnmatch.fnmatch(entry.name, pattern) for pattern in ignore)
+
+    def walk(directory):
+        try:
+            entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+        except OSError:
+            return
+
+        for entry in entries:
+            if is_ignored(entry):
+                continue
+
+            if entry.is_dir(follow_symlinks=False):
+                walk(entry.path)
+                continue
+
+            stat = entry.stat(follow_symlinks=False)
+            path = os.path.relpath(entry.path, root)
+            sha.update(f'{path}\0{stat.st_size}\0{stat.st_mtime_ns}\n'.encode(errors='replace'))
+
+    if os.path.isdir(root):
+        walk(root)
+
+
+class BuildFingerprint():
+    """ Fingerprint of all inputs of a build, stored next to its results """
+
+    def __init__(self, build_dir):
+        self.path = os.path.join(build_dir, '.clickable', 'fingerprint.json')
+        self.sha = hashlib.sha256()
+        self.sha.update(__version__.encode())
+        self.images = None
+
+    def add_config(self, config):
+        self.sha.update(json.dumps(config, sort_keys=True, default=str).encode())
+
+    def add_tree(self, root, ignore=None, exclude_dirs=None):
+        self.sha.update(f'\0{root}\0'.encode())
+        hash_tree(self.sha, root, ignore, exclude_dirs)
+
+    def add_value(self, value):
+        self.sha.update(f'\0{value}\0'.encode())
+
+    def set_images(self, images):
+        """ Ids of the images the build runs in. Kept apart from the hash as
+        they are only known for sure after the image setup. """
+        self.images = images
+
+    def value(self):
+        return self.sha.hexdigest()
+
+    def stored(self):
+        if not os.path.exists(self.path):
+            return None
+
+        with open(self.path, 'r', encoding='UTF-8') as f:
+            try:
+                return json.load(f)
+            except ValueError:
+                logger.debug('Build fingerprint file is invalid')
+                return None
+
+    def matches(self):
+        stored = self.stored()
+        if not isinstance(stored, dict):
+            return False
+
+        return stored.get('fingerprint', None) == self.value() and \
+            stored.get('images', None) == self.images
+
+    def store(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        with open(self.path, 'w', encoding='UTF-8') as f:
+            json.dump({'fingerprint': self.value(), 'images': self.images}, f)
+
+    def invalidate(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
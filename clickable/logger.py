@@ -1,5 +1,7 @@
 import logging
 import os
+import threading
+from contextlib import contextmanager
 
 from clickable.config.constants import Constants
 
@@ -31,8 +33,35 @@ class ColorFormatter(logging.Formatter):
         return super().format(record)
 
 
+class PrefixFilter(logging.Filter):
+    """ Prefixes messages logged from threads that set a log prefix """
+    def filter(self, record):
+        prefix = get_log_prefix()
+        if prefix:
+            record.msg = f'[{prefix}] {record.msg}'
+        return True
+
+
+log_context = threading.local()
+
+
+def get_log_prefix():
+    return getattr(log_context, 'prefix', None)
+
+
+@contextmanager
+def log_prefix(prefix):
+    previous = get_log_prefix()
+    log_context.prefix = f'{previous}|{prefix}' if previous else prefix
+    try:
+        yield
+    finally:
+        log_context.prefix = previous
+
+
 logger = logging.getLogger('clickable')
 logger.setLevel(logging.DEBUG)
+logger.addFilter(PrefixFilter())
 
 console_handler = logging.StreamHandler()
 console_handler.setFormatter(ColorFormatter())
@@ -0,0 +1,209 @@
+import subprocess
+import sys
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from clickable.exceptions import ClickableException
+from clickable.logger import logger, log_prefix, get_log_prefix
+
+output_lock = threading.Lock()
+running_processes = set()
+output_context = threading.local()
+
+
+@contextmanager
+def captured_output():
+    """ Collects the lines check_call_prefixed() and print_prefixed() would
+    print in the current thread instead of printing them """
+    lines = []
+    output_context.lines = lines
+    try:
+        yield lines
+    finally:
+        output_context.lines = None
+
+
+def get_captured_output():
+    return getattr(output_context, 'lines', None)
+
+
+def write_prefixed(prefix, lines):
+    captured = get_captured_output()
+    if captured is not None:
+        captured.extend(lines)
+        return
+
+    with output_lock:
+        for line in lines:
+            sys.stdout.write(f'[{prefix}] {line}\n')
+        sys.stdout.flush()
+
+
+def check_call_prefixed(cmd, **kwargs):
+    """ Drop-in for subprocess.check_call that prefixes the output of the
+    command with the log prefix of the current thread, if there is one """
+    prefix = get_log_prefix()
+    if not prefix and get_captured_output() is None:
+        return subprocess.check_call(cmd, **kwargs)
+
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                          stdin=subprocess.DEVNULL, **kwargs) as process:
+        with output_lock:
+            running_processes.add(process)
+
+        try:
+            for line in iter(process.stdout.readline, b''):
+                write_prefixed(prefix, [line.decode(errors='replace').rstrip('\r\n')])
+        finally:
+            returncode = process.wait()
+            with output_lock:
+                running_processes.discard(process)
+
+    if returncode:
+        raise subprocess.CalledProcessError(returncode, cmd)
+
+    return returncode
+
+
+def print_prefixed(text):
+    """ Drop-in for print that prefixes each line with the log prefix of the
+    current thread, if there is one """
+    prefix = get_log_prefix()
+    if not prefix and get_captured_output() is None:
+        print(text)
+        return
+
+    write_prefixed(prefix, text.split('\n'))
+
+
+def terminate_running_processes():
+    with output_lock:
+        processes = list(running_processes)
+
+    for process in processes:
+        if process.poll() is None:
+            process.terminate()
+
+
+def check_dependencies(names, dependencies):
+    """ Raises if a dependency is unknown or dependencies form a cycle.
+
+    Returns all names in a stable topological order.
+    """
+    for name in names:
+        for dep in dependencies.get(name, []):
+            if dep not in names:
+                options = ", ".join(names)
+                raise ClickableException(
+                    f'Library "{name}" depends on unknown library "{dep}". '
+                    f'Valid options: {options}'
+                )
+
+    ordered = []
+    visiting = []
+
+    def visit(name):
+        if name in ordered:
+            return
+
+        if name in visiting:
+            cycle = " -> ".join(visiting[visiting.index(name):] + [name])
+            raise ClickableException(f'Library dependencies contain a cycle: {cycle}')
+
+        visiting.append(name)
+        for dep in dependencies.get(name, []):
+            visit(dep)
+        visiting.pop()
+
+        ordered.append(name)
+
+    for name in names:
+        visit(name)
+
+    return ordered
+
+
+def run_dependency_graph(names, dependencies, run, jobs=1):
+    """ Calls run(name) for every name once all its dependencies finished.
+
+    Dependencies not contained in names are considered done. Up to jobs
+    tasks run at the same time, each with its name as log prefix. The first
+    failure stops scheduling further tasks, terminates running processes and
+    is re-raised.
+    """
+    ordered = [name for name in check_dependencies(list(dependencies), dependencies)
+               if name in names]
+
+    if jobs <= 1 or len(ordered) <= 1:
+        for name in ordered:
+            run(name)
+        return
+
+    pending = {
+        name: {dep for dep in dependencies.get(name, []) if dep in ordered}
+        for name in ordered
+    }
+
+    def run_prefixed(name):
+        with log_prefix(name):
+            run(name)
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        running = {}
+        error = None
+
+        while pending or running:
+            if error is None:
+                ready = [name for name, deps in pending.items() if not deps]
+                for name in ready:
+                    del pending[name]
+                    running[executor.submit(run_prefixed, name)] = name
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+
+                if future.exception() is not None:
+                    if error is None:
+                        logger.error('%s failed, stopping the remaining ones', name)
+                        error = future.exception()
+                        terminate_running_processes()
+                    continue
+
+                for deps in pending.values():
+                    deps.discard(name)
+
+        if error is not None:
+            raise error
+
+
+def run_concurrently(names, run, jobs=1):
+    """ Calls run(name) for every name with up to jobs at the same time, each
+    with its name as log prefix. Unlike run_dependency_graph, a failure does
+    not stop the others.
+
+    Returns the exceptions raised per name.
+    """
+    errors = {}
+
+    def run_prefixed(name):
+        with log_prefix(name):
+            try:
+                run(name)
+            except (ClickableException, subprocess.SubprocessError, OSError) as e:
+                logger.error('%s', e)
+                errors[name] = e
+
+    if jobs <= 1 or len(names) <= 1:
+        for name in names:
+            run_prefixed(name)
+    else:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            for future in [executor.submit(run_prefixed, name) for name in names]:
+                future.result()
+
+    return errors
@@ -0,0 +1,205 @@
+import hashlib
+import os
+import shlex
+import subprocess
+import tarfile
+import threading
+import time
+import zlib
+
+from clickable.exceptions import ClickableException
+from clickable.logger import logger
+from clickable.utils import format_size, which
+
+SAMPLE_SIZE = 1024 * 1024
+CHUNK_SIZE = 256 * 1024
+
+# Files that shrink less than this in a quick test are sent uncompressed
+MIN_COMPRESSION_RATIO = 0.9
+
+# Raw throughput in bytes per second below which a link is slow or above which it is fast
+SLOW_LINK = 2 * 1000 * 1000
+FAST_LINK = 30 * 1000 * 1000
+
+# Compression levels for fast, normal and slow links
+COMPRESSION_LEVELS = {
+    'zstd': (1, 3, 9),
+    'gzip': (1, 6, 9),
+}
+
+
+class Compression():
+    def __init__(self, tool, level):
+        self.tool = tool
+        self.level = level
+
+    def get_compress_command(self):
+        if self.tool == 'zstd':
+            return ['zstd', f'-{self.level}', '-T0', '-q', '-c']
+
+        return ['gzip', f'-{self.level}', '-c']
+
+    def get_decompress_command(self):
+        return f'{self.tool} -dc'
+
+    def __str__(self):
+        return f'{self.tool} -{self.level}'
+
+
+class HashingReader():
+    def __init__(self, f):
+        self.f = f
+        self.sha = hashlib.sha256()
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        self.sha.update(data)
+        return data
+
+
+class CountingWriter():
+    def __init__(self, f):
+        self.f = f
+        self.count = 0
+
+    def write(self, data):
+        self.f.write(data)
+        self.count += len(data)
+        return len(data)
+
+
+def get_compression_ratio(path):
+    """ Returns the compressed to original size ratio of the start of the file """
+    with open(path, 'rb') as f:
+        sample = f.read(SAMPLE_SIZE)
+
+    if not sample:
+        return 1.0
+
+    return len(zlib.compress(sample, 1)) / len(sample)
+
+
+def choose_compression(path, remote_zstd=False, rate=None):
+    """ Picks the compression tool and level for the file, considering the
+    throughput of the previous transfer over the same link (if known) """
+    if get_compression_ratio(path) > MIN_COMPRESSION_RATIO:
+        return None
+
+    tool = 'zstd' if remote_zstd and which('zstd') else 'gzip'
+    if not which(tool):
+        return None
+
+    fast, normal, slow = COMPRESSION_LEVELS[tool]
+    if rate is None:
+        level = normal
+    elif rate < SLOW_LINK:
+        level = slow
+    elif rate > FAST_LINK:
+        level = fast
+    else:
+        level = normal
+
+    return Compression(tool, level)
+
+
+def pump(src, dst, writer):
+    """ Copies src to dst, but keeps draining src if dst breaks """
+    for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+        if writer.f is None:
+            continue
+
+        try:
+            writer.write(chunk)
+        except OSError:
+            writer.f = None
+
+    try:
+        dst.close()
+    except OSError:
+        pass
+
+
+def write_tar(sink, src, name):
+    """ Writes a tar stream with src as name, returns its sha256 """
+    with open(src, 'rb') as f:
+        reader = HashingReader(f)
+
+        with tarfile.open(fileobj=sink, mode='w|') as tar:
+            info = tar.gettarinfo(src, arcname=name)
+            info.uid = info.gid = 0
+            info.uname = info.gname = ''
+            tar.addfile(info, reader)
+
+    return reader.sha.hexdigest()
+
+
+def stream_file(ssh_command, src, dst, compression=None):
+    """ Sends src to dst through ssh as a (compressed) tar stream, which keeps
+    the file mode, and verifies its checksum. Returns the number of bytes sent. """
+    dst_dir = os.path.dirname(dst)
+    decompress = f'{compression.get_decompress_command()} | ' if compression else ''
+    remote_command = (f'mkdir -p {dst_dir} && {decompress}tar -xmf - -C {dst_dir} && '
+                      f'sha256sum {dst}')
+
+    command = f'{ssh_command} {shlex.quote(remote_command)}'
+    logger.debug('Streaming %s to %s (%s)', src, dst, compression or 'uncompressed')
+
+    # pylint: disable=consider-using-with
+    ssh = subprocess.Popen(command, shell=True, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    sent = CountingWriter(ssh.stdin)
+    compressor = None
+    pump_thread = None
+
+    try:
+        if compression:
+            compressor = subprocess.Popen(compression.get_compress_command(),
+                                          stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+            pump_thread = threading.Thread(target=pump, args=(compressor.stdout, ssh.stdin, sent))
+            pump_thread.start()
+            sink = compressor.stdin
+        else:
+            sink = sent
+
+        checksum = write_tar(sink, src, os.path.basename(dst))
+    except OSError as e:
+        # The ssh connection broke, its exit code tells more below
+        logger.debug('Writing the transfer stream failed: %s', e)
+        checksum = None
+    finally:
+        if compressor:
+            compressor.stdin.close()
+            pump_thread.join()
+            compressor.wait()
+        else:
+            try:
+                ssh.stdin.close()
+            except OSError:
+                pass
+
+    output = ssh.stdout.read().decode(errors='replace')
+    ssh.stdout.close()
+
+    if ssh.wait() != 0 or checksum is None:
+        raise ClickableException(f'Transferring {src} to the device failed')
+
+    remote_checksum = output.split()[0] if output.split() else None
+    if remote_checksum != checksum:
+        raise ClickableException(f'Checksum of {dst} on the device does not match {src}')
+
+    return sent.count
+
+
+def push_file_stream(ssh_command, src, dst, remote_zstd=False, rate=None):
+    """ Returns the raw throughput in bytes per second """
+    compression = choose_compression(src, remote_zstd, rate)
+    size = os.path.getsize(src)
+
+    start = time.monotonic()
+    sent = stream_file(ssh_command, src, dst, compression)
+    duration = max(time.monotonic() - start, 0.001)
+
+    logger.debug('Pushed %s in %.1fs (%s/s, %s sent, %s)', format_size(size), duration,
+                 format_size(size / duration), format_size(sent),
+                 compression or 'uncompressed')
+
+    return size / duration
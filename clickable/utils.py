@@ -1,20 +1,28 @@
-import itertools
 import subprocess
 import re
 import os
 import shlex
 import glob
+import shutil
 import inspect
+import json
 from os.path import dirname, basename, isfile, isdir, join
 
 from jsonschema import validate, ValidationError
 import yaml
 
+from clickable import docker_api
 from clickable.builders.base import Builder
 from clickable.logger import logger
 from clickable.exceptions import FileNotFoundException, ClickableException
 from clickable.config.constants import Constants
+from clickable.file_index import get_file_index
 from clickable.logger import Colors
+from clickable.parallel import check_call_prefixed
+
+command_paths = {}
+docker_infos = {}
+buildkit_support = {}
 
 
 def prepare_command(cmd, shell=False):
@@ -92,44 +100,18 @@ def find(  # pylint: disable=too-many-positional-arguments
     depth=None
 ):
     found = []
-    searchpaths = []
-    searchpaths.append(cwd)
+    searchpaths = [cwd]
 
-    include_build_dir = False
+    # A build dir inside cwd is indexed along with cwd, even if it is hidden
     if build_dir and not build_dir.startswith(os.path.realpath(cwd) + os.sep):
-        include_build_dir = True
         searchpaths.append(build_dir)
 
-    for (root, dirs, files) in itertools.chain.from_iterable(
-        os.walk(path, topdown=True) for path in searchpaths
-    ):
-        # Ignore hidden directories
-        new_dirs = []
-        for d in dirs:
-            if os.path.join(root, d) == build_dir or not d[0] == '.':
-                new_dirs.append(d)
-
-        dirs[:] = new_dirs
-
-        if depth:
-            if include_build_dir and root.startswith(build_dir):
-                if root.count(os.sep) >= (build_dir.count(os.sep) + depth):
-                    del dirs[:]
-            elif root.startswith(cwd):
-                if root.count(os.sep) >= (cwd.count(os.sep) + depth):
-                    del dirs[:]
-
-        for name in files:
-            ok = name in names
+    keep_dirs = [build_dir] if build_dir else None
+    for path in searchpaths:
+        found += get_file_index(path, depth, keep_dirs).find(names, extensions_only)
 
-            if extensions_only:
-                ok = any([name.endswith(n) for n in names])
-
-            if ok:
-                if ignore_dir is not None and root.startswith(ignore_dir):
-                    continue
-
-                found.append(os.path.join(root, name))
+    if ignore_dir is not None:
+        found = [f for f in found if not os.path.dirname(f).startswith(ignore_dir)]
 
     if not found:
         joined_names = ', '.join(names)
@@ -153,14 +135,17 @@ def find(  # pylint: disable=too-many-positional-arguments
     return file
 
 
-def is_command(command):
-    error_code = run_subprocess_call(
-        shlex.split(f'which {command}'),
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE
-    )
+def which(command):
+    """ Memoized shutil.which, commands are not expected to appear or
+    disappear while clickable is running """
+    if command not in command_paths:
+        command_paths[command] = shutil.which(command)
 
-    return error_code == 0
+    return command_paths[command]
+
+
+def is_command(command):
+    return which(command) is not None
 
 
 def check_command(command):
@@ -285,39 +270,112 @@ def pull_image(image, skip_existing=True, docker_executable=None):
             docker_executable = get_docker_command()
 
         command = f'{docker_executable} pull {image}'
-        run_subprocess_check_call(command)
+        check_call_prefixed(prepare_command(command))
+        docker_api.invalidate_images(image)
 
 
-def image_exists(image, docker_executable=None):
+def inspect_image(image, docker_executable=None):
+    """ Returns the inspect result of an image or None if it does not exist.
+
+    Results of existing images are memoized for the life of the process.
+    Queries go through the Docker/Podman API socket if available, falling back
+    to the CLI otherwise.
+    """
+    found, result = docker_api.get_cached_image(image)
+    if found:
+        return result
+
     if not docker_executable:
         docker_executable = get_docker_command()
 
+    api = docker_api.get_api(docker_executable)
+    if api:
+        try:
+            result = api.inspect_image(image)
+            docker_api.cache_image(image, result)
+            return result
+        except docker_api.DockerApiError as e:
+            docker_api.disable_api(docker_executable, e)
+
     command = f'{docker_executable} image inspect {image}'
-    return run_subprocess_call(
-        command,
-        stderr=subprocess.DEVNULL,
-        stdout=subprocess.DEVNULL
-    ) == 0
+    try:
+        output = run_subprocess_check_output(command, stderr=subprocess.DEVNULL)
+        result = json.loads(output)[0]
+    except (subprocess.CalledProcessError, ValueError, IndexError):
+        result = None
+
+    docker_api.cache_image(image, result)
+    return result
+
+
+def inspect_images(images, docker_executable=None):
+    """ Returns a dict with the inspect result (or None) of each image.
+
+    Without the API socket all uncached images are inspected by one CLI call.
+    """
+    results = {}
+    missing = []
+    for image in dict.fromkeys(images):
+        found, result = docker_api.get_cached_image(image)
+        if found:
+            results[image] = result
+        else:
+            missing.append(image)
 
+    if not missing:
+        return results
 
-def get_image_hash(image, docker_executable=None):
     if not docker_executable:
         docker_executable = get_docker_command()
 
-    format_string = "'{{.Id}}'"
-    command = f"{docker_executable} inspect --format {format_string} {image}"
+    if not docker_api.get_api(docker_executable):
+        command = f'{docker_executable} image inspect {" ".join(missing)}'
+        process = subprocess.run(prepare_command(command), stdout=subprocess.PIPE,
+                                 stderr=subprocess.DEVNULL, check=False)
 
-    return run_subprocess_check_output(command).strip()
+        # Results can only be assigned by position if all images exist
+        if process.returncode == 0:
+            try:
+                inspected = json.loads(process.stdout.decode())
+            except ValueError:
+                inspected = []
 
+            if len(inspected) == len(missing):
+                for image, result in zip(missing, inspected):
+                    docker_api.cache_image(image, result)
+                    results[image] = result
+                return results
+
+    for image in missing:
+        results[image] = inspect_image(image, docker_executable)
+
+    return results
+
+
+def inspect_existing_image(image, docker_executable=None):
+    result = inspect_image(image, docker_executable)
+
+    if result is None:
+        raise subprocess.CalledProcessError(1, f'inspect {image}')
+
+    return result
 
-def image_based_on_hash(image, base_hash, docker_executable=None):
-    if not docker_executable:
-        docker_executable = get_docker_command()
 
-    format_string = "'{{.Config.Labels.base_image_hash}}'"
-    command = f"{docker_executable} inspect --format {format_string} {image}"
+def get_image_labels(image, docker_executable=None):
+    config = inspect_existing_image(image, docker_executable).get('Config', None) or {}
+    return config.get('Labels', None) or {}
 
-    hash_label = run_subprocess_check_output(command).strip()
+
+def image_exists(image, docker_executable=None):
+    return inspect_image(image, docker_executable) is not None
+
+
+def get_image_hash(image, docker_executable=None):
+    return inspect_existing_image(image, docker_executable)['Id']
+
+
+def image_based_on_hash(image, base_hash, docker_executable=None):
+    hash_label = get_image_labels(image, docker_executable).get('base_image_hash', '')
 
     return base_hash == hash_label
 
@@ -326,6 +384,59 @@ def image_based_on(image, base, docker_executable=None):
     return image_based_on_hash(image, get_image_hash(base, docker_executable), docker_executable)
 
 
+def get_docker_info(docker_executable=None):
+    """ Returns the daemon info, memoized for the life of the process """
+    if not docker_executable:
+        docker_executable = get_docker_command()
+
+    if docker_executable not in docker_infos:
+        info = None
+        api = docker_api.get_api(docker_executable)
+        if api:
+            try:
+                info = api.info()
+            except docker_api.DockerApiError as e:
+                docker_api.disable_api(docker_executable, e)
+
+        if info is None:
+            command = f"{docker_executable} info --format '{{{{json .}}}}'"
+            info = json.loads(run_subprocess_check_output(command))
+
+        docker_infos[docker_executable] = info
+
+    return docker_infos[docker_executable]
+
+
+def is_buildkit_available(docker_executable=None):
+    """ Returns whether image builds support cache mounts, memoized for the
+    life of the process """
+    if not docker_executable:
+        docker_executable = get_docker_command()
+
+    if docker_executable not in buildkit_support:
+        if env('DOCKER_BUILDKIT') == '0':
+            available = False
+        elif docker_executable == 'podman':
+            try:
+                version = run_subprocess_check_output(
+                    "podman version --format '{{.Client.Version}}'",
+                    stderr=subprocess.DEVNULL)
+                available = int(version.strip().split('.', maxsplit=1)[0]) >= 4
+            except (subprocess.CalledProcessError, ValueError):
+                available = False
+        else:
+            available = run_subprocess_call(
+                f'{docker_executable} buildx version',
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            ) == 0
+
+        logger.debug('BuildKit cache mounts %s', 'available' if available else 'not available')
+        buildkit_support[docker_executable] = available
+
+    return buildkit_support[docker_executable]
+
+
 def makedirs(path):
     os.makedirs(path, 0o777, True)
     return path
@@ -383,3 +494,12 @@ def let_user_confirm(message, default=True):
         return default
 
     return choice in ['y', 'yes']
+
+
+def format_size(size):
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size < 1000:
+            return f'{size:.1f} {unit}'
+        size /= 1000
+
+    return f'{size:.1f} TB'
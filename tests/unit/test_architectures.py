@@ -1,7 +1,12 @@
+from unittest import mock
+
 from clickable.cli import Cli
+from clickable.commands.base import get_requested_archs
 from clickable.commands.build import BuildCommand
 from clickable.commands.create import CreateCommand
 from clickable.config.constants import Constants
+from clickable.exceptions import ClickableException
+from ..mocks import empty_fn
 from .base_test import UnitTest
 
 
@@ -154,3 +159,44 @@ class TestArchitectures(UnitTest):
             build_cmd=False,
             expect_exception=True
         )
+
+
+class TestMultipleArchitectures(UnitTest):
+    def parse_args(self, cli_args):
+        cli = Cli()
+        cli.add_cmd_parser(BuildCommand())
+        cli.add_cmd_parser(CreateCommand())
+        return cli.parse_args(cli_args)
+
+    def test_arch_list(self):
+        args = self.parse_args(['build', '--arch', 'armhf,arm64,armhf'])
+        self.assertEqual(get_requested_archs(args), ['armhf', 'arm64'])
+
+        args = self.parse_args(['build', '--all-archs'])
+        self.assertEqual(get_requested_archs(args), Constants.archs)
+
+    def test_fail_invalid_arch_list(self):
+        with self.assertRaises(SystemExit):
+            self.parse_args(['build', '--arch', 'armhf,i386'])
+
+        with self.assertRaises(SystemExit):
+            self.parse_args(['build', '--arch', 'armhf,all'])
+
+    def test_fail_arch_list_for_other_commands(self):
+        args = self.parse_args(['create', '--arch', 'armhf,arm64'])
+
+        with self.assertRaises(ClickableException):
+            CreateCommand().start(args)
+
+    @mock.patch('clickable.commands.build.BuildCommand.run', side_effect=empty_fn)
+    def test_build_summary(self, mock_run):
+        commands = {'armhf': BuildCommand(), 'arm64': BuildCommand()}
+        commands['armhf'].click_path = '/out/app_armhf.click'
+        commands['arm64'].click_path = '/out/app_arm64.click'
+
+        with self.assertLogs('clickable', level='INFO') as logs:
+            BuildCommand().build_archs(commands, jobs=2)
+
+        self.assertEqual(mock_run.call_count, 2)
+        self.assertIn('armhf: /out/app_armhf.click', logs.output[-1])
+        self.assertIn('arm64: /out/app_arm64.click', logs.output[-1])
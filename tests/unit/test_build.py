@@ -1,7 +1,11 @@
+import os
+import shutil
+import tempfile
 from unittest import mock
 from unittest.mock import ANY
 
 from clickable.commands.build import BuildCommand
+from clickable.exceptions import ClickableException
 from ..mocks import empty_fn, false_fn
 from .base_test import UnitTest
 
@@ -11,6 +15,8 @@ import pytest
 @pytest.fixture(autouse=True)
 def mock_function(monkeypatch):
     monkeypatch.setattr("clickable.container.Container.is_docker_desktop", false_fn)
+    monkeypatch.setattr("clickable.container.Container.check_docker", empty_fn)
+    monkeypatch.setattr("clickable.container.get_docker_command", lambda: 'docker')
 
 
 class TestBuildCommand(UnitTest):
@@ -68,5 +74,140 @@ class TestBuildCommand(UnitTest):
         mock_makedirs.assert_called_with(ANY, ANY, ANY)
         mock_copyfile.assert_called_with(ANY, ANY)
 
+    @mock.patch('clickable.commands.build.BuildCommand.build', side_effect=empty_fn)
+    @mock.patch('clickable.commands.build.BuildCommand.get_app_fingerprint')
+    def test_app_up_to_date(self, mock_fingerprint, mock_build):
+        mock_fingerprint.return_value.matches.return_value = True
+        self.command.skip_click = True
+        self.config.install_dir = tempfile.mkdtemp()
+
+        try:
+            self.command.build_app()
+        finally:
+            shutil.rmtree(self.config.install_dir)
+
+        mock_build.assert_not_called()
+        mock_fingerprint.return_value.store.assert_not_called()
+
+    @mock.patch('clickable.commands.build.BuildCommand.build', side_effect=empty_fn)
+    @mock.patch('clickable.commands.build.BuildCommand.get_image_ids',
+                return_value=['sha256:2', 'sha256:1'])
+    @mock.patch('clickable.commands.build.BuildCommand.get_app_fingerprint')
+    def test_app_outdated(self, mock_fingerprint, mock_image_ids, mock_build):
+        mock_fingerprint.return_value.matches.return_value = False
+        self.command.skip_click = True
+        self.command.skip_review = True
+
+        self.command.build_app()
+
+        mock_build.assert_called_once()
+        mock_fingerprint.return_value.invalidate.assert_called_once()
+        # The images are only known for sure after the image setup during the build
+        mock_image_ids.assert_called_once_with(self.command.container)
+        mock_fingerprint.return_value.set_images.assert_called_once_with(
+            ['sha256:2', 'sha256:1'])
+        mock_fingerprint.return_value.store.assert_called_once()
+
+    @mock.patch('clickable.commands.build.get_image_hash', side_effect=OSError)
+    def test_image_not_inspectable(self, mock_image_hash):
+        self.command.container.docker_mode = True
+
+        self.assertIsNone(self.command.get_app_fingerprint())
+        mock_image_hash.assert_called_once()
+
+
+class TestInstallFiles(UnitTest):
+    def setUp(self):
+        super().setUp()
+        self.command = BuildCommand()
+
+        self.root_dir = tempfile.mkdtemp()
+        self.setUpConfig(commands="build", mock_config_json={})
+        self.config.root_dir = self.root_dir
+        self.config.install_dir = os.path.join(self.root_dir, 'install')
+
+        os.makedirs(os.path.join(self.root_dir, 'assets', 'icons'))
+        for name in ['logo.png', 'splash.png', 'notes.txt']:
+            with open(os.path.join(self.root_dir, 'assets', name), 'w', encoding='UTF-8') as f:
+                f.write(name)
+        os.symlink('logo.png', os.path.join(self.root_dir, 'assets', 'link.png'))
+
+    def tearDown(self):
+        shutil.rmtree(self.root_dir)
+        super().tearDown()
+
+    @mock.patch('clickable.container.Container.run_command', side_effect=empty_fn)
+    def test_host_files_without_container(self, mock_run_command):
+        self.config.install_data = {
+            os.path.join(self.root_dir, 'assets', '*.png'): 'share',
+            os.path.join(self.root_dir, 'assets', 'icons'): 'share',
+        }
+        self.command.install_additional_files()
+
+        mock_run_command.assert_not_called()
+
+        share = os.path.join(self.config.install_dir, 'share')
+        self.assertEqual(sorted(os.listdir(share)),
+                         ['icons', 'link.png', 'logo.png', 'splash.png'])
+        self.assertTrue(os.path.islink(os.path.join(share, 'link.png')))
+
+    @mock.patch('clickable.container.Container.run_command', side_effect=empty_fn)
+    def test_host_files_not_found(self, mock_run_command):
+        self.config.install_data = {
+            os.path.join(self.root_dir, 'assets', '*.svg'): 'share',
+        }
+
+        with self.assertRaises(ClickableException):
+            self.command.install_additional_files()
+
+    @mock.patch('clickable.container.Container.run_command')
+    def test_container_files_batched(self, mock_run_command):
+        mock_run_command.side_effect = [
+            '@@CLICKABLE_INSTALL_QUERY0\n/usr/lib/libfoo.so.1\n'
+            '@@CLICKABLE_INSTALL_QUERY1\n/usr/bin/foo\n',
+            '',
+        ]
+        self.config.install_data = {
+            '/usr/lib/libfoo.so*': 'lib',
+            '/usr/bin/foo': 'bin',
+        }
+        self.command.install_additional_files()
+
+        self.assertEqual(mock_run_command.call_count, 2)
+        copy_command = mock_run_command.call_args[0][0]
+        self.assertIn('/usr/lib/libfoo.so.1', copy_command)
+        self.assertIn('/usr/bin/foo', copy_command)
+
+    @mock.patch('clickable.container.Container.run_command')
+    def test_install_order_kept(self, mock_run_command):
+        calls = []
+        mock_run_command.side_effect = lambda command, **kwargs: calls.append(command) or (
+            '@@CLICKABLE_INSTALL_QUERY0\n/usr/share/foo/logo.png\n'
+            '@@CLICKABLE_INSTALL_QUERY1\n/usr/lib/libfoo.so.1\n'
+            '@@CLICKABLE_INSTALL_QUERY2\n/usr/bin/foo\n')
+
+        share = os.path.join(self.config.install_dir, 'share')
+        self.config.install_data = {
+            '/usr/share/foo/logo.png': 'share',
+            os.path.join(self.root_dir, 'assets', 'logo.png'): 'share',
+            '/usr/lib/libfoo.so*': 'lib',
+            '/usr/bin/foo': 'bin',
+        }
+
+        with mock.patch('clickable.commands.build.copy_no_dereference',
+                        side_effect=lambda src, dest: calls.append(src)):
+            self.command.install_additional_files()
+
+        # The host file is copied after the container file with the same name
+        # it overwrites, the following container files are copied together
+        self.assertEqual(calls[1:], [
+            f'cp --recursive --no-dereference /usr/share/foo/logo.png {share}',
+            os.path.join(self.root_dir, 'assets', 'logo.png'),
+            f'cp --recursive --no-dereference /usr/lib/libfoo.so.1 '
+            f'{os.path.join(self.config.install_dir, "lib")} && '
+            f'cp --recursive --no-dereference /usr/bin/foo '
+            f'{os.path.join(self.config.install_dir, "bin")}',
+        ])
+
 
 # TODO implement more
@@ -2,6 +2,7 @@ from unittest import mock
 from unittest.mock import ANY
 
 from clickable.commands.clean import CleanCommand
+from clickable.config.constants import Constants
 from ..mocks import empty_fn, true_fn
 from .base_test import UnitTest
 
@@ -59,3 +60,13 @@ class TestCleanCommand(UnitTest):
 
         mock_exists.assert_called_with(ANY)
         mock_rmtree.assert_called_with(ANY)
+
+    @mock.patch('shutil.rmtree', side_effect=empty_fn)
+    @mock.patch('os.path.exists', side_effect=true_fn)
+    def test_go_cache(self, mock_exists, mock_rmtree):
+        self.command.app = False
+        self.command.go_cache = True
+        self.command.run()
+
+        mock_rmtree.assert_any_call(Constants.go_cache_dir)
+        mock_rmtree.assert_any_call(Constants.go_mod_cache_dir)
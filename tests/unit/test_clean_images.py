@@ -0,0 +1,72 @@
+from unittest import mock
+
+from clickable.commands.clean_images import CleanImagesCommand, is_based_on
+from clickable.config.constants import Constants
+from clickable.utils import format_size
+from ..mocks import empty_fn, false_fn
+from .base_test import UnitTest
+
+import pytest
+
+BASE_IMAGE = Constants.container_mapping['amd64'][('16.04.5', 'amd64')]
+DERIVED_CURRENT = f'{BASE_IMAGE}-0123456789abcdef'
+DERIVED_OUTDATED = f'{BASE_IMAGE}-fedcba9876543210'
+
+
+@pytest.fixture(autouse=True)
+def mock_function(monkeypatch):
+    monkeypatch.setattr("clickable.container.Container.is_docker_desktop", false_fn)
+    monkeypatch.setattr("clickable.container.Container.check_docker", empty_fn)
+    monkeypatch.setattr("clickable.container.get_docker_command", lambda: 'docker')
+    monkeypatch.setattr("clickable.commands.clean_images.get_docker_command", lambda: 'docker')
+    monkeypatch.setattr("clickable.config.constants.Constants.host_arch", 'amd64')
+
+
+def inspect_images_fn(images, docker_executable):
+    results = {
+        BASE_IMAGE: {'Id': 'sha256:new', 'Size': 3000000000},
+        'sha256:old': {'Id': 'sha256:old', 'Size': 2800000000},
+        DERIVED_CURRENT: {
+            'Id': 'sha256:a',
+            'Size': 3500000000,
+            'Config': {'Labels': {'base_image_hash': 'sha256:new'}},
+        },
+        DERIVED_OUTDATED: {
+            'Id': 'sha256:b',
+            'Size': 3300000000,
+            'Config': {'Labels': {'base_image_hash': 'sha256:old'}},
+        },
+    }
+    return {image: results.get(image, None) for image in images}
+
+
+class TestCleanImagesCommand(UnitTest):
+    def setUp(self):
+        self.command = CleanImagesCommand()
+        self.setUpConfig(commands='clean-images')
+
+    @mock.patch('clickable.commands.clean_images.run_subprocess_check_call')
+    @mock.patch('clickable.commands.clean_images.run_subprocess_check_output',
+                return_value=f'{DERIVED_CURRENT}\n{DERIVED_OUTDATED}\nubuntu:latest\n')
+    @mock.patch('clickable.commands.clean_images.inspect_images', side_effect=inspect_images_fn)
+    def test_clean_obsolete(self, mock_inspect_images, mock_images, mock_check_call):
+        with self.assertLogs('clickable', level='INFO') as logs:
+            self.command.run()
+
+        # Base images, derived images and the bases of deleted images
+        self.assertEqual(mock_inspect_images.call_count, 3)
+        mock_check_call.assert_any_call(f'docker rmi {DERIVED_OUTDATED}')
+        self.assertIn('About 500.0 MB can be reclaimed', '\n'.join(logs.output))
+
+    def test_based_on(self):
+        base = ('clickable/amd64-16.04-amd64', 'sha256:new')
+        result = {'Config': {'Labels': {'base_image_hash': 'sha256:new'}}}
+
+        self.assertTrue(is_based_on(DERIVED_CURRENT, result, base))
+        self.assertTrue(is_based_on(DERIVED_CURRENT[len('docker.io/'):], result, base))
+        self.assertFalse(is_based_on(f'myorg/{DERIVED_CURRENT[len("docker.io/"):]}',
+                                     result, base))
+
+    def test_format_size(self):
+        self.assertEqual(format_size(512), '512.0 B')
+        self.assertEqual(format_size(1500000), '1.5 MB')
@@ -0,0 +1,158 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from clickable.builders.cmake import CMakeBuilder
+from clickable.builders.rust import RustBuilder
+from clickable.config.constants import Constants
+from clickable.container import Container
+from ..mocks import ConfigMock, empty_fn, false_fn
+from .base_test import UnitTest
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def mock_function(monkeypatch):
+    monkeypatch.setattr("clickable.container.Container.is_docker_desktop", false_fn)
+    monkeypatch.setattr("clickable.container.Container.check_docker", empty_fn)
+    monkeypatch.setattr("clickable.container.get_docker_command", lambda: 'docker')
+
+
+class TestCompilerCache(UnitTest):
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+
+        patcher = mock.patch.object(Constants, 'ccache_dir', os.path.join(self.tmp_dir, 'ccache'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+        super().tearDown()
+
+    def create_config(self, builder, compiler_cache=True):
+        return ConfigMock(
+            mock_config_json={'builder': builder, 'compiler_cache': compiler_cache},
+            commands=['build'],
+        )
+
+    def test_config(self):
+        config = self.create_config(Constants.CMAKE)
+        cache_dir = os.path.join(Constants.ccache_dir, config.arch)
+
+        self.assertNotIn('ccache', config.dependencies_host)
+        self.assertEqual(config.get_env_vars()['CCACHE_DIR'], cache_dir)
+        self.assertEqual(Container(config).get_docker_mounts()[cache_dir], cache_dir)
+        self.assertTrue(os.path.isdir(cache_dir))
+
+    def test_not_in_image_args(self):
+        config = self.create_config(Constants.CMAKE)
+
+        # Would make the customized image depend on the checkout location
+        env_vars = config.get_env_vars(include_compiler_cache=False)
+        self.assertNotIn('CCACHE_DIR', env_vars)
+        self.assertNotIn('CCACHE_BASEDIR', env_vars)
+
+    @mock.patch('clickable.container.Container.probe', return_value='')
+    def test_installed_if_missing(self, mock_probe):
+        config = self.create_config(Constants.CMAKE)
+        container = Container(config)
+
+        self.assertIn('ccache', container.get_host_dependency_packages())
+        mock_probe.assert_called_once_with('command -v ccache || true',
+                                           image=container.base_docker_image)
+
+        mock_probe.return_value = '/usr/bin/ccache\n'
+        self.assertNotIn('ccache', container.get_host_dependency_packages())
+
+    @mock.patch('clickable.container.Container.probe', return_value='/usr/bin/ccache\n')
+    @mock.patch('clickable.container.Container.create_custom_container')
+    @mock.patch('clickable.container.image_exists', return_value=True)
+    @mock.patch('clickable.container.is_buildkit_available', return_value=False)
+    def test_base_image_provides_ccache(self, mock_buildkit, mock_image_exists, mock_create,
+                                        mock_probe):
+        config = self.create_config(Constants.CMAKE)
+        container = Container(config)
+        container.docker_name_file = os.path.join(self.tmp_dir, 'image.json')
+        container.docker_file = os.path.join(self.tmp_dir, 'Dockerfile')
+
+        self.assertTrue(container.needs_customized_container())
+        container.setup_customized_image()
+
+        mock_create.assert_not_called()
+        self.assertEqual(container.docker_image, container.base_docker_image)
+
+    @mock.patch('clickable.container.Container.probe', return_value='/usr/bin/ccache\n')
+    def test_stats_diff(self, mock_probe):
+        config = self.create_config(Constants.CMAKE)
+        config.verbose = True
+        builder = CMakeBuilder(config, Container(config), debug_build=False)
+        stats = [
+            'stats_zeroed_timestamp\t0\ndirect_cache_hit\t10\ncache_miss\t5\n',
+            'stats_zeroed_timestamp\t0\ndirect_cache_hit\t13\npreprocessed_cache_hit\t1\n'
+            'cache_miss\t6\n',
+        ]
+
+        with mock.patch('clickable.container.Container.run_command',
+                        side_effect=stats) as mock_run_command, \
+                self.assertLogs('clickable', level='INFO') as logs:
+            builder.show_compiler_cache_stats(builder.read_compiler_cache_stats())
+
+        self.assertIn('Compiler cache: 4 of 5 compilations cached (80%)', '\n'.join(logs.output))
+        for call in mock_run_command.call_args_list:
+            self.assertNotIn('--zero-stats', call[0][0])
+
+    @mock.patch('clickable.container.Container.probe', return_value='/usr/bin/ccache\n')
+    @mock.patch('clickable.container.Container.run_command', side_effect=empty_fn)
+    def test_stats_only_verbose(self, mock_run_command, mock_probe):
+        config = self.create_config(Constants.CMAKE)
+        builder = CMakeBuilder(config, Container(config), debug_build=False)
+
+        builder.show_compiler_cache_stats(builder.read_compiler_cache_stats())
+
+        mock_run_command.assert_not_called()
+
+    def test_disabled(self):
+        config = self.create_config(Constants.CMAKE, compiler_cache=False)
+
+        self.assertNotIn('ccache', config.dependencies_host)
+        self.assertNotIn('CCACHE_DIR', config.get_env_vars())
+
+    @mock.patch('clickable.container.Container.probe', return_value='/usr/bin/ccache\n')
+    @mock.patch('clickable.container.Container.run_command', side_effect=empty_fn)
+    def test_cmake_launcher(self, mock_run_command, mock_probe):
+        config = self.create_config(Constants.CMAKE)
+        builder = CMakeBuilder(config, Container(config), debug_build=False)
+
+        builder.build()
+
+        cmake_command = mock_run_command.call_args_list[0][0][0]
+        self.assertIn('-DCMAKE_C_COMPILER_LAUNCHER=ccache', cmake_command)
+        self.assertIn('-DCMAKE_CXX_COMPILER_LAUNCHER=ccache', cmake_command)
+        mock_probe.assert_called_once()
+
+    @mock.patch('clickable.container.Container.probe', return_value='')
+    @mock.patch('clickable.container.Container.run_command', side_effect=empty_fn)
+    def test_cache_not_available(self, mock_run_command, mock_probe):
+        config = self.create_config(Constants.CMAKE)
+        builder = CMakeBuilder(config, Container(config), debug_build=False)
+
+        with self.assertLogs('clickable', level='WARNING'):
+            builder.build()
+
+        self.assertNotIn('COMPILER_LAUNCHER', mock_run_command.call_args_list[0][0][0])
+
+    @mock.patch('clickable.container.Container.probe')
+    @mock.patch('clickable.container.Container.run_command', side_effect=empty_fn)
+    def test_rust_not_cached(self, mock_run_command, mock_probe):
+        config = self.create_config(Constants.RUST)
+        builder = RustBuilder(config, Container(config), debug_build=False)
+
+        builder.build()
+
+        mock_probe.assert_not_called()
+        self.assertNotIn('CCACHE_DIR', config.get_env_vars())
+        self.assertEqual(Container(config).get_host_dependency_packages(), [])
@@ -0,0 +1,356 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from clickable.config.constants import Constants
+from clickable.container import Container
+from ..mocks import ConfigMock, empty_fn, false_fn
+from .base_test import UnitTest
+
+import pytest
+
+real_check_docker = Container.check_docker
+
+
+@pytest.fixture(autouse=True)
+def mock_function(monkeypatch):
+    monkeypatch.setattr("clickable.container.Container.is_docker_desktop", false_fn)
+    monkeypatch.setattr("clickable.container.Container.check_docker", empty_fn)
+    monkeypatch.setattr("clickable.container.get_docker_command", lambda: 'docker')
+
+
+def session_id_fn(*args, **kwargs):
+    return 'abc123\n'
+
+
+class TestContainerSession(UnitTest):
+    def setUp(self):
+        super().setUp()
+        self.config = ConfigMock(
+            mock_config_json={},
+            mock_config_env={'CLICKABLE_CONTAINER_SESSION': '1'},
+            commands=['build'],
+        )
+        self.container = Container(self.config)
+
+    @mock.patch('subprocess.call', side_effect=empty_fn)
+    def tearDown(self, mock_call):
+        self.container.stop_session()
+        super().tearDown()
+
+    @mock.patch('subprocess.check_call', side_effect=empty_fn)
+    @mock.patch('clickable.container.run_subprocess_check_output', side_effect=session_id_fn)
+    def test_session_reused(self, mock_start, mock_check_call):
+        self.container.run_command('make')
+        self.container.run_command('make install')
+
+        mock_start.assert_called_once()
+        self.assertIn('sleep', mock_start.call_args[0][0])
+
+        for call in mock_check_call.call_args_list:
+            command = call[0][0]
+            self.assertEqual(command[:2], ['docker', 'exec'])
+            self.assertIn('abc123', command)
+
+    @mock.patch('subprocess.check_call', side_effect=empty_fn)
+    @mock.patch('clickable.container.run_subprocess_check_output', side_effect=session_id_fn)
+    def test_tty_command_without_session(self, mock_start, mock_check_call):
+        self.container.run_command('bash', tty=True, use_build_dir=False)
+
+        mock_start.assert_not_called()
+        command = mock_check_call.call_args[0][0]
+        self.assertEqual(command[:2], ['docker', 'run'])
+
+    @mock.patch('subprocess.call', side_effect=empty_fn)
+    @mock.patch('subprocess.check_call', side_effect=empty_fn)
+    @mock.patch('clickable.container.run_subprocess_check_output', side_effect=session_id_fn)
+    def test_session_stopped(self, mock_start, mock_check_call, mock_call):
+        self.container.run_command('make')
+        self.container.stop_session()
+
+        command = mock_call.call_args[0][0]
+        self.assertEqual(command, ['docker', 'rm', '--force', 'abc123'])
+        self.assertIsNone(self.container.session)
+
+
+class TestContainerProbe(UnitTest):
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.config = ConfigMock(
+            mock_config_json={},
+            mock_config_env={},
+            commands=['build'],
+        )
+        self.container = Container(self.config)
+        self.container.probe_file = os.path.join(self.tmp_dir, 'probe.json')
+        self.container.clickable_dir = self.tmp_dir
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+        super().tearDown()
+
+    @mock.patch('clickable.container.get_image_hash', return_value='sha256:1')
+    @mock.patch('clickable.container.Container.run_command', return_value='/usr/bin:/bin\n')
+    def test_probe_cached(self, mock_run_command, mock_hash):
+        self.assertEqual(self.container.probe('echo ${PATH}'), '/usr/bin:/bin\n')
+        self.assertEqual(self.container.probe('echo ${PATH}'), '/usr/bin:/bin\n')
+
+        mock_run_command.assert_called_once()
+
+    @mock.patch('clickable.container.get_image_hash', return_value='sha256:1')
+    @mock.patch('clickable.container.Container.run_command', return_value='/usr/bin:/bin\n')
+    def test_probe_image_changed(self, mock_run_command, mock_hash):
+        self.container.probe('echo ${PATH}')
+        mock_hash.return_value = 'sha256:2'
+        self.container.probe('echo ${PATH}')
+
+        self.assertEqual(mock_run_command.call_count, 2)
+
+
+class TestDockerCheck(UnitTest):
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.config = ConfigMock(mock_config_json={}, commands=['build'])
+        self.container = Container(self.config)
+        Container.docker_checked = False
+
+    def tearDown(self):
+        Container.docker_checked = False
+        shutil.rmtree(self.tmp_dir)
+        super().tearDown()
+
+    def test_checked_once(self):
+        cache_path = os.path.join(self.tmp_dir, 'docker-ready.json')
+        cache_key = {'boot_id': 'abc', 'socket_inode': 1}
+
+        with mock.patch.object(Constants, 'docker_ready_cache_path', cache_path), \
+                mock.patch.object(Container, 'is_systemd_used', return_value=True), \
+                mock.patch.object(Container, 'get_docker_ready_cache_key',
+                                  return_value=cache_key), \
+                mock.patch.object(Container, 'is_docker_ready',
+                                  return_value=True) as mock_ready:
+            real_check_docker(self.container)
+            real_check_docker(self.container)
+            mock_ready.assert_called_once()
+
+            # A new process uses the cache on disk
+            Container.docker_checked = False
+            real_check_docker(self.container)
+            mock_ready.assert_called_once()
+
+            # Restarting docker changes the socket inode
+            Container.docker_checked = False
+            cache_key['socket_inode'] = 2
+            real_check_docker(self.container)
+            self.assertEqual(mock_ready.call_count, 2)
+
+
+class TestCustomizedImage(UnitTest):
+    def setUp(self):
+        super().setUp()
+        self.config = ConfigMock(
+            mock_config_json={
+                'dependencies_host': ['cmake-extras', 'bison', 'bison'],
+                'dependencies_target': ['libzip-dev', 'libssl-dev'],
+                'dependencies_ppa': ['ppa:foo/bar'],
+                'image_setup': {'run': ['echo custom'], 'env': {'FOO': 'bar'}},
+            },
+            commands=['build'],
+        )
+        self.container = Container(self.config)
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.container.clickable_dir = self.tmp_dir
+        self.container.docker_file = os.path.join(self.tmp_dir, 'Dockerfile')
+        self.container.docker_name_file = os.path.join(self.tmp_dir, 'image.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+        super().tearDown()
+
+    def setup_image(self, buildkit=False, existing=False):
+        def image_exists(image, _):
+            return existing or image == self.container.base_docker_image
+
+        with mock.patch('clickable.container.is_buildkit_available', return_value=buildkit), \
+                mock.patch('clickable.container.image_exists', side_effect=image_exists), \
+                mock.patch('clickable.container.get_image_hash', return_value='sha256:1'), \
+                mock.patch.object(Container, 'create_custom_container') as mock_create:
+            self.container.setup_customized_image()
+
+        return mock_create
+
+    def construct_dockerfile(self, buildkit):
+        return self.setup_image(buildkit).call_args[0][0].splitlines()
+
+    def test_layers(self):
+        lines = self.construct_dockerfile(buildkit=False)
+        runs = [line for line in lines if line.startswith('RUN ')]
+
+        self.assertEqual(lines[:3], [
+            f'FROM {self.container.base_docker_image}',
+            'LABEL base_image_hash="sha256:1"',
+            'ENV FOO="bar"',
+        ])
+        self.assertIn('add-apt-repository -y ppa:foo/bar', runs[1])
+        self.assertIn('--no-install-recommends bison cmake-extras &&', runs[2])
+        self.assertIn(f'libssl-dev:{self.config.arch} libzip-dev:{self.config.arch} &&',
+                      runs[3])
+        self.assertEqual(runs[-1], 'RUN echo custom')
+
+        # Args are only declared right before custom commands
+        first_arg = next(i for i, line in enumerate(lines) if line.startswith('ARG '))
+        self.assertGreater(first_arg, lines.index(runs[3]))
+        self.assertEqual(self.config.dependencies_host, ['cmake-extras', 'bison', 'bison'])
+
+    def test_buildkit_cache_mounts(self):
+        runs = [line for line in self.construct_dockerfile(buildkit=True)
+                if line.startswith('RUN ')]
+
+        # The apt configuration of the image stays untouched
+        self.assertNotIn('/etc/apt', runs[0])
+        cache_id = f'clickable-apt-{self.config.framework_base}-{self.config.arch}'
+        for run in runs[2:4]:
+            self.assertIn(f'--mount=type=cache,id={cache_id},target=/var/cache/clickable-apt,'
+                          'sharing=locked', run)
+            self.assertIn('-o Dir::Cache::Archives=/var/cache/clickable-apt '
+                          '-o APT::Keep-Downloaded-Packages=true', run)
+            self.assertNotIn('apt-get clean', run)
+            # Package lists are kept in the image for apt-get calls in later layers
+            self.assertNotIn('/var/lib/apt/lists', run)
+            self.assertIn('apt-get update', run)
+
+    def test_image_named_by_content(self):
+        mock_create = self.setup_image()
+        dockerfile_content, image = mock_create.call_args[0]
+
+        self.assertEqual(image, self.container.get_custom_image_name(dockerfile_content,
+                                                                     'sha256:1'))
+        self.assertTrue(image.startswith(f'{self.container.base_docker_image}-'))
+
+        other = Container(self.config)
+        self.assertEqual(image, other.get_custom_image_name(dockerfile_content, 'sha256:1'))
+        self.assertNotEqual(image, other.get_custom_image_name(dockerfile_content, 'sha256:2'))
+
+    def test_existing_image_reused(self):
+        mock_create = self.setup_image(existing=True)
+
+        mock_create.assert_not_called()
+        self.assertNotEqual(self.container.docker_image, self.container.base_docker_image)
+        self.assertTrue(os.path.exists(self.container.docker_file))
+        with open(self.container.docker_name_file, 'r', encoding='UTF-8') as f:
+            self.assertIn(self.container.docker_image, f.read())
+
+
+class TestContainerModeSetup(UnitTest):
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.config = ConfigMock(
+            mock_config_json={
+                'dependencies_host': ['cmake-extras', 'bison'],
+                'dependencies_target': ['libzip-dev'],
+            },
+            mock_config_env={'CLICKABLE_CONTAINER_MODE': '1'},
+            commands=['build'],
+        )
+        self.container = Container(self.config)
+
+        self.state_path = os.path.join(self.tmp_dir, 'container-mode-setup.json')
+        self.apt_cache_dir = os.path.join(self.tmp_dir, 'apt-cache')
+        for key, path in [('container_mode_setup_path', self.state_path),
+                          ('apt_cache_dir', self.apt_cache_dir)]:
+            patcher = mock.patch.object(Constants, key, path)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+        super().tearDown()
+
+    def test_missing_packages(self):
+        arch = self.config.arch
+        dpkg_output = f'bison:{arch} installed\nlibzip-dev:{arch} not-installed\n'
+
+        with mock.patch.object(Container, 'run_command', return_value=dpkg_output) as mock_run:
+            missing = self.container.get_missing_packages(
+                ['bison', 'cmake-extras', f'libzip-dev:{arch}'])
+
+        mock_run.assert_called_once()
+        self.assertEqual(missing, ['cmake-extras', f'libzip-dev:{arch}'])
+
+    def test_unchanged_setup_skipped(self):
+        with mock.patch.object(Container, 'get_missing_packages',
+                               return_value=[]) as mock_missing, \
+                mock.patch.object(Container, 'run_command') as mock_run:
+            self.container.setup_container_mode()
+            self.container.setup_container_mode()
+
+        # Nothing is missing, so there is no apt-get update
+        mock_missing.assert_called_once()
+        mock_run.assert_not_called()
+
+        self.config.dependencies_host.append('flex')
+        with mock.patch.object(Container, 'get_missing_packages',
+                               return_value=['flex']) as mock_missing, \
+                mock.patch.object(Container, 'run_command') as mock_run:
+            self.container.setup_container_mode()
+
+        mock_missing.assert_called_once()
+        self.assertEqual(mock_run.call_args_list[0][0][0], 'apt-get update')
+
+        # Packages are downloaded to the cache on the host
+        archives_dir = os.path.join(self.apt_cache_dir,
+                                    f'{self.config.framework_base}-{self.config.arch}')
+        install_cmd = mock_run.call_args_list[1][0][0]
+        self.assertIn(f'-o Dir::Cache::Archives={archives_dir} '
+                      '-o APT::Keep-Downloaded-Packages=true flex', install_cmd)
+        self.assertNotIn('apt-get clean', install_cmd)
+        self.assertTrue(os.path.isdir(os.path.join(archives_dir, 'partial')))
+
+    def test_new_container_not_skipped(self):
+        self.config.image_setup = {'run': ['echo setup']}
+
+        with mock.patch.object(Container, 'get_missing_packages', return_value=[]), \
+                mock.patch.object(Container, 'get_container_identity',
+                                  side_effect=['a', 'a', 'b', 'b']), \
+                mock.patch.object(Container, 'run_command') as mock_run:
+            self.container.setup_container_mode()
+            self.container.setup_container_mode()
+
+        # Same package database, but the second run is in a new container
+        self.assertEqual(mock_run.call_count, 2)
+
+
+class TestGoCache(UnitTest):
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+
+        for key, name in [('go_cache_dir', 'cache'), ('go_mod_cache_dir', 'mod')]:
+            patcher = mock.patch.object(Constants, key, os.path.join(self.tmp_dir, name))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.config = ConfigMock(
+            mock_config_json={'builder': 'go', 'gopath': os.path.join(self.tmp_dir, 'gopath')},
+            commands=['build'],
+        )
+        self.container = Container(self.config)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+        super().tearDown()
+
+    def test_cache_mounted(self):
+        go_cache = os.path.join(Constants.go_cache_dir, self.config.arch)
+        mounts = self.container.get_docker_mounts()
+        env_vars = self.config.get_env_vars()
+
+        self.assertEqual(mounts[go_cache], go_cache)
+        self.assertEqual(mounts[Constants.go_mod_cache_dir], Constants.go_mod_cache_dir)
+        self.assertEqual(env_vars['GOCACHE'], go_cache)
+        self.assertEqual(env_vars['GOMODCACHE'], Constants.go_mod_cache_dir)
@@ -0,0 +1,152 @@
+import os
+import shutil
+import subprocess
+import tempfile
+from unittest import mock
+
+from clickable.commands.deploy import DeployCommand, get_file_manifest
+from ..mocks import empty_fn
+from .base_test import UnitTest
+
+
+def write_file(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='UTF-8') as f:
+        f.write(content)
+
+
+@mock.patch('clickable.commands.launch.LaunchCommand.run', side_effect=empty_fn)
+@mock.patch('clickable.commands.install.InstallCommand.install_pushed_click', autospec=True)
+@mock.patch('clickable.commands.install.InstallCommand.run', side_effect=empty_fn)
+@mock.patch('clickable.device.Device.push_file', side_effect=empty_fn)
+class TestDeployCommand(UnitTest):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.install_dir = os.path.join(self.tmp_dir, 'install')
+
+        self.command = DeployCommand()
+        self.setUpConfig(commands='deploy', mock_config_json={
+            'build_dir': self.tmp_dir,
+            'install_dir': self.install_dir,
+        })
+        self.command.delta = True
+
+        write_file(os.path.join(self.install_dir, 'qml', 'Main.qml'), 'Item {}')
+        write_file(os.path.join(self.install_dir, 'qml', 'Old.qml'), 'Item {}')
+        write_file(os.path.join(self.install_dir, 'fake', 'foo.desktop'), '[Desktop Entry]')
+
+        self.staging_id = '42\n'
+        self.commands = []
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+        super().tearDown()
+
+    def run_command(self, command, **kwargs):
+        self.commands.append(command)
+        return self.staging_id if 'stat -c %i' in command else ''
+
+    def find_command(self, part):
+        return next(command for command in self.commands if part in command)
+
+    def deploy(self):
+        self.commands = []
+        with mock.patch('clickable.device.Device.run_command', side_effect=self.run_command):
+            self.command.run()
+
+    def test_delta(self, mock_push_file, mock_install, mock_install_pushed, mock_launch):
+        with self.assertLogs('clickable', level='INFO') as logs:
+            self.deploy()
+
+        self.assertIn('Copying all files to the device', '\n'.join(logs.output))
+        self.assertIn('Deploying 3 changed and 0 removed files', '\n'.join(logs.output))
+        self.assertIn('rm -rf /home/phablet/.cache/clickable/deploy/foo.bar',
+                      self.find_command('tar -xzf'))
+
+        write_file(os.path.join(self.install_dir, 'qml', 'Main.qml'), 'Item { id: root }')
+        write_file(os.path.join(self.install_dir, 'qml', 'New.qml'), 'Item {}')
+        os.remove(os.path.join(self.install_dir, 'qml', 'Old.qml'))
+
+        with self.assertLogs('clickable', level='INFO') as logs:
+            self.deploy()
+
+        self.assertIn('Deploying 2 changed and 1 removed files', '\n'.join(logs.output))
+        delta_command = self.find_command('tar -xzf')
+        self.assertNotIn('rm -rf', delta_command)
+        self.assertIn('rm -f /home/phablet/.cache/clickable/deploy/foo.bar/qml/Old.qml',
+                      delta_command)
+        self.assertIn('tar -xzf', delta_command)
+        self.assertIn('click build /home/phablet/.cache/clickable/deploy/foo.bar',
+                      self.find_command('click build'))
+
+        mock_install.assert_not_called()
+        self.assertEqual(mock_push_file.call_count, 2)
+        mock_install_pushed.assert_called_with(
+            mock.ANY, '/home/phablet/.cache/clickable/deploy/foo.bar_1.2.3_all.click')
+        self.assertEqual(mock_launch.call_count, 2)
+
+    def test_hook_file_changed(self, mock_push_file, mock_install, mock_install_pushed,
+                               mock_launch):
+        self.deploy()
+        self.deploy()
+
+        # Unchanged hook files do not need the uninstall pre-step
+        self.assertTrue(mock_install_pushed.call_args[0][0].skip_uninstall)
+
+        write_file(os.path.join(self.install_dir, 'fake', 'foo.desktop'), '[Desktop Entry]\n')
+        self.deploy()
+
+        self.assertFalse(mock_install_pushed.call_args[0][0].skip_uninstall)
+
+    def test_staging_dir_removed(self, mock_push_file, mock_install, mock_install_pushed,
+                                 mock_launch):
+        self.deploy()
+
+        self.staging_id = '43\n'
+        with self.assertLogs('clickable', level='INFO') as logs:
+            self.deploy()
+
+        self.assertIn('Deploying 3 changed and 0 removed files', '\n'.join(logs.output))
+        self.assertIn('rm -rf', self.find_command('tar -xzf'))
+
+    def test_staging_dir_query_failed(self, mock_push_file, mock_install,
+                                      mock_install_pushed, mock_launch):
+        self.deploy()
+
+        def run_command(command, **kwargs):
+            if command.startswith('stat -c %i'):
+                raise subprocess.CalledProcessError(255, 'ssh')
+            return self.run_command(command, **kwargs)
+
+        with mock.patch('clickable.device.Device.run_command', side_effect=run_command), \
+                self.assertLogs('clickable', level='INFO') as logs:
+            self.command.run()
+
+        self.assertIn('Failed to query the copy of the app on the device', '\n'.join(logs.output))
+        self.assertIn('Deploying 3 changed and 0 removed files', '\n'.join(logs.output))
+
+    def test_directory_symlink(self, mock_push_file, mock_install, mock_install_pushed,
+                               mock_launch):
+        os.symlink('qml', os.path.join(self.install_dir, 'qml-link'))
+
+        manifest = get_file_manifest(self.install_dir)
+        self.assertEqual(manifest['qml-link'][2], 'link:qml')
+        self.assertNotIn('qml-link/Main.qml', manifest)
+
+        self.deploy()
+        os.remove(os.path.join(self.install_dir, 'qml-link'))
+
+        with self.assertLogs('clickable', level='INFO') as logs:
+            self.deploy()
+
+        self.assertIn('Deploying 0 changed and 1 removed files', '\n'.join(logs.output))
+        self.assertIn('rm -f /home/phablet/.cache/clickable/deploy/foo.bar/qml-link',
+                      self.find_command('rm -f'))
+
+    def test_full_install(self, mock_push_file, mock_install, mock_install_pushed, mock_launch):
+        self.command.delta = False
+        self.deploy()
+
+        mock_install.assert_called_once_with()
+        mock_install_pushed.assert_not_called()
+        self.assertFalse(os.path.exists(self.command.get_state_path()))
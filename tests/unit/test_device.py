@@ -0,0 +1,122 @@
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+from contextlib import redirect_stdout
+from unittest import TestCase, mock
+
+from clickable.config.constants import Constants
+from clickable.config.device import DeviceConfig
+from clickable.device import Device, detect_adb_attached
+from clickable.exceptions import ClickableException
+from ..mocks import empty_fn
+
+
+class TestSshMultiplexing(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+        patcher = mock.patch.object(Constants, 'ssh_control_dir', self.tmp_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def create_device(self, **config):
+        base = {'selection': 'ssh', 'ipv4': '192.168.1.2', 'ssh_port': '2222'}
+        base.update(config)
+
+        with mock.patch('clickable.device.run_subprocess_check_call', side_effect=empty_fn), \
+                mock.patch('clickable.device.run_subprocess_check_output', return_value='arm64'):
+            return Device(DeviceConfig(base=base))
+
+    @mock.patch('clickable.device.atexit.register')
+    @mock.patch('clickable.device.which', return_value=None)
+    @mock.patch('clickable.device.push_file_stream', return_value=1000)
+    @mock.patch('clickable.device.run_subprocess_check_output', return_value='')
+    def test_connection_reused(self, mock_check_output, mock_push_file_stream, mock_which,
+                               mock_register):
+        device = self.create_device()
+        device.push_file('app.click', '/home/phablet/.cache/app.click')
+        device.run_command('ls', get_output=True)
+
+        control_path = os.path.join(self.tmp_dir, '%C')
+        commands = [call[0][0] for call in mock_check_output.call_args_list +
+                    mock_push_file_stream.call_args_list]
+        self.assertEqual(len(commands), 2)
+        for command in commands:
+            self.assertIn(f'-o ControlPath={control_path}', command)
+
+        mock_register.assert_called_once_with(device.close_ssh_connection)
+
+        with mock.patch('clickable.device.subprocess.call') as mock_call:
+            device.close_ssh_connection()
+            device.close_ssh_connection()
+
+        mock_call.assert_called_once_with(
+            ['ssh', '-O', 'exit', '-o', f'ControlPath={control_path}', '-o', 'Port=2222',
+             'phablet@192.168.1.2'],
+            stdout=mock.ANY, stderr=mock.ANY)
+
+    @mock.patch('clickable.device.atexit.register')
+    def test_forward_port_not_multiplexed(self, mock_register):
+        device = self.create_device()
+
+        self.assertNotIn('ControlPath', device.get_ssh_command('gdbserver', 3333))
+
+    @mock.patch('clickable.device.atexit.register')
+    def test_disabled(self, mock_register):
+        device = self.create_device(ssh_multiplexing=False)
+
+        self.assertNotIn('ControlPath', device.get_ssh_command('ls'))
+        mock_register.assert_not_called()
+
+
+class TestAdbShell(TestCase):
+    def setUp(self):
+        # A local shell stands in for "adb shell"
+        real_popen = subprocess.Popen
+        patcher = mock.patch('clickable.adb_shell.subprocess.Popen',
+                             side_effect=lambda command, **kwargs: real_popen(['sh'], **kwargs))
+        self.mock_popen = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        patcher = mock.patch('clickable.device.atexit.register')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.device = Device(DeviceConfig(base={'selection': 'host'}))
+        self.device.connection = 'adb'
+        self.addCleanup(self.device.get_adb_shell().close)
+
+    def test_session_reused(self):
+        self.assertEqual(self.device.run_command('echo foo', get_output=True), 'foo\n')
+        self.assertEqual(
+            self.device.run_command(['cd /', 'printf \\"%s\\" $(pwd)'], get_output=True), '/')
+
+        with self.assertRaises(ClickableException), redirect_stdout(io.StringIO()):
+            self.device.run_command('echo bar; exit 3')
+
+        self.assertEqual(self.device.run_command('pwd', get_output=True),
+                         f'{os.getcwd()}\n')
+        self.mock_popen.assert_called_once()
+
+    def test_timeout(self):
+        shell = self.device.get_adb_shell()
+
+        with self.assertRaises(subprocess.TimeoutExpired):
+            shell.run('sleep 5', timeout=0.2)
+
+        self.assertFalse(shell.is_running())
+        self.assertEqual(shell.run('echo foo'), (0, 'foo\n'))
+
+    @mock.patch('clickable.device.run_subprocess_check_output',
+                return_value='List of devices attached\n0123 device usb:1-1 model:Pixel_3a\n')
+    def test_devices_listed_once(self, mock_check_output):
+        with mock.patch('clickable.device.adb_devices', None):
+            self.assertEqual(detect_adb_attached(), ['0123 - Pixel 3a'])
+            self.assertTrue(self.device.is_any_adb_attached())
+
+        mock_check_output.assert_called_once_with('adb devices -l')
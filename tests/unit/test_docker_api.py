@@ -0,0 +1,173 @@
+import http.server
+import json
+import os
+import re
+import shutil
+import socketserver
+import tempfile
+import threading
+from unittest import TestCase, mock
+
+from clickable import docker_api
+from clickable.utils import (
+    get_image_hash,
+    image_based_on_hash,
+    image_exists,
+    inspect_image,
+    inspect_images,
+)
+
+IMAGE = {
+    'Id': 'sha256:1',
+    'Config': {
+        'Env': ['PATH=/usr/bin'],
+        'Labels': {'base_image_hash': 'sha256:0'},
+    },
+}
+
+
+class DockerHandler(http.server.BaseHTTPRequestHandler):
+    """ Behaves like Docker Engine 29, which rejects API versions below 1.44 """
+    protocol_version = 'HTTP/1.1'
+    requests = []
+    api_version = '1.44'
+
+    def address_string(self):
+        return 'unix'
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        DockerHandler.requests.append(self.path)
+
+        version = re.match(r'/v(\d+)\.(\d+)/', self.path)
+        if version and (int(version[1]), int(version[2])) < (1, 44):
+            self.respond(400, b'{"message": "client version is too old"}')
+        elif self.path == '/_ping':
+            self.respond(200, b'OK')
+        elif self.path == '/version':
+            self.respond(200, json.dumps({'ApiVersion': DockerHandler.api_version}).encode())
+        elif self.path.endswith('/images/clickable/image:1/json'):
+            self.respond(200, json.dumps(IMAGE).encode())
+        else:
+            self.respond(404, b'{"message": "not found"}')
+
+    def respond(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class DockerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class TestDockerApi(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.tmp_dir, 'docker.sock')
+        self.server = DockerServer(self.socket_path, DockerHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        DockerHandler.requests = []
+        DockerHandler.api_version = '1.44'
+        docker_api.api_clients.clear()
+        docker_api.invalidate_images()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmp_dir)
+
+        docker_api.api_clients.clear()
+        docker_api.invalidate_images()
+
+    def test_find_socket(self):
+        with mock.patch.dict(os.environ, {'DOCKER_HOST': f'unix://{self.socket_path}'}):
+            self.assertEqual(docker_api.find_socket('docker'), self.socket_path)
+
+        with mock.patch.dict(os.environ, {'DOCKER_HOST': 'tcp://127.0.0.1:2375'}):
+            self.assertIsNone(docker_api.find_socket('docker'))
+
+        with mock.patch.dict(os.environ, {'XDG_RUNTIME_DIR': self.tmp_dir}):
+            os.makedirs(os.path.join(self.tmp_dir, 'podman'))
+            os.symlink(self.socket_path, os.path.join(self.tmp_dir, 'podman', 'podman.sock'))
+            self.assertEqual(docker_api.find_socket('podman'),
+                             os.path.join(self.tmp_dir, 'podman', 'podman.sock'))
+
+    def test_inspect_memoized(self):
+        with mock.patch('clickable.docker_api.find_socket', return_value=self.socket_path):
+            self.assertEqual(get_image_hash('clickable/image:1', 'docker'), 'sha256:1')
+            self.assertTrue(image_exists('clickable/image:1', 'docker'))
+            self.assertTrue(image_based_on_hash('clickable/image:1', 'sha256:0', 'docker'))
+            self.assertFalse(image_exists('clickable/missing:1', 'docker'))
+            self.assertFalse(image_exists('clickable/missing:1', 'docker'))
+
+        # Missing images are looked up again, they may have been pulled meanwhile
+        self.assertEqual(DockerHandler.requests, [
+            '/_ping',
+            '/version',
+            '/v1.44/images/clickable/image:1/json',
+            '/v1.44/images/clickable/missing:1/json',
+            '/v1.44/images/clickable/missing:1/json',
+        ])
+
+        docker_api.invalidate_images('clickable/image:1')
+        self.assertIsNotNone(inspect_image('clickable/image:1', 'docker'))
+        self.assertEqual(len(DockerHandler.requests), 6)
+
+    @mock.patch('clickable.utils.run_subprocess_check_output', return_value=json.dumps([IMAGE]))
+    def test_unsupported_version_fallback(self, mock_check_output):
+        # A daemon reporting a version it does not accept
+        DockerHandler.api_version = '1.41'
+
+        with mock.patch('clickable.docker_api.find_socket', return_value=self.socket_path), \
+                self.assertLogs('clickable', level='WARNING') as logs:
+            self.assertEqual(get_image_hash('clickable/image:1', 'docker'), 'sha256:1')
+            self.assertEqual(get_image_hash('clickable/image:2', 'docker'), 'sha256:1')
+
+        self.assertIn('falling back to the slower CLI', '\n'.join(logs.output))
+        self.assertEqual(DockerHandler.requests[-1], '/v1.41/images/clickable/image:1/json')
+        self.assertEqual(len(DockerHandler.requests), 3)
+        mock_check_output.assert_has_calls([
+            mock.call('docker image inspect clickable/image:1', stderr=mock.ANY),
+            mock.call('docker image inspect clickable/image:2', stderr=mock.ANY),
+        ])
+
+    @mock.patch('clickable.utils.run_subprocess_check_output', return_value=json.dumps([IMAGE]))
+    def test_api_disabled_by_env(self, mock_check_output):
+        with mock.patch.dict(os.environ, {'DOCKER_HOST': f'unix://{self.socket_path}',
+                                          'CLICKABLE_DOCKER_API': '0'}):
+            self.assertEqual(get_image_hash('clickable/image:1', 'docker'), 'sha256:1')
+
+        mock_check_output.assert_called_once_with(
+            'docker image inspect clickable/image:1', stderr=mock.ANY)
+        self.assertEqual(DockerHandler.requests, [])
+
+    @mock.patch('clickable.docker_api.find_socket', return_value=None)
+    @mock.patch('clickable.utils.run_subprocess_check_output', return_value=json.dumps([IMAGE]))
+    def test_cli_fallback(self, mock_check_output, mock_find_socket):
+        self.assertEqual(get_image_hash('clickable/image:1', 'podman'), 'sha256:1')
+        self.assertEqual(get_image_hash('clickable/image:1', 'podman'), 'sha256:1')
+
+        mock_find_socket.assert_called_once_with('podman')
+        mock_check_output.assert_called_once_with(
+            'podman image inspect clickable/image:1', stderr=mock.ANY)
+        self.assertEqual(DockerHandler.requests, [])
+
+    @mock.patch('clickable.docker_api.find_socket', return_value=None)
+    @mock.patch('subprocess.run')
+    def test_cli_bulk_inspect(self, mock_run, mock_find_socket):
+        mock_run.return_value.returncode = 0
+        mock_run.return_value.stdout = json.dumps([IMAGE, {'Id': 'sha256:2'}]).encode()
+
+        results = inspect_images(['clickable/image:1', 'clickable/image:2'], 'podman')
+
+        mock_run.assert_called_once()
+        self.assertEqual(mock_run.call_args[0][0],
+                         [b'podman', b'image', b'inspect', b'clickable/image:1',
+                          b'clickable/image:2'])
+        self.assertEqual(results['clickable/image:2']['Id'], 'sha256:2')
+        self.assertEqual(get_image_hash('clickable/image:1', 'podman'), 'sha256:1')
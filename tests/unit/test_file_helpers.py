@@ -0,0 +1,53 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase, mock
+
+from clickable.config.file_helpers import InstallFiles
+
+
+class TestInstallFilesCache(TestCase):
+    def setUp(self):
+        self.install_dir = tempfile.mkdtemp()
+        self.install_files = InstallFiles(self.install_dir, 'cmake', 'arm64')
+        self.manifest_path = os.path.join(self.install_dir, 'manifest.json')
+
+        with open(self.manifest_path, 'w', encoding='UTF-8') as f:
+            json.dump({
+                'name': 'foo.bar',
+                'version': '1.0',
+                'hooks': {'foo': {'desktop': 'foo.desktop', 'apparmor': 'foo.apparmor'}},
+            }, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.install_dir)
+
+    @mock.patch('json.load', wraps=json.load)
+    def test_manifest_parsed_once(self, mock_load):
+        self.assertEqual(self.install_files.find_full_package_name(), 'foo.bar_foo_1.0')
+        self.assertEqual(self.install_files.get_click_filename(), 'foo.bar_1.0_arm64.click')
+
+        mock_load.assert_called_once()
+
+    def test_manifest_copy(self):
+        manifest = self.install_files.get_manifest()
+        manifest['name'] = 'modified'
+
+        self.assertEqual(self.install_files.find_package_name(), 'foo.bar')
+
+    def test_write_manifest(self):
+        manifest = self.install_files.get_manifest()
+        manifest['version'] = '2.0'
+        self.install_files.write_manifest(manifest)
+
+        self.assertEqual(self.install_files.find_version(), '2.0')
+
+    def test_write_apparmor(self):
+        self.install_files.write_apparmor('foo.apparmor', {'policy_version': 16.04})
+        self.assertEqual(self.install_files.load_apparmor('foo.apparmor'),
+                         {'policy_version': 16.04})
+
+        self.install_files.write_apparmor('foo.apparmor', {'policy_version': 20.04})
+        self.assertEqual(self.install_files.load_apparmor('foo.apparmor'),
+                         {'policy_version': 20.04})
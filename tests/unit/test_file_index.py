@@ -0,0 +1,151 @@
+import itertools
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from clickable.file_index import FileIndex, clear_file_indexes
+from clickable.utils import find
+from clickable.exceptions import FileNotFoundException
+
+
+def walk_find(names, cwd, temp_dir=None, build_dir=None, ignore_dir=None,
+              extensions_only=False, depth=None):
+    """ The os.walk based find() the index replaced, results must not differ """
+    found = []
+    searchpaths = [cwd]
+
+    include_build_dir = False
+    if build_dir and not build_dir.startswith(os.path.realpath(cwd) + os.sep):
+        include_build_dir = True
+        searchpaths.append(build_dir)
+
+    for (root, dirs, files) in itertools.chain.from_iterable(
+        os.walk(path, topdown=True) for path in searchpaths
+    ):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) == build_dir or not d[0] == '.']
+
+        if depth:
+            if include_build_dir and root.startswith(build_dir):
+                if root.count(os.sep) >= (build_dir.count(os.sep) + depth):
+                    del dirs[:]
+            elif root.startswith(cwd):
+                if root.count(os.sep) >= (cwd.count(os.sep) + depth):
+                    del dirs[:]
+
+        for name in files:
+            ok = name in names
+
+            if extensions_only:
+                ok = any(name.endswith(n) for n in names)
+
+            if ok:
+                if ignore_dir is not None and root.startswith(ignore_dir):
+                    continue
+
+                found.append(os.path.join(root, name))
+
+    if not found:
+        raise FileNotFoundException('Could not find')
+
+    file = ''
+    for f in found:
+        if temp_dir and f.startswith(os.path.realpath(temp_dir) + os.sep):
+            file = f
+
+    if not file:
+        for f in found:
+            if build_dir and f.startswith(os.path.realpath(build_dir) + os.sep):
+                file = f
+
+    if not file:
+        file = found[0]
+
+    return file
+
+
+class TestFileIndex(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.root_dir = os.path.join(self.tmp_dir, 'app')
+        self.build_dir = os.path.join(self.root_dir, 'build')
+
+        for path in ['app/app.desktop.in', 'app/src/a/b/deep.desktop', 'app/manifest.json',
+                     'app/node_modules/x/y.desktop', 'app/.git/hooks/hook.desktop',
+                     'app/build/all/app/install/app.desktop', 'app/build/all/app/manifest.json',
+                     'app/.build/install/app.desktop', 'outside/install/app.desktop',
+                     'outside/.hidden/app.desktop', 'outside/all/app/install/manifest.json']:
+            path = os.path.join(self.tmp_dir, path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='UTF-8') as f:
+                f.write('')
+
+        os.symlink(os.path.join(self.root_dir, 'src'), os.path.join(self.root_dir, 'link'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+        clear_file_indexes()
+
+    def relative(self, paths):
+        return sorted(os.path.relpath(p, self.root_dir) for p in paths)
+
+    def test_find_by_name_and_extension(self):
+        index = FileIndex(self.root_dir)
+
+        self.assertEqual(self.relative(index.find(['manifest.json'])),
+                         ['build/all/app/manifest.json', 'manifest.json'])
+        self.assertEqual(self.relative(index.find(['.desktop'], extensions_only=True)),
+                         ['build/all/app/install/app.desktop', 'node_modules/x/y.desktop',
+                          'src/a/b/deep.desktop'])
+        self.assertEqual(self.relative(index.find(['.desktop', '.in'], extensions_only=True)),
+                         ['app.desktop.in', 'build/all/app/install/app.desktop',
+                          'node_modules/x/y.desktop', 'src/a/b/deep.desktop'])
+
+    def test_depth(self):
+        index = FileIndex(self.root_dir, depth=2)
+
+        self.assertEqual(self.relative(index.find(['.desktop'], extensions_only=True)),
+                         ['node_modules/x/y.desktop'])
+
+    def test_same_results_as_walk(self):
+        hidden_build_dir = os.path.join(self.root_dir, '.build')
+        outside_build_dir = os.path.join(self.tmp_dir, 'outside')
+        queries = [
+            (['.desktop'], True, None),
+            (['.desktop'], True, 3),
+            (['.desktop'], True, 2),
+            (['manifest.json'], False, None),
+            (['manifest.json'], False, 1),
+            (['.desktop', 'manifest.json'], True, 4),
+        ]
+
+        for build_dir in [None, self.build_dir, hidden_build_dir, outside_build_dir]:
+            for temp_dir in [None, self.root_dir, os.path.join(self.build_dir, 'all')]:
+                for names, extensions_only, depth in queries:
+                    kwargs = {'temp_dir': temp_dir, 'build_dir': build_dir,
+                              'extensions_only': extensions_only, 'depth': depth}
+
+                    with self.subTest(**kwargs, names=names):
+                        self.assertEqual(find(names, self.root_dir, **kwargs),
+                                         walk_find(names, self.root_dir, **kwargs))
+
+        ignore_dir = os.path.join(self.root_dir, 'build')
+        self.assertEqual(
+            find(['manifest.json'], self.root_dir, build_dir=self.build_dir,
+                 ignore_dir=ignore_dir),
+            walk_find(['manifest.json'], self.root_dir, build_dir=self.build_dir,
+                      ignore_dir=ignore_dir))
+
+    def test_find_prefers_build_dir(self):
+        desktop = find(['.desktop'], self.root_dir, build_dir=self.build_dir,
+                       extensions_only=True, depth=4)
+        self.assertEqual(self.relative([desktop]), ['build/all/app/install/app.desktop'])
+
+        # Depth is counted from the project dir, also for a build dir inside it
+        desktop = find(['.desktop'], self.root_dir, build_dir=self.build_dir,
+                       extensions_only=True, depth=3)
+        self.assertEqual(self.relative([desktop]), ['src/a/b/deep.desktop'])
+
+    def test_find_not_found(self):
+        with self.assertRaises(FileNotFoundException):
+            find(['missing.txt'], self.root_dir)
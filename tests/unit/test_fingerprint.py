@@ -0,0 +1,70 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from clickable.fingerprint import BuildFingerprint
+
+
+class TestBuildFingerprint(TestCase):
+    def setUp(self):
+        self.root_dir = tempfile.mkdtemp()
+        self.build_dir = os.path.join(self.root_dir, 'build')
+        os.makedirs(os.path.join(self.root_dir, 'src'))
+        self.write('src/main.cpp', 'int main() {}')
+        self.write('README.md', 'readme')
+
+    def tearDown(self):
+        shutil.rmtree(self.root_dir)
+
+    def write(self, path, content):
+        with open(os.path.join(self.root_dir, path), 'w', encoding='UTF-8') as f:
+            f.write(content)
+
+    def fingerprint(self, config=None):
+        fingerprint = BuildFingerprint(self.build_dir)
+        fingerprint.add_config(config if config else {'builder': 'cmake'})
+        fingerprint.add_tree(self.root_dir, ignore=['*.md'], exclude_dirs=[self.build_dir])
+        return fingerprint
+
+    def test_store_and_match(self):
+        self.assertFalse(self.fingerprint().matches())
+
+        self.fingerprint().store()
+        self.assertTrue(self.fingerprint().matches())
+
+    def test_source_changed(self):
+        self.fingerprint().store()
+        self.write('src/main.cpp', 'int main() { return 0; }')
+
+        self.assertFalse(self.fingerprint().matches())
+
+    def test_config_changed(self):
+        self.fingerprint().store()
+
+        self.assertFalse(self.fingerprint({'builder': 'qmake'}).matches())
+
+    def test_images_changed(self):
+        fingerprint = self.fingerprint()
+        fingerprint.set_images(['sha256:1'])
+        fingerprint.store()
+
+        fingerprint = self.fingerprint()
+        fingerprint.set_images(['sha256:2'])
+        self.assertFalse(fingerprint.matches())
+
+        fingerprint.set_images(['sha256:1'])
+        self.assertTrue(fingerprint.matches())
+
+    def test_ignored_and_excluded(self):
+        self.fingerprint().store()
+        self.write('README.md', 'changed readme')
+        os.makedirs(os.path.join(self.build_dir, 'install'))
+
+        self.assertTrue(self.fingerprint().matches())
+
+    def test_invalidate(self):
+        self.fingerprint().store()
+        self.fingerprint().invalidate()
+
+        self.assertFalse(self.fingerprint().matches())
@@ -0,0 +1,104 @@
+from argparse import Namespace
+from unittest import mock
+
+from clickable.commands.chain import ChainCommand
+from clickable.commands.launch import LaunchCommand
+from clickable.config.device import DeviceConfig
+from clickable.device import get_device_specs
+from clickable.exceptions import ClickableException
+from ..mocks import ConfigMock
+from ..mocks.config import GlobalConfigMock
+from .base_test import UnitTest
+
+ADB_DEVICES = ['0123 - Pixel 3a', '4567 - Volla Phone']
+
+
+def create_device(config):
+    device = mock.Mock(config=config)
+    device.device_arch = 'armhf' if config.selection == 'ssh' else 'arm64'
+    return device
+
+
+def load_configs(command, args):
+    command.global_config = GlobalConfigMock()
+    command.global_config.device.config['inventory'] = ['192.168.1.5']
+
+
+def configure_project(command, args, device_arch):
+    command.config = ConfigMock(mock_config_json={}, mock_install_files=True,
+                                commands=['launch'])
+    command.config.arch = device_arch
+
+
+def create_args(devices, **kwargs):
+    return Namespace(devices=devices, device_jobs=4, arch=None, config=None, xenial_adb=False,
+                     target=None, serial_number=None, ssh=None, **kwargs)
+
+
+@mock.patch('clickable.device.detect_adb_attached', return_value=ADB_DEVICES)
+class TestDeviceSelection(UnitTest):
+    def test_specs(self, mock_detect_adb_attached):
+        self.assertEqual(get_device_specs('all', ['192.168.1.5', '0123']),
+                         ['0123', '4567', '192.168.1.5'])
+        self.assertEqual(get_device_specs('0123, 192.168.1.5:2222', []),
+                         ['0123', '192.168.1.5:2222'])
+
+        with self.assertRaises(ClickableException):
+            get_device_specs(',', [])
+
+    def test_select(self, mock_detect_adb_attached):
+        config = DeviceConfig()
+        config.select('192.168.1.5:2222', ['0123'])
+        self.assertEqual((config.selection, config.ipv4, config.ssh_port),
+                         ('ssh', '192.168.1.5', '2222'))
+
+        config = DeviceConfig()
+        config.select('adb:emulator-5554', ['0123'])
+        self.assertEqual((config.selection, config.serial_number), ('adb', 'emulator-5554'))
+
+
+@mock.patch('clickable.device.detect_adb_attached', return_value=ADB_DEVICES)
+@mock.patch('clickable.commands.base.Device', side_effect=create_device)
+@mock.patch('clickable.commands.base.Command.load_configs', new=load_configs)
+@mock.patch('clickable.commands.base.Command.configure_project', new=configure_project)
+class TestMultiDevice(UnitTest):
+    def test_launch_all(self, mock_device, mock_detect_adb_attached):
+        launched = []
+
+        def launch(command):
+            if command.device.config.serial_number == '4567':
+                raise ClickableException('Launching failed')
+            config = command.device.config
+            launched.append((config.serial_number or config.ipv4, command.config.arch))
+
+        with mock.patch('clickable.commands.launch.LaunchCommand.run', new=launch), \
+                self.assertLogs('clickable', level='INFO') as logs, \
+                self.assertRaises(ClickableException):
+            LaunchCommand().start(create_args('all', package=None, kill=None, skip_kill=True))
+
+        self.assertEqual(sorted(launched), [('0123', 'arm64'), ('192.168.1.5', 'armhf')])
+        self.assertIn('[4567] Launching failed', '\n'.join(logs.output))
+        self.assertIn('Failed (1): 4567', '\n'.join(logs.output))
+
+    @mock.patch('clickable.commands.base.Command.setup')
+    @mock.patch('clickable.commands.chain.ProjectConfig')
+    def test_chain(self, mock_project_config, mock_setup, mock_device, mock_detect_adb_attached):
+        runs = []
+
+        def run(command):
+            runs.append((command.cli_conf.name, command.device))
+
+        args = create_args('0123,4567', commands=['build', 'install', 'launch'], clean=False)
+        with mock.patch('clickable.commands.build.BuildCommand.run', new=run), \
+                mock.patch('clickable.commands.install.InstallCommand.run', new=run), \
+                mock.patch('clickable.commands.launch.LaunchCommand.run', new=run), \
+                mock.patch('clickable.commands.build.BuildCommand.configure_nested'), \
+                mock.patch('clickable.commands.install.InstallCommand.configure_nested'), \
+                mock.patch('clickable.commands.launch.LaunchCommand.configure_nested'):
+            ChainCommand().start(args)
+
+        # Both devices have the same architecture, so the app is built only once
+        self.assertEqual([name for name, _ in runs].count('build'), 1)
+        self.assertEqual(runs[0], ('build', None))
+        self.assertEqual(len({device for name, device in runs if name == 'install'}), 2)
+        self.assertEqual([name for name, _ in runs].count('launch'), 2)
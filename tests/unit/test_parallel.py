@@ -0,0 +1,71 @@
+import threading
+from unittest import TestCase
+
+from clickable.exceptions import ClickableException
+from clickable.logger import get_log_prefix
+from clickable.parallel import check_dependencies, run_dependency_graph
+
+
+class TestDependencyGraph(TestCase):
+    def test_topological_order(self):
+        dependencies = {'app': ['b', 'a'], 'a': [], 'b': ['a']}
+
+        self.assertEqual(check_dependencies(list(dependencies), dependencies),
+                         ['a', 'b', 'app'])
+
+    def test_unknown_dependency(self):
+        with self.assertRaises(ClickableException):
+            check_dependencies(['a'], {'a': ['missing']})
+
+    def test_cycle(self):
+        dependencies = {'a': ['b'], 'b': ['c'], 'c': ['a']}
+
+        with self.assertRaises(ClickableException):
+            check_dependencies(list(dependencies), dependencies)
+
+    def test_sequential_order(self):
+        built = []
+        dependencies = {'c': ['a', 'b'], 'a': [], 'b': ['a']}
+
+        run_dependency_graph(['a', 'b', 'c'], dependencies, built.append)
+
+        self.assertEqual(built, ['a', 'b', 'c'])
+
+    def test_parallel_respects_dependencies(self):
+        lock = threading.Lock()
+        built = []
+        prefixes = []
+        dependencies = {'a': [], 'b': [], 'c': ['a', 'b'], 'd': ['c']}
+
+        def build(name):
+            with lock:
+                built.append(name)
+                prefixes.append(get_log_prefix())
+
+        run_dependency_graph(list(dependencies), dependencies, build, jobs=4)
+
+        self.assertEqual(sorted(built[:2]), ['a', 'b'])
+        self.assertEqual(built[2:], ['c', 'd'])
+        self.assertEqual(sorted(prefixes), ['a', 'b', 'c', 'd'])
+
+    def test_parallel_fail_fast(self):
+        built = []
+        dependencies = {'a': [], 'b': ['a']}
+
+        def build(name):
+            if name == 'a':
+                raise ClickableException('failed')
+            built.append(name)
+
+        with self.assertRaises(ClickableException):
+            run_dependency_graph(['a', 'b'], dependencies, build, jobs=2)
+
+        self.assertEqual(built, [])
+
+    def test_filtered_names(self):
+        built = []
+        dependencies = {'a': [], 'b': ['a']}
+
+        run_dependency_graph(['b'], dependencies, built.append, jobs=2)
+
+        self.assertEqual(built, ['b'])
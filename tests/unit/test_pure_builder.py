@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+
+from clickable.builders.pure import PureBuilder
+from .base_test import UnitTest
+
+
+class TestPureBuilder(UnitTest):
+    def setUp(self):
+        super().setUp()
+        self.root_dir = tempfile.mkdtemp()
+        self.setUpConfig(commands='build', mock_config_json={'builder': 'pure'})
+        self.config.cwd = os.path.join(self.root_dir, 'src')
+        self.config.build_dir = os.path.join(self.config.cwd, 'build')
+        self.config.install_dir = os.path.join(self.root_dir, 'install')
+        self.config.ignore = ['*.pyc']
+
+        self.write('qml/Main.qml', 'Item {}')
+        self.write('assets/logo.svg', '<svg/>')
+        self.write('cache.pyc', '')
+        self.write('build/app', 'binary')
+
+        self.builder = PureBuilder(self.config, None, False)
+
+    def tearDown(self):
+        shutil.rmtree(self.root_dir)
+        super().tearDown()
+
+    def write(self, path, content):
+        path = os.path.join(self.config.cwd, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='UTF-8') as f:
+            f.write(content)
+
+    def installed(self):
+        return sorted(
+            os.path.relpath(os.path.join(root, f), self.config.install_dir)
+            for root, _, files in os.walk(self.config.install_dir)
+            for f in files
+        )
+
+    def test_initial_copy(self):
+        self.assertEqual(self.builder.sync(self.config.cwd, self.config.install_dir), 2)
+        self.assertEqual(self.installed(), ['assets/logo.svg', 'qml/Main.qml'])
+
+    def test_only_changed_files(self):
+        self.builder.build()
+        self.assertEqual(self.builder.sync(self.config.cwd, self.config.install_dir), 0)
+
+        self.write('qml/Main.qml', 'Item { id: root }')
+        self.assertEqual(self.builder.sync(self.config.cwd, self.config.install_dir), 1)
+
+        with open(os.path.join(self.config.install_dir, 'qml/Main.qml'), encoding='UTF-8') as f:
+            self.assertEqual(f.read(), 'Item { id: root }')
+
+    def test_removed_files(self):
+        self.builder.build()
+        os.remove(os.path.join(self.config.cwd, 'assets/logo.svg'))
+        self.builder.build()
+
+        self.assertEqual(self.installed(), ['qml/Main.qml'])
+
+    def test_install_dir_changes_do_not_touch_sources(self):
+        self.builder.build()
+        with open(os.path.join(self.config.install_dir, 'qml/Main.qml'), 'w',
+                  encoding='UTF-8') as f:
+            f.write('modified')
+
+        self.builder.build()
+
+        with open(os.path.join(self.config.cwd, 'qml/Main.qml'), encoding='UTF-8') as f:
+            self.assertEqual(f.read(), 'Item {}')
+        with open(os.path.join(self.config.install_dir, 'qml/Main.qml'), encoding='UTF-8') as f:
+            self.assertEqual(f.read(), 'Item {}')
@@ -1,6 +1,13 @@
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+from contextlib import redirect_stdout
 from unittest import mock
 
 from clickable.commands.review import ReviewCommand
+from clickable.logger import log_prefix
 from ..mocks import empty_fn, false_fn
 from .base_test import UnitTest
 
@@ -10,6 +17,9 @@ import pytest
 @pytest.fixture(autouse=True)
 def mock_function(monkeypatch):
     monkeypatch.setattr("clickable.container.Container.is_docker_desktop", false_fn)
+    monkeypatch.setattr("clickable.container.Container.check_docker", empty_fn)
+    monkeypatch.setattr("clickable.container.get_docker_command", lambda: 'docker')
+    monkeypatch.setattr("clickable.commands.review.get_image_hash", lambda *args: 'sha256:1')
 
 
 class TestReviewCommand(UnitTest):
@@ -37,3 +47,75 @@ class TestReviewCommand(UnitTest):
             cwd='/foo',
             use_build_dir=False
         )
+
+
+class TestReviewCache(UnitTest):
+    def setUp(self):
+        self.command = ReviewCommand()
+        self.setUpWithTmpBuildDir(commands="review")
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.config.build_dir = self.tmp_dir
+        self.click = os.path.join(self.tmp_dir, 'foo.bar_1.2.3_all.click')
+        with open(self.click, 'wb') as f:
+            f.write(b'click content')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+        super().tearDown()
+
+    @mock.patch('clickable.container.Container.run_command', return_value='Review passed\n')
+    def test_cached_result(self, mock_run_command):
+        self.command.check(self.click)
+        self.command.check(self.click)
+
+        mock_run_command.assert_called_once()
+
+    @mock.patch('clickable.container.Container.run_command')
+    def test_cached_error(self, mock_run_command):
+        mock_run_command.side_effect = subprocess.CalledProcessError(
+            2, 'click-review', output=b'Errors found')
+
+        for _ in range(2):
+            with self.assertRaises(subprocess.CalledProcessError):
+                self.command.check(self.click, raise_on_error=True)
+
+        self.command.check(self.click, raise_on_error=False)
+
+        mock_run_command.assert_called_once()
+
+    @mock.patch('clickable.container.Container.run_command', return_value='Review passed\n')
+    def test_force_review(self, mock_run_command):
+        self.command.check(self.click)
+        self.command.force = True
+        self.command.check(self.click)
+
+        self.assertEqual(mock_run_command.call_count, 2)
+
+    @mock.patch('clickable.container.Container.run_command', return_value='Review passed\n')
+    def test_output_prefixed(self, mock_run_command):
+        with redirect_stdout(io.StringIO()) as stdout, log_prefix('arm64'):
+            self.command.check(self.click)
+
+        self.assertEqual(stdout.getvalue(), '[arm64] Review passed\n')
+
+    @mock.patch('clickable.commands.review.REVIEW_CACHE_SIZE', 2)
+    @mock.patch('clickable.container.Container.run_command', return_value='Review passed\n')
+    def test_cache_pruned(self, mock_run_command):
+        cache_dir = os.path.join(self.tmp_dir, '.clickable', 'review-cache')
+
+        for i in range(4):
+            with open(self.click, 'wb') as f:
+                f.write(f'click content {i}'.encode())
+            self.command.check(self.click)
+
+            # Distinct modification times
+            for name in os.listdir(cache_dir):
+                path = os.path.join(cache_dir, name)
+                os.utime(path, ns=(os.stat(path).st_mtime_ns - 10 ** 9,) * 2)
+
+        self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+        # The most recent result is still cached
+        self.command.check(self.click)
+        self.assertEqual(mock_run_command.call_count, 4)
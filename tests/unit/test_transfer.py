@@ -0,0 +1,75 @@
+import os
+import shutil
+import stat
+import tempfile
+from unittest import TestCase
+
+from clickable.exceptions import ClickableException
+from clickable.transfer import (
+    Compression,
+    choose_compression,
+    push_file_stream,
+    stream_file,
+)
+
+# Runs the "remote" command locally instead of on a device
+LOCAL_SHELL = 'sh -c'
+
+
+class TestTransfer(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+        self.text_file = os.path.join(self.tmp_dir, 'gdbserver')
+        with open(self.text_file, 'w', encoding='UTF-8') as f:
+            f.write('import QtQuick 2.7\n' * 100000)
+        os.chmod(self.text_file, 0o755)
+
+        self.random_file = os.path.join(self.tmp_dir, 'app.click')
+        with open(self.random_file, 'wb') as f:
+            f.write(os.urandom(500000))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def assert_transferred(self, src, dst):
+        with open(src, 'rb') as f1, open(dst, 'rb') as f2:
+            self.assertEqual(f1.read(), f2.read())
+
+        self.assertEqual(stat.S_IMODE(os.stat(src).st_mode), stat.S_IMODE(os.stat(dst).st_mode))
+
+    def test_compressed(self):
+        dst = os.path.join(self.tmp_dir, 'device', 'bin', 'gdbserver')
+
+        with self.assertLogs('clickable', level='DEBUG') as logs:
+            push_file_stream(LOCAL_SHELL, self.text_file, dst)
+
+        self.assert_transferred(self.text_file, dst)
+        self.assertIn('gzip -6', '\n'.join(logs.output))
+
+    def test_zstd(self):
+        if not shutil.which('zstd'):
+            self.skipTest('zstd is not installed')
+
+        dst = os.path.join(self.tmp_dir, 'device', 'gdbserver')
+        sent = stream_file(LOCAL_SHELL, self.text_file, dst, Compression('zstd', 3))
+
+        self.assert_transferred(self.text_file, dst)
+        self.assertLess(sent, os.path.getsize(self.text_file) / 10)
+
+    def test_choose_compression(self):
+        self.assertIsNone(choose_compression(self.random_file))
+        self.assertEqual(str(choose_compression(self.text_file, rate=1000)), 'gzip -9')
+        self.assertEqual(str(choose_compression(self.text_file, rate=10 ** 9)), 'gzip -1')
+
+        dst = os.path.join(self.tmp_dir, 'device', 'app.click')
+        stream_file(LOCAL_SHELL, self.random_file, dst)
+        self.assert_transferred(self.random_file, dst)
+
+    def test_checksum_mismatch(self):
+        dst = os.path.join(self.tmp_dir, 'device', 'gdbserver')
+
+        # Reports a wrong checksum instead of unpacking the stream
+        shell = f'sh -c \'cat > /dev/null; echo 0000 {dst}\' --'
+        with self.assertRaises(ClickableException):
+            stream_file(shell, self.text_file, dst)
@@ -1,7 +1,13 @@
+import io
+import subprocess
+from contextlib import redirect_stdout
 from unittest import mock
 from unittest.mock import ANY
 
 from clickable.commands.update_images import UpdateCommand
+from clickable.config.constants import Constants
+from clickable.exceptions import ClickableException
+from clickable.parallel import print_prefixed
 from ..mocks import empty_fn, false_fn
 from .base_test import UnitTest
 
@@ -11,6 +17,7 @@ import pytest
 @pytest.fixture(autouse=True)
 def mock_function(monkeypatch):
     monkeypatch.setattr("clickable.container.Container.is_docker_desktop", false_fn)
+    monkeypatch.setattr("clickable.container.get_docker_command", lambda: 'docker')
 
 
 def zero_fn(*args, **kwargs):
@@ -29,10 +36,12 @@ class TestUpdateCommand(UnitTest):
     @mock.patch('clickable.commands.clean_images.CleanImagesCommand.run', side_effect=empty_fn)
     @mock.patch('clickable.container.Container.check_docker', side_effect=empty_fn)
     @mock.patch('clickable.commands.update_images.image_exists', side_effect=true_fn)
+    @mock.patch('clickable.commands.update_images.get_image_hash', return_value='sha256:1')
     @mock.patch('clickable.commands.update_images.pull_image', side_effect=empty_fn)
     def test_update(
         self,
         mock_run_pull_image,
+        mock_get_image_hash,
         mock_run_image_exists,
         mock_check_docker,
         mock_clean,
@@ -43,3 +52,62 @@ class TestUpdateCommand(UnitTest):
         mock_run_image_exists.assert_called_with(ANY)
         mock_run_pull_image.assert_called_with(ANY, skip_existing=False)
         mock_clean.assert_called()
+
+    @mock.patch('clickable.commands.clean_images.CleanImagesCommand.run', side_effect=empty_fn)
+    @mock.patch('clickable.container.Container.check_docker', side_effect=empty_fn)
+    @mock.patch('clickable.commands.update_images.image_exists', side_effect=true_fn)
+    @mock.patch('clickable.commands.update_images.get_image_hash')
+    @mock.patch('clickable.commands.update_images.pull_image')
+    def test_update_summary(
+        self,
+        mock_run_pull_image,
+        mock_get_image_hash,
+        mock_run_image_exists,
+        mock_check_docker,
+        mock_clean,
+    ):
+        images = list(dict.fromkeys(Constants.container_mapping[Constants.host_arch].values()))
+        changed = images[0]
+        broken = images[1]
+        unreachable = images[2]
+        pulled = set()
+
+        def pull(image, skip_existing=True):
+            print_prefixed(f'Pulling {image}')
+            if image == broken:
+                print_prefixed('Error response from daemon: manifest unknown')
+                raise subprocess.CalledProcessError(1, 'pull')
+            if image == unreachable:
+                raise OSError('Connection reset by peer')
+            pulled.add(image)
+
+        mock_run_pull_image.side_effect = pull
+        mock_get_image_hash.side_effect = \
+            lambda image: 'sha256:2' if image == changed and image in pulled else 'sha256:1'
+        self.command.jobs = 4
+
+        with self.assertLogs('clickable', level='INFO') as logs, \
+                redirect_stdout(io.StringIO()) as stdout, \
+                self.assertRaises(ClickableException):
+            self.command.run()
+
+        self.assertEqual(mock_run_pull_image.call_count, len(images))
+        output = '\n'.join(logs.output)
+
+        # Pull output is only shown for failed pulls
+        self.assertEqual(stdout.getvalue(), '')
+        self.assertIn(f'[{broken}] Error response from daemon: manifest unknown', output)
+        self.assertNotIn(f'Pulling {changed}', output)
+
+        # Each image reports its start and result
+        self.assertEqual(len([line for line in output.split('\n') if 'pulling,' in line]),
+                         2 * len(images))
+        self.assertIn(f'/{len(images)}] {changed}: pulled after', output)
+        self.assertIn(f'/{len(images)}] {broken}: failed after', output)
+        self.assertIn(f'/{len(images)}] {unreachable}: failed after', output)
+        self.assertIn(f'Failed to update {unreachable}: Connection reset by peer', output)
+        self.assertIn(f'[{len(images)}/{len(images)}]', output)
+        self.assertIn(f'Pulled (1): {changed}', output)
+        self.assertIn(f'Up to date ({len(images) - 3})', output)
+        self.assertIn(f'Failed (2): {broken}, {unreachable}', output)
+        mock_clean.assert_not_called()